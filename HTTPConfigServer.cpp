@@ -5,6 +5,36 @@
 
 static const uint32_t SCRIPT_TRANSFER_TIMEOUT_MS = 5000;
 
+// Reads the request id from a command-socket message that is not valid JSON, so the error ack
+// can still be matched. Clients put the id first; only a plain non-negative integer is taken.
+static bool scanRequestId(const uint8_t *data, size_t len, uint32_t &id) {
+  for (size_t i = 0; i + 4 <= len; ++i) {
+    if (memcmp(data + i, "\"id\"", 4) != 0) continue;
+    size_t j = i + 4;
+    while (j < len && isspace(data[j])) j++;
+    if (j >= len || data[j] != ':') return false;
+    j++;
+    while (j < len && isspace(data[j])) j++;
+    size_t start = j;
+    uint32_t value = 0;
+    while (j < len && isdigit(data[j]) && j - start < 9) value = value * 10 + (data[j++] - '0');
+    if (j == start) return false;
+    id = value;
+    return true;
+  }
+  return false;
+}
+
+// Field bits for the delta stream
+static const uint8_t DELTA_SPEED = 0x01;
+static const uint8_t DELTA_PATTERN = 0x02;
+static const uint8_t DELTA_MODE = 0x04;
+static const uint8_t DELTA_RUN = 0x08;
+static const uint8_t DELTA_LED_EFFECT = 0x10;
+static const uint8_t DELTA_LED_COLOR = 0x20;
+static const uint8_t DELTA_LED_BRIGHTNESS = 0x40;
+static const uint8_t DELTA_ALL = 0x7F;
+
 HTTPConfigServer::HTTPConfigServer() {}
 
 HTTPConfigServer::~HTTPConfigServer() {
@@ -17,12 +47,25 @@ HTTPConfigServer::~HTTPConfigServer() {
     delete _events;
     _events = nullptr;
   }
+  if (_deltaEvents) {
+    delete _deltaEvents;
+    _deltaEvents = nullptr;
+  }
+  if (_ws) {
+    delete _ws;
+    _ws = nullptr;
+  }
 }
 
 void HTTPConfigServer::begin(ISGConfigListener *listener, uint16_t port) {
   _listener = listener;
   _server = new AsyncWebServer(port);
   _events = new AsyncEventSource("/api/events");
+  _deltaEvents = new AsyncEventSource("/api/events/delta");
+  _ws = new AsyncWebSocket("/api/ws");
+
+  _deltaRunning = true;
+  xTaskCreate(&HTTPConfigServer::_deltaTaskMain, "delta", DELTA_TASK_STACK, this, DELTA_TASK_PRIORITY, &_deltaTask);
 
   // Enable CORS for all origins (web client can be served from anywhere)
   DefaultHeaders::Instance().addHeader("Access-Control-Allow-Origin", "*");
@@ -46,12 +89,28 @@ void HTTPConfigServer::loop() {
       _resetScriptTransfer("timeout", false);
     }
   }
+
+  if (_ws) {
+    _ws->cleanupClients();
+  }
 }
 
 void HTTPConfigServer::end() {
+  if (_deltaTask) {
+    // Let the task finish a frame in progress and exit on its own
+    _deltaRunning = false;
+    xTaskNotifyGive(_deltaTask);
+    for (int waited = 0; _deltaTask && waited < 200; ++waited) delay(1);
+  }
   if (_events) {
     _events->close();
   }
+  if (_deltaEvents) {
+    _deltaEvents->close();
+  }
+  if (_ws) {
+    _ws->closeAll();
+  }
   if (_server) {
     _server->end();
   }
@@ -169,6 +228,33 @@ void HTTPConfigServer::_setupRoutes() {
   });
 
   _server->addHandler(_events);
+
+  // Compact delta stream: a full snapshot on connect, then batched changes
+  _deltaEvents->onConnect([this](AsyncEventSourceClient *client) {
+    Serial.printf("[HTTP] Delta SSE client connected, ID: %u\n", client->lastId());
+    _sendDelta(DELTA_ALL, client);
+  });
+
+  _server->addHandler(_deltaEvents);
+
+  // Command socket: pipelined requests with acks, delta frames pushed on the same connection
+  _ws->onEvent([this](AsyncWebSocket *server, AsyncWebSocketClient *client, AwsEventType type,
+                      void *arg, uint8_t *data, size_t len) {
+    if (type == WS_EVT_CONNECT) {
+      Serial.printf("[HTTP] WebSocket client connected, ID: %u\n", client->id());
+      _sendDelta(DELTA_ALL, nullptr, client);
+    } else if (type == WS_EVT_DATA) {
+      AwsFrameInfo *info = (AwsFrameInfo *)arg;
+      if (info->final && info->index == 0 && info->len == len && info->opcode == WS_TEXT) {
+        _handleWsMessage(client, data, len);
+      } else if (info->final && info->index + len == info->len) {
+        // Requests fit in one frame; answer a fragmented or binary message once, at its end
+        client->text("{\"ok\":false,\"status\":400,\"error\":\"Unsupported frame\"}");
+      }
+    }
+  });
+
+  _server->addHandler(_ws);
 }
 
 void HTTPConfigServer::_handleGetState(AsyncWebServerRequest *request) {
@@ -182,6 +268,9 @@ void HTTPConfigServer::_handleGetState(AsyncWebServerRequest *request) {
   doc["ledColorG"] = _ledColorG;
   doc["ledColorB"] = _ledColorB;
   doc["ledBrightness"] = _ledBrightness;
+  JsonObject proto = doc.createNestedObject("proto");
+  proto["delta"] = DELTA_PROTO_VERSION;
+  proto["ws"] = WS_PROTO_VERSION;
 
   String json;
   serializeJson(doc, json);
@@ -434,16 +523,126 @@ void HTTPConfigServer::_handleReset(AsyncWebServerRequest *request) {
   ESP.restart();
 }
 
+void HTTPConfigServer::_handleWsMessage(AsyncWebSocketClient *client, uint8_t *data, size_t len) {
+  // Room for a full-size script plus the envelope
+  DynamicJsonDocument doc(PSG_MAX_SCRIPT_CHARS + 256);
+  DeserializationError error = deserializeJson(doc, data, len);
+
+  StaticJsonDocument<192> ack;
+  String message;
+  String path;
+  int status;
+  if (error) {
+    uint32_t id;
+    if (scanRequestId(data, len, id)) ack["id"] = id;
+    status = 400;
+    message = "Invalid JSON";
+  } else {
+    ack["id"] = doc["id"];
+    path = doc["path"] | "";
+    status = _applyWsRequest(path, doc["body"], message);
+  }
+  ack["ok"] = status == 200;
+  if (status != 200) {
+    ack["status"] = status;
+    ack["error"] = message;
+  }
+  String json;
+  serializeJson(ack, json);
+  client->text(json);
+
+  if (status == 200 && path == "/api/reset") {
+    // Give time for the ack to be sent before restarting
+    delay(100);
+    ESP.restart();
+  }
+}
+
+// Applies one command-socket request the way the matching POST handler does.
+// Returns the HTTP status that handler would have sent.
+int HTTPConfigServer::_applyWsRequest(const String &path, JsonVariantConst body, String &error) {
+  bool needsValue = path == "/api/speed" || path == "/api/pattern" || path == "/api/mode" ||
+                    path == "/api/run" || path == "/api/led/effect" || path == "/api/led/brightness";
+  if (needsValue && !body.containsKey("value")) {
+    error = "Missing value field";
+    return 400;
+  }
+
+  if (path == "/api/speed") {
+    setSpeedMultiplier(body["value"].as<float>());
+  } else if (path == "/api/pattern") {
+    setCurrentPattern(body["value"].as<int>());
+  } else if (path == "/api/mode") {
+    setAutoMode(body["value"].as<bool>());
+  } else if (path == "/api/run") {
+    setRunState(body["value"].as<bool>());
+  } else if (path == "/api/led/effect") {
+    uint8_t newValue = body["value"];
+    if (newValue >= NUM_PATTERN_LED_EFFECTS) {
+      error = "Invalid effect value";
+      return 400;
+    }
+    setLedEffect(newValue);
+  } else if (path == "/api/led/brightness") {
+    setLedBrightness(body["value"].as<uint8_t>());
+  } else if (path == "/api/led/color") {
+    if (!body.containsKey("r") || !body.containsKey("g") || !body.containsKey("b")) {
+      error = "Missing r, g, or b field";
+      return 400;
+    }
+    setLedColor(body["r"].as<uint8_t>(), body["g"].as<uint8_t>(), body["b"].as<uint8_t>());
+  } else if (path == "/api/command") {
+    if (!body.containsKey("command")) {
+      error = "Missing command field";
+      return 400;
+    }
+    String cmd = body["command"].as<String>();
+    cmd.trim();
+    cmd.toUpperCase();
+    notifyStatus(String("[CMD] RX ") + cmd);
+    if (_listener) {
+      _listener->onCommandReceived(cmd, cmd.c_str());
+    }
+  } else if (path == "/api/script") {
+    // The whole script in one request; equivalent to begin + one chunk + end
+    const char *script = body["script"] | "";
+    size_t length = strlen(script);
+    if (length == 0 || length > PSG_MAX_SCRIPT_CHARS) {
+      error = String("Invalid length: ") + String(length);
+      return 400;
+    }
+    if (_scriptActive || _scriptReceivedLen > 0) {
+      _resetScriptTransfer("preempt", false);
+    }
+    _scriptBuffer.assign(script, length);
+    _scriptExpectedLen = length;
+    _scriptReceivedLen = length;
+    _scriptTargetSlot = body["slot"] | -1;
+    _scriptActive = true;
+    _finalizeScriptTransfer();
+  } else if (path == "/api/reset") {
+    Serial.println("[HTTP] Reset requested - restarting device");
+    notifyStatus("[RESET] Device restarting...");
+  } else {
+    error = "Not Found";
+    return 404;
+  }
+  return 200;
+}
+
 void HTTPConfigServer::setSpeedMultiplier(float v) {
   if (v <= 0) v = 0.01f;
   if (fabsf(v - _speedMultiplier) < 0.0001f) return;
   _speedMultiplier = v;
 
-  StaticJsonDocument<128> doc;
-  doc["speed"] = _speedMultiplier;
-  String json;
-  serializeJson(doc, json);
-  _broadcastSSE("speed", json);
+  if (_hasLegacyClients()) {
+    StaticJsonDocument<128> doc;
+    doc["speed"] = _speedMultiplier;
+    String json;
+    serializeJson(doc, json);
+    _broadcastSSE("speed", json);
+  }
+  _markDirty(DELTA_SPEED);
 
   if (_listener) _listener->onSpeedMultiplierChanged(_speedMultiplier);
 }
@@ -453,11 +652,14 @@ void HTTPConfigServer::setCurrentPattern(int p) {
   if (p == _currentPattern) return;
   _currentPattern = p;
 
-  StaticJsonDocument<128> doc;
-  doc["pattern"] = _currentPattern;
-  String json;
-  serializeJson(doc, json);
-  _broadcastSSE("pattern", json);
+  if (_hasLegacyClients()) {
+    StaticJsonDocument<128> doc;
+    doc["pattern"] = _currentPattern;
+    String json;
+    serializeJson(doc, json);
+    _broadcastSSE("pattern", json);
+  }
+  _markDirty(DELTA_PATTERN);
 
   if (_listener) _listener->onCurrentPatternChanged(_currentPattern);
 }
@@ -466,11 +668,14 @@ void HTTPConfigServer::setAutoMode(bool m) {
   if (_autoMode == m) return;
   _autoMode = m;
 
-  StaticJsonDocument<128> doc;
-  doc["mode"] = _autoMode ? 1 : 0;
-  String json;
-  serializeJson(doc, json);
-  _broadcastSSE("mode", json);
+  if (_hasLegacyClients()) {
+    StaticJsonDocument<128> doc;
+    doc["mode"] = _autoMode ? 1 : 0;
+    String json;
+    serializeJson(doc, json);
+    _broadcastSSE("mode", json);
+  }
+  _markDirty(DELTA_MODE);
 
   if (_listener) _listener->onAutoModeChanged(_autoMode);
 }
@@ -479,11 +684,14 @@ void HTTPConfigServer::setRunState(bool r) {
   if (_runState == r) return;
   _runState = r;
 
-  StaticJsonDocument<128> doc;
-  doc["run"] = _runState ? 1 : 0;
-  String json;
-  serializeJson(doc, json);
-  _broadcastSSE("run", json);
+  if (_hasLegacyClients()) {
+    StaticJsonDocument<128> doc;
+    doc["run"] = _runState ? 1 : 0;
+    String json;
+    serializeJson(doc, json);
+    _broadcastSSE("run", json);
+  }
+  _markDirty(DELTA_RUN);
 
   if (_listener) _listener->onRunStateChanged(_runState);
 }
@@ -497,11 +705,14 @@ void HTTPConfigServer::setLedEffect(uint8_t e) {
   if (_ledEffect == e) return;
   _ledEffect = e;
 
-  StaticJsonDocument<128> doc;
-  doc["ledEffect"] = _ledEffect;
-  String json;
-  serializeJson(doc, json);
-  _broadcastSSE("ledEffect", json);
+  if (_hasLegacyClients()) {
+    StaticJsonDocument<128> doc;
+    doc["ledEffect"] = _ledEffect;
+    String json;
+    serializeJson(doc, json);
+    _broadcastSSE("ledEffect", json);
+  }
+  _markDirty(DELTA_LED_EFFECT);
 
   if (_listener) _listener->onLedEffectChanged(_ledEffect);
 }
@@ -512,13 +723,16 @@ void HTTPConfigServer::setLedColor(uint8_t r, uint8_t g, uint8_t b) {
   _ledColorG = g;
   _ledColorB = b;
 
-  StaticJsonDocument<128> doc;
-  doc["r"] = r;
-  doc["g"] = g;
-  doc["b"] = b;
-  String json;
-  serializeJson(doc, json);
-  _broadcastSSE("ledColor", json);
+  if (_hasLegacyClients()) {
+    StaticJsonDocument<128> doc;
+    doc["r"] = r;
+    doc["g"] = g;
+    doc["b"] = b;
+    String json;
+    serializeJson(doc, json);
+    _broadcastSSE("ledColor", json);
+  }
+  _markDirty(DELTA_LED_COLOR);
 
   if (_listener) _listener->onLedColorChanged(r, g, b);
 }
@@ -527,11 +741,14 @@ void HTTPConfigServer::setLedBrightness(uint8_t brightness) {
   if (_ledBrightness == brightness) return;
   _ledBrightness = brightness;
 
-  StaticJsonDocument<128> doc;
-  doc["ledBrightness"] = _ledBrightness;
-  String json;
-  serializeJson(doc, json);
-  _broadcastSSE("ledBrightness", json);
+  if (_hasLegacyClients()) {
+    StaticJsonDocument<128> doc;
+    doc["ledBrightness"] = _ledBrightness;
+    String json;
+    serializeJson(doc, json);
+    _broadcastSSE("ledBrightness", json);
+  }
+  _markDirty(DELTA_LED_BRIGHTNESS);
 
   if (_listener) _listener->onLedBrightnessChanged(_ledBrightness);
 }
@@ -550,6 +767,82 @@ void HTTPConfigServer::_broadcastSSE(const String &event, const String &data) {
   }
 }
 
+bool HTTPConfigServer::_hasLegacyClients() const {
+  return _events && _events->count() > 0;
+}
+
+void HTTPConfigServer::_markDirty(uint8_t fields) {
+  bool listening = (_deltaEvents && _deltaEvents->count() > 0) || (_ws && _ws->count() > 0);
+  if (!listening) return;
+  taskENTER_CRITICAL(&_deltaMux);
+  bool first = !_deltaDirty;
+  _deltaDirty |= fields;
+  taskEXIT_CRITICAL(&_deltaMux);
+  // The first change of a batch opens the window; later ones ride along
+  if (first && _deltaTask) xTaskNotifyGive(_deltaTask);
+}
+
+void HTTPConfigServer::_flushDelta() {
+  taskENTER_CRITICAL(&_deltaMux);
+  uint8_t fields = _deltaDirty;
+  _deltaDirty = 0;
+  taskEXIT_CRITICAL(&_deltaMux);
+  if (fields) _sendDelta(fields);
+}
+
+// Sleeps until the first change of a batch, waits out the window, then serializes and sends the
+// frame. Runs at low priority, so a slow send only holds up this task.
+void HTTPConfigServer::_deltaTaskMain(void *arg) {
+  HTTPConfigServer *self = static_cast<HTTPConfigServer *>(arg);
+  while (self->_deltaRunning) {
+    ulTaskNotifyTake(pdTRUE, portMAX_DELAY);
+    if (!self->_deltaRunning) break;
+    vTaskDelay(pdMS_TO_TICKS(DELTA_BATCH_WINDOW_MS));
+    if (!self->_deltaRunning) break;
+    self->_flushDelta();
+  }
+  self->_deltaTask = nullptr;
+  vTaskDelete(nullptr);
+}
+
+// Frame: {"v":1,"s":<seq>,"f":1?,"d":{"sp":1.0,"p":3,"am":0,"rn":1,"le":2,"lc":[r,g,b],"lb":100}}
+// Only changed fields are present; "f" marks a full snapshot (sent to a new client, same seq).
+// Broadcasts go to the delta SSE stream and the command socket alike.
+void HTTPConfigServer::_sendDelta(uint8_t fields, AsyncEventSourceClient *client, AsyncWebSocketClient *wsClient) {
+  if (!_deltaEvents) return;
+  bool snapshot = client || wsClient;
+  StaticJsonDocument<256> doc;
+  doc["v"] = DELTA_PROTO_VERSION;
+  taskENTER_CRITICAL(&_deltaMux);
+  uint32_t seq = snapshot ? _deltaSeq : ++_deltaSeq;
+  taskEXIT_CRITICAL(&_deltaMux);
+  doc["s"] = seq;
+  if (snapshot) doc["f"] = 1;
+  JsonObject d = doc.createNestedObject("d");
+  if (fields & DELTA_SPEED) d["sp"] = _speedMultiplier;
+  if (fields & DELTA_PATTERN) d["p"] = _currentPattern;
+  if (fields & DELTA_MODE) d["am"] = _autoMode ? 1 : 0;
+  if (fields & DELTA_RUN) d["rn"] = _runState ? 1 : 0;
+  if (fields & DELTA_LED_EFFECT) d["le"] = _ledEffect;
+  if (fields & DELTA_LED_COLOR) {
+    JsonArray lc = d.createNestedArray("lc");
+    lc.add(_ledColorR);
+    lc.add(_ledColorG);
+    lc.add(_ledColorB);
+  }
+  if (fields & DELTA_LED_BRIGHTNESS) d["lb"] = _ledBrightness;
+  String json;
+  serializeJson(doc, json);
+  if (client) {
+    client->send(json.c_str(), "delta", millis());
+  } else if (wsClient) {
+    wsClient->text(json);
+  } else {
+    if (_deltaEvents->count() > 0) _deltaEvents->send(json.c_str(), "delta", millis());
+    if (_ws && _ws->count() > 0) _ws->textAll(json);
+  }
+}
+
 void HTTPConfigServer::_resetScriptTransfer(const char *reasonTag, bool notify) {
   bool hadProgress = _scriptActive || _scriptReceivedLen > 0;
   if (notify && hadProgress) {
@@ -7,12 +7,27 @@
 #include <Arduino.h>
 #include <ESPAsyncWebServer.h>
 #include <AsyncTCP.h>
+#include <ArduinoJson.h>
 #include <vector>
 #include <algorithm>
 
 // LED effects configuration
 #define NUM_PATTERN_LED_EFFECTS 14  // Total number of LED effects available
 
+// Compact state stream (/api/events/delta): changed fields are batched into one
+// versioned frame with short keys. Bump DELTA_PROTO_VERSION on any format change.
+// The batch is serialized and sent by a low-priority task that the first change wakes, so
+// frames keep flowing while the sketch's loop() is blocked in a move.
+#define DELTA_TASK_STACK 4096
+#define DELTA_TASK_PRIORITY 1
+#define DELTA_PROTO_VERSION 1
+#define DELTA_BATCH_WINDOW_MS 50
+
+// Command socket (/api/ws): {"id":n,"path":"/api/...","body":{...}} requests are answered in
+// order with {"id":n,"ok":true} or {"id":n,"ok":false,"status":400,"error":"..."}, and delta
+// frames are pushed on the same connection. Bump WS_PROTO_VERSION on any format change.
+#define WS_PROTO_VERSION 1
+
 // Callback interface for host sketch to observe updates (same as BLE)
 class ISGConfigListener {
 public:
@@ -72,9 +87,18 @@ private:
   void _resetScriptTransfer(const char *reasonTag, bool notify = true);
   void _finalizeScriptTransfer();
   void _broadcastSSE(const String &event, const String &data);
+  bool _hasLegacyClients() const;
+  void _markDirty(uint8_t fields);
+  void _flushDelta();
+  static void _deltaTaskMain(void *arg);
+  void _sendDelta(uint8_t fields, AsyncEventSourceClient *client = nullptr, AsyncWebSocketClient *wsClient = nullptr);
+  void _handleWsMessage(AsyncWebSocketClient *client, uint8_t *data, size_t len);
+  int _applyWsRequest(const String &path, JsonVariantConst body, String &error);
 
   AsyncWebServer *_server = nullptr;
   AsyncEventSource *_events = nullptr;
+  AsyncEventSource *_deltaEvents = nullptr;
+  AsyncWebSocket *_ws = nullptr;
   ISGConfigListener *_listener = nullptr;
 
   float _speedMultiplier = 1.0f;
@@ -87,6 +111,14 @@ private:
   uint8_t _ledColorB = 255;
   uint8_t _ledBrightness = 100;
 
+  // Delta stream batching. Setters run on the main loop and the async_tcp task, the flush on
+  // the delta task, so the mask and the sequence are only touched under _deltaMux.
+  portMUX_TYPE _deltaMux = portMUX_INITIALIZER_UNLOCKED;
+  TaskHandle_t _deltaTask = nullptr;
+  volatile bool _deltaRunning = false;
+  uint8_t _deltaDirty = 0;
+  uint32_t _deltaSeq = 0;
+
   // Script upload state
   std::string _scriptBuffer;
   size_t _scriptExpectedLen = 0;
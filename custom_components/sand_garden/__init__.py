@@ -11,6 +11,7 @@ from homeassistant.exceptions import ConfigEntryNotReady
 
 from .const import CONF_HOST, DOMAIN
 from .coordinator import SandGardenCoordinator
+from .gallery import DATA_GALLERY
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,6 +20,7 @@ PLATFORMS: list[Platform] = [
     Platform.LIGHT,
     Platform.NUMBER,
     Platform.SELECT,
+    Platform.SENSOR,
     Platform.SWITCH,
 ]
 
@@ -48,5 +50,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         coordinator = hass.data[DOMAIN].pop(entry.entry_id)
         await coordinator.async_shutdown()
+        if not hass.data[DOMAIN] and (gallery := hass.data.get(DATA_GALLERY)):
+            gallery.async_shutdown()
 
     return unload_ok
@@ -0,0 +1,571 @@
+"""Asyncio client for the Sand Garden HTTP, SSE and WebSocket API.
+
+Like ``protocol.py`` this module has no Home Assistant dependencies. The
+coordinator wraps one client per device, and ``tools/sandctl.py`` drives
+whole fleets with it. Pass a shared ``aiohttp.ClientSession`` to pool
+connections across clients. Without one, the client opens its own pooled
+session on first use and closes it in ``close()``.
+"""
+from __future__ import annotations
+
+import asyncio
+from contextlib import aclosing
+from dataclasses import dataclass, field
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, NamedTuple
+
+import aiohttp
+
+try:
+    from .const import (
+        API_COMMAND,
+        API_EVENTS,
+        API_EVENTS_DELTA,
+        API_LED_BRIGHTNESS,
+        API_LED_COLOR,
+        API_LED_EFFECT,
+        API_MODE,
+        API_PATTERN,
+        API_RESET,
+        API_RUN,
+        API_SCRIPT,
+        API_SCRIPT_BEGIN,
+        API_SCRIPT_CHUNK,
+        API_SCRIPT_END,
+        API_SPEED,
+        API_STATE,
+        API_WS,
+    )
+    from .protocol import (
+        DELTA_VERSION,
+        WS_VERSION,
+        Ack,
+        Delta,
+        ProtocolError,
+        decode_delta,
+        decode_ws_message,
+        encode_request,
+        supported,
+    )
+    from .stats import CoordinatorStats
+except ImportError:  # loaded flat by the host tools in tools/
+    from const import (
+        API_COMMAND,
+        API_EVENTS,
+        API_EVENTS_DELTA,
+        API_LED_BRIGHTNESS,
+        API_LED_COLOR,
+        API_LED_EFFECT,
+        API_MODE,
+        API_PATTERN,
+        API_RESET,
+        API_RUN,
+        API_SCRIPT,
+        API_SCRIPT_BEGIN,
+        API_SCRIPT_CHUNK,
+        API_SCRIPT_END,
+        API_SPEED,
+        API_STATE,
+        API_WS,
+    )
+    from protocol import (
+        DELTA_VERSION,
+        WS_VERSION,
+        Ack,
+        Delta,
+        ProtocolError,
+        decode_delta,
+        decode_ws_message,
+        encode_request,
+        supported,
+    )
+    from stats import CoordinatorStats
+
+_LOGGER = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 10  # seconds for a state fetch or a command
+RETRY_DELAY = 10  # seconds between attempts to re-establish the stream
+SSE_READ_TIMEOUT = 300
+WS_HEARTBEAT = 30
+WS_MAX_FAILURES = 3  # consecutive lost or refused sessions before falling back to HTTP and SSE
+SSE_TEXT_EVENTS = frozenset(("status", "telemetry"))  # plain-text events; the others carry JSON
+POOL_LIMIT_PER_HOST = 4  # the stream holds one connection; commands share the rest
+
+StateCallback = Callable[[dict[str, Any]], None]
+
+
+class SandGardenError(Exception):
+    """Base class for errors talking to a device."""
+
+
+class CannotConnect(SandGardenError):
+    """The device could not be reached or did not answer."""
+
+
+class NotSupported(SandGardenError):
+    """The device does not serve an optional endpoint."""
+
+
+class CommandError(SandGardenError):
+    """The device rejected a command."""
+
+    def __init__(self, endpoint: str, status: int, message: str | None = None) -> None:
+        super().__init__(f"HTTP {status}" + (f": {message}" if message else ""))
+        self.endpoint = endpoint
+        self.status = status
+
+
+@dataclass
+class SandGardenState:
+    """The state ``/api/state`` reports, with the firmware's defaults."""
+
+    speed_multiplier: float = 1.0
+    pattern: int = 1
+    auto_mode: bool = True
+    running: bool = False
+    led_effect: int = 0
+    led_color: tuple[int, int, int] = (255, 255, 255)
+    led_brightness: int = 100
+    proto: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> SandGardenState:
+        """Build the state from ``/api/state`` keys; missing keys keep their defaults."""
+        default = cls()
+        return cls(
+            speed_multiplier=float(data.get("speedMultiplier", default.speed_multiplier)),
+            pattern=int(data.get("pattern", default.pattern)),
+            auto_mode=bool(data.get("autoMode", default.auto_mode)),
+            running=bool(data.get("running", default.running)),
+            led_effect=int(data.get("ledEffect", default.led_effect)),
+            led_color=tuple(
+                int(data.get(key, part))
+                for key, part in zip(("ledColorR", "ledColorG", "ledColorB"), default.led_color)
+            ),
+            led_brightness=int(data.get("ledBrightness", default.led_brightness)),
+            proto=dict(data.get("proto") or {}),
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state under ``/api/state`` keys."""
+        red, green, blue = self.led_color
+        return {
+            "speedMultiplier": self.speed_multiplier,
+            "pattern": self.pattern,
+            "autoMode": self.auto_mode,
+            "running": self.running,
+            "ledEffect": self.led_effect,
+            "ledColorR": red,
+            "ledColorG": green,
+            "ledColorB": blue,
+            "ledBrightness": self.led_brightness,
+            "proto": dict(self.proto),
+        }
+
+
+class SseEvent(NamedTuple):
+    event: str
+    data: str
+    received: float  # time.perf_counter() when the data line arrived
+
+
+class SandGardenClient:
+    """Talk to one Sand Garden device.
+
+    Commands go over the command socket while ``listen()`` holds it open,
+    and over HTTP POST otherwise. Round trips, stream events and outages are
+    recorded in ``stats``.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        session: aiohttp.ClientSession | None = None,
+        *,
+        timeout: float = REQUEST_TIMEOUT,
+    ) -> None:
+        """Initialize the client; no connection is made until first use."""
+        self.host = host
+        self.base_url = f"http://{host}"
+        self.timeout = timeout
+        self.stats = CoordinatorStats()
+        self.socket_open = asyncio.Event()
+        self._session = session
+        self._owns_session = session is None
+        self._advertised: dict[str, Any] = {}  # the last /api/state, for its proto object
+        self._delta_failed = False  # the device advertised delta frames but they did not work
+        self._delta_seq: int | None = None
+        self._ws: aiohttp.ClientWebSocketResponse | None = None
+        self._ws_failed = False  # the device advertised the command socket but it did not work
+        self._ws_failures = 0  # sessions lost or refused in a row
+        self._ws_pending: dict[int, asyncio.Future[Ack]] = {}
+        self._ws_next_id = 0
+
+    async def __aenter__(self) -> SandGardenClient:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the command socket, and the session if the client opened it."""
+        if self._ws is not None:
+            await self._ws.close()
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=POOL_LIMIT_PER_HOST)
+            )
+        return self._session
+
+    def _socket(self) -> aiohttp.ClientWebSocketResponse | None:
+        if self._ws is not None and not self._ws.closed:
+            return self._ws
+        return None
+
+    @property
+    def transport(self) -> str:
+        """The link currently carrying commands and state."""
+        if self._socket() is not None:
+            return "websocket"
+        return "http+sse-delta" if self._use_delta() else "http+sse"
+
+    @property
+    def script_endpoints(self) -> tuple[str, ...]:
+        """The endpoints a script upload goes through on the current link."""
+        if self._socket() is not None:
+            return (API_SCRIPT,)
+        return (API_SCRIPT_BEGIN, API_SCRIPT_CHUNK, API_SCRIPT_END)
+
+    def _use_ws(self) -> bool:
+        """Whether to carry commands and state over the command socket."""
+        return not self._ws_failed and supported(self._advertised, "ws", WS_VERSION)
+
+    def _use_delta(self) -> bool:
+        """Whether to ask for compact delta frames instead of per-field events."""
+        return not self._delta_failed and supported(self._advertised, "delta", DELTA_VERSION)
+
+    # State
+
+    async def fetch_state(self) -> dict[str, Any]:
+        """Return ``/api/state`` as the device sent it."""
+        started = time.perf_counter()
+        try:
+            async with self._get_session().get(
+                f"{self.base_url}{API_STATE}",
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            ) as response:
+                if response.status != 200:
+                    raise CannotConnect(f"HTTP {response.status}")
+                data = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            self.stats.poll_errors += 1
+            raise CannotConnect(f"Error communicating with API: {err}") from err
+        finally:
+            self.stats.poll.observe(time.perf_counter() - started)
+        if isinstance(data, dict):
+            self._advertised = data
+        return data
+
+    async def get_state(self) -> SandGardenState:
+        """Return the typed device state."""
+        return SandGardenState.from_dict(await self.fetch_state())
+
+    # Commands
+
+    async def send(self, endpoint: str, body: dict[str, Any] | None = None) -> None:
+        """Send a command to ``endpoint``, on the command socket when it is open."""
+        if (ws := self._socket()) is not None:
+            await self._ws_request(ws, endpoint, body)
+        else:
+            await self._post(endpoint, json=body)
+        _LOGGER.debug("Sent command to %s: %s", endpoint, body)
+
+    async def set_speed(self, multiplier: float) -> None:
+        await self.send(API_SPEED, {"value": multiplier})
+
+    async def set_pattern(self, pattern: int) -> None:
+        await self.send(API_PATTERN, {"value": pattern})
+
+    async def set_auto_mode(self, enabled: bool) -> None:
+        await self.send(API_MODE, {"value": enabled})
+
+    async def set_running(self, running: bool) -> None:
+        await self.send(API_RUN, {"value": running})
+
+    async def command(self, command: str) -> None:
+        """Send a console command such as ``HOME``."""
+        await self.send(API_COMMAND, {"command": command})
+
+    async def set_led_effect(self, effect: int) -> None:
+        await self.send(API_LED_EFFECT, {"value": effect})
+
+    async def set_led_color(self, red: int, green: int, blue: int) -> None:
+        await self.send(API_LED_COLOR, {"r": red, "g": green, "b": blue})
+
+    async def set_led_brightness(self, brightness: int) -> None:
+        await self.send(API_LED_BRIGHTNESS, {"value": brightness})
+
+    async def reset(self) -> None:
+        """Restart the device."""
+        await self.send(API_RESET)
+
+    async def upload_script(self, source: str, slot: int | None = None) -> None:
+        """Upload a SandScript; the device compiles it and switches to it."""
+        payload = source.encode("utf-8")
+        if (ws := self._socket()) is not None:
+            body: dict[str, Any] = {"script": source}
+            if slot is not None:
+                body["slot"] = slot
+            await self._ws_request(ws, API_SCRIPT, body)
+        else:
+            begin: dict[str, Any] = {"length": len(payload)}
+            if slot is not None:
+                begin["slot"] = slot
+            await self._post(API_SCRIPT_BEGIN, json=begin)
+            await self._post(API_SCRIPT_CHUNK, data=payload)
+            await self._post(API_SCRIPT_END)
+        _LOGGER.debug("Uploaded %d byte script", len(payload))
+
+    async def _post(self, endpoint: str, **kwargs: Any) -> None:
+        """POST to the device, recording the round trip."""
+        started = time.perf_counter()
+        ok = False
+        try:
+            async with self._get_session().post(
+                f"{self.base_url}{endpoint}",
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                **kwargs,
+            ) as response:
+                if response.status != 200:
+                    message = await response.text()
+                    _LOGGER.error("Command failed with HTTP %s: %s", response.status, message)
+                    raise CommandError(endpoint, response.status, message)
+                ok = True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise CannotConnect(f"Error sending command: {err}") from err
+        finally:
+            self.stats.command(endpoint, time.perf_counter() - started, ok)
+
+    async def _ws_request(
+        self, ws: aiohttp.ClientWebSocketResponse, endpoint: str, body: dict[str, Any] | None
+    ) -> None:
+        """Send a request on the command socket and wait for its ack.
+
+        Requests are not serialized: concurrent callers pipeline theirs and
+        each waits for the ack carrying its own id.
+        """
+        self._ws_next_id += 1
+        request_id = self._ws_next_id
+        future: asyncio.Future[Ack] = asyncio.get_running_loop().create_future()
+        self._ws_pending[request_id] = future
+        started = time.perf_counter()
+        ok = False
+        try:
+            await ws.send_str(encode_request(request_id, endpoint, body))
+            ack = await asyncio.wait_for(future, timeout=self.timeout)
+            if not ack.ok:
+                _LOGGER.error("Command failed with HTTP %s: %s", ack.status, ack.error)
+                raise CommandError(endpoint, ack.status, ack.error)
+            ok = True
+        except asyncio.TimeoutError as err:
+            raise CannotConnect(f"No acknowledgement for {endpoint}") from err
+        except (aiohttp.ClientError, ConnectionResetError) as err:
+            raise CannotConnect(f"Error sending command: {err}") from err
+        finally:
+            self._ws_pending.pop(request_id, None)
+            self.stats.command(endpoint, time.perf_counter() - started, ok)
+
+    # Streams
+
+    async def iter_sse(self, path: str = API_EVENTS) -> AsyncIterator[SseEvent]:
+        """Yield the events of one SSE connection until it closes.
+
+        Status and telemetry events only appear on the per-field stream
+        (``/api/events``); their data is plain text.
+        """
+        async with self._get_session().get(
+            f"{self.base_url}{path}",
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=SSE_READ_TIMEOUT),
+        ) as response:
+            if response.status == 404:
+                raise NotSupported(path)
+            if response.status != 200:
+                raise CannotConnect(f"SSE connection failed with HTTP {response.status}")
+
+            _LOGGER.info("SSE connection established (%s)", path)
+            self.stats.connected(time.monotonic())
+            try:
+                event_type = "message"
+                async for line in response.content:
+                    received = time.perf_counter()
+                    line = line.decode("utf-8").strip()
+                    if not line:
+                        event_type = "message"  # a blank line ends the event
+                    elif line.startswith("event:"):
+                        event_type = line[6:].strip() or "message"
+                    elif line.startswith("data:"):
+                        self.stats.event(event_type, time.monotonic())
+                        yield SseEvent(event_type, line[5:].strip(), received)
+            finally:
+                self.stats.disconnected(time.monotonic())
+
+    async def listen(self, on_update: StateCallback, on_resync: Callable[[], None] | None = None) -> None:
+        """Pass state changes to ``on_update`` until cancelled.
+
+        The command socket or the delta stream is used when the last fetched
+        state advertised it, with per-field SSE events as the fallback. Lost
+        connections are retried every ``RETRY_DELAY`` seconds. ``on_resync``
+        is called when delta frames were missed and the full state should be
+        fetched again.
+        """
+        _LOGGER.info("Starting SSE listener for %s", self.base_url)
+        try:
+            while True:
+                use_ws = self._use_ws()
+                try:
+                    if use_ws:
+                        await self._listen_ws(on_update, on_resync)
+                    else:
+                        await self._listen_sse(self._use_delta(), on_update, on_resync)
+                except (SandGardenError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+                    self.stats.disconnected(time.monotonic())
+                    if use_ws:
+                        self._ws_failures += 1
+                        if self._ws_failures >= WS_MAX_FAILURES:
+                            _LOGGER.warning(
+                                "WebSocket failed %s times in a row (%s), using HTTP and SSE",
+                                self._ws_failures,
+                                err,
+                            )
+                            self._ws_failed = True
+                            continue
+                    _LOGGER.warning("SSE connection error: %s, retrying in %ss", err, RETRY_DELAY)
+                    await asyncio.sleep(RETRY_DELAY)
+                except Exception as err:  # pylint: disable=broad-except
+                    self.stats.disconnected(time.monotonic())
+                    _LOGGER.exception("Unexpected error in SSE listener: %s", err)
+                    await asyncio.sleep(RETRY_DELAY)
+        finally:
+            _LOGGER.info("SSE listener stopped")
+
+    async def _listen_sse(
+        self, delta: bool, on_update: StateCallback, on_resync: Callable[[], None] | None
+    ) -> None:
+        """Follow one SSE connection until it closes."""
+        stats = self.stats
+        self._delta_seq = None
+        try:
+            async with aclosing(self.iter_sse(API_EVENTS_DELTA if delta else API_EVENTS)) as events:
+                async for event in events:
+                    if event.event in SSE_TEXT_EVENTS:
+                        _LOGGER.debug("SSE %s: %s", event.event, event.data)
+                        continue
+                    try:
+                        data = json.loads(event.data)
+                        if event.event == "delta":
+                            data = self._track_delta(decode_delta(data), on_resync)
+                    except json.JSONDecodeError:
+                        stats.sse_parse_errors += 1
+                        _LOGGER.debug("SSE non-JSON data: %s", event.data)
+                        continue
+                    except ProtocolError as err:
+                        stats.sse_parse_errors += 1
+                        _LOGGER.warning("Bad delta frame (%s), using per-field events", err)
+                        self._delta_failed = True
+                        return
+                    stats.sse_parse.observe(time.perf_counter() - event.received)
+                    if isinstance(data, dict):
+                        self._deliver(on_update, data, event.received)
+        except NotSupported:
+            if not delta:
+                raise CannotConnect("SSE connection failed with HTTP 404") from None
+            _LOGGER.info("Device has no delta stream, using per-field events")
+            self._delta_failed = True
+
+    async def _listen_ws(self, on_update: StateCallback, on_resync: Callable[[], None] | None) -> None:
+        """Hold one command-socket session: acks for commands, deltas for state."""
+        stats = self.stats
+        try:
+            async with self._get_session().ws_connect(
+                f"ws://{self.host}{API_WS}", heartbeat=WS_HEARTBEAT, timeout=self.timeout
+            ) as ws:
+                _LOGGER.info("WebSocket connection established")
+                stats.connected(time.monotonic())
+                self._ws_failures = 0
+                self._ws = ws
+                self._delta_seq = None
+                self.socket_open.set()
+                async for message in ws:
+                    received = time.perf_counter()
+                    if message.type == aiohttp.WSMsgType.ERROR:
+                        _LOGGER.warning("WebSocket error: %s", ws.exception())
+                        break
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        continue
+                    try:
+                        decoded = decode_ws_message(message.data)
+                    except ProtocolError as err:
+                        stats.sse_parse_errors += 1
+                        _LOGGER.warning("Bad WebSocket message (%s), using HTTP and SSE", err)
+                        self._ws_failed = True
+                        break
+                    if isinstance(decoded, Ack):
+                        self._resolve_ack(decoded)
+                        continue
+                    stats.event("delta", time.monotonic())
+                    data = self._track_delta(decoded, on_resync)
+                    stats.sse_parse.observe(time.perf_counter() - received)
+                    self._deliver(on_update, data, received)
+        except aiohttp.WSServerHandshakeError as err:
+            if err.status != 404:
+                raise CannotConnect(f"WebSocket handshake failed with HTTP {err.status}") from err
+            _LOGGER.info("Device has no command socket, using HTTP and SSE")
+            self._ws_failed = True
+        finally:
+            self._ws = None
+            self.socket_open.clear()
+            self._fail_pending("WebSocket closed")
+            stats.disconnected(time.monotonic())
+
+    def _resolve_ack(self, ack: Ack) -> None:
+        if ack.id is not None:
+            future = self._ws_pending.get(ack.id)
+        elif not ack.ok:
+            # The device could not read the id (a malformed or fragmented
+            # request). Acks come in request order, so it answers the oldest
+            # request still waiting.
+            future = next((f for f in self._ws_pending.values() if not f.done()), None)
+        else:
+            future = None
+        if future is None:
+            _LOGGER.debug("Unmatched WebSocket ack: %s", ack)
+        elif not future.done():
+            future.set_result(ack)
+
+    def _fail_pending(self, reason: str) -> None:
+        """Fail the requests still waiting for an ack; they may not have run."""
+        for future in self._ws_pending.values():
+            if not future.done():
+                future.set_exception(CannotConnect(reason))
+        self._ws_pending.clear()
+
+    def _deliver(self, on_update: StateCallback, data: dict[str, Any], received: float) -> None:
+        on_update(data)
+        self.stats.sse_state_write.observe(time.perf_counter() - received)
+        _LOGGER.debug("Pushed update: %s", data)
+
+    def _track_delta(self, delta: Delta, on_resync: Callable[[], None] | None) -> dict[str, Any]:
+        """Track a delta frame's sequence, asking for a resync if a frame was missed."""
+        if not delta.full and self._delta_seq is not None and delta.seq != self._delta_seq + 1:
+            _LOGGER.debug("Delta frames %s..%s missed, refreshing", self._delta_seq + 1, delta.seq - 1)
+            if on_resync is not None:
+                on_resync()
+        self._delta_seq = delta.seq
+        return delta.state
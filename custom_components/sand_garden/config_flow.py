@@ -4,7 +4,6 @@ from __future__ import annotations
 import logging
 from typing import Any
 
-import aiohttp
 import voluptuous as vol
 
 from homeassistant import config_entries
@@ -13,40 +12,49 @@ from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .const import API_STATE, DEFAULT_NAME, DOMAIN
+from .client import SandGardenError
+from .const import CONF_PROBE_HOSTS, DEFAULT_NAME, DOMAIN
+from .probe import known_addresses, parse_hosts, probe
 
 _LOGGER = logging.getLogger(__name__)
 
 STEP_USER_DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_HOST, default="sand-garden.local"): str,
+        vol.Optional(CONF_PROBE_HOSTS, default=""): str,
     }
 )
 
 
-async def validate_input(hass: HomeAssistant, data: dict[str, Any]) -> dict[str, Any]:
+async def validate_input(
+    hass: HomeAssistant, data: dict[str, Any], skip: set[str] | None = None
+) -> dict[str, Any]:
     """Validate the user input allows us to connect.
 
     Data has the keys from STEP_USER_DATA_SCHEMA with values provided by the user.
+    The entered host, its addresses and the extra hosts are probed at once and
+    the first device that answers is returned with its state, under the
+    entered host if it or one of its addresses answered. Hosts in ``skip``
+    (already configured) and their addresses are only tried when entered as
+    the host.
     """
-    host = data[CONF_HOST]
-    url = f"http://{host}{API_STATE}"
-
-    session = async_get_clientsession(hass)
+    host = data[CONF_HOST].strip()
+    try:
+        extra = parse_hosts(data.get(CONF_PROBE_HOSTS, ""))
+    except ValueError as err:
+        raise InvalidHosts(str(err)) from err
 
     try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-            if response.status != 200:
-                raise CannotConnect(f"HTTP {response.status}")
-            await response.json()
-    except aiohttp.ClientError as err:
-        _LOGGER.error("Failed to connect to %s: %s", url, err)
+        known = await known_addresses(skip or ())
+        result = await probe(async_get_clientsession(hass), host, extra, skip=known)
+    except SandGardenError as err:
+        _LOGGER.error("Failed to connect to %s: %s", host, err)
         raise CannotConnect from err
     except Exception as err:
         _LOGGER.exception("Unexpected exception")
         raise CannotConnect from err
 
-    return {"title": DEFAULT_NAME}
+    return {"title": DEFAULT_NAME, "host": result.host, "state": result.state}
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -62,16 +70,22 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         if user_input is not None:
             try:
-                info = await validate_input(self.hass, user_input)
+                info = await validate_input(
+                    self.hass, user_input, set(self._async_current_ids())
+                )
+            except InvalidHosts:
+                errors[CONF_PROBE_HOSTS] = "invalid_probe_hosts"
             except CannotConnect:
                 errors["base"] = "cannot_connect"
             except Exception:  # pylint: disable=broad-except
                 _LOGGER.exception("Unexpected exception")
                 errors["base"] = "unknown"
             else:
-                await self.async_set_unique_id(user_input[CONF_HOST])
+                await self.async_set_unique_id(info["host"])
                 self._abort_if_unique_id_configured()
-                return self.async_create_entry(title=info["title"], data=user_input)
+                return self.async_create_entry(
+                    title=info["title"], data={CONF_HOST: info["host"]}
+                )
 
         return self.async_show_form(
             step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors
@@ -80,3 +94,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
 class CannotConnect(Exception):
     """Error to indicate we cannot connect."""
+
+
+class InvalidHosts(Exception):
+    """Error to indicate the extra hosts could not be parsed."""
@@ -4,6 +4,7 @@ DOMAIN = "sand_garden"
 
 # Configuration
 CONF_HOST = "host"
+CONF_PROBE_HOSTS = "probe_hosts"  # extra hosts and subnets to try during setup; not stored
 DEFAULT_NAME = "Sand Garden"
 
 # API endpoints
@@ -17,7 +18,13 @@ API_LED_EFFECT = "/api/led/effect"
 API_LED_COLOR = "/api/led/color"
 API_LED_BRIGHTNESS = "/api/led/brightness"
 API_RESET = "/api/reset"
+API_SCRIPT = "/api/script"  # whole script in one command-socket request
+API_SCRIPT_BEGIN = "/api/script/begin"
+API_SCRIPT_CHUNK = "/api/script/chunk"
+API_SCRIPT_END = "/api/script/end"
 API_EVENTS = "/api/events"
+API_EVENTS_DELTA = "/api/events/delta"
+API_WS = "/api/ws"
 
 # Patterns (1-based index as per device API)
 PATTERNS = {
@@ -67,5 +74,18 @@ SPEED_MIN = 0.01
 SPEED_MAX = 5.0
 SPEED_STEP = 0.01
 
+# Pattern previews
+PREVIEW_CACHE_DIR = ".storage/sand_garden_previews"
+PREVIEW_CACHE_SIZE = 64  # rendered previews kept on disk
+PREVIEW_URL = "/api/sand_garden/preview/{key}.svg"
+PREVIEW_WORKERS = 4
+PREVIEW_TOKEN_INTERVAL = 300  # seconds between preview access token changes, as for camera snapshots
+
+# Playlists
+PLAYLIST_RETRY_DELAY = 10  # seconds before retrying a failed switch
+PLAYLIST_MAX_RETRIES = 6  # failed retries of one switch before the playlist stops
+PLAYLIST_SWITCH_LEAD_MAX = 2.0  # seconds; cap on starting a switch early
+
 # Update intervals
 SCAN_INTERVAL = 30  # seconds (fallback if SSE disconnects)
+STATS_SCAN_INTERVAL = 60  # seconds between diagnostic sensor samples
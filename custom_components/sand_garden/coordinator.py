@@ -6,13 +6,13 @@ import logging
 from datetime import timedelta
 from typing import Any
 
-import aiohttp
-
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
-from .const import API_EVENTS, API_STATE, DOMAIN, SCAN_INTERVAL
+from .client import SandGardenClient, SandGardenError
+from .const import DOMAIN, SCAN_INTERVAL
+from .scheduler import PlaylistScheduler
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,10 +23,13 @@ class SandGardenCoordinator(DataUpdateCoordinator):
     def __init__(self, hass: HomeAssistant, host: str) -> None:
         """Initialize."""
         self.host = host
-        self.base_url = f"http://{host}"
-        self._session = async_get_clientsession(hass)
-        self._sse_task: asyncio.Task | None = None
-        self._stop_sse = False
+        self.client = SandGardenClient(host, async_get_clientsession(hass))
+        self.stats = self.client.stats
+        self._listen_task: asyncio.Task | None = None
+        # The device does not report its SandScript, so remember the last one
+        # sent from here; the pattern previews are drawn from it.
+        self.script_source: str | None = None
+        self.playlist = PlaylistScheduler(hass, self)
 
         super().__init__(
             hass,
@@ -35,120 +38,78 @@ class SandGardenCoordinator(DataUpdateCoordinator):
             update_interval=timedelta(seconds=SCAN_INTERVAL),
         )
 
+    @property
+    def transport(self) -> str:
+        """The link currently carrying commands and state."""
+        return self.client.transport
+
+    @property
+    def script_endpoints(self) -> tuple[str, ...]:
+        """The endpoints a script upload goes through on the current link."""
+        return self.client.script_endpoints
+
     async def _async_update_data(self) -> dict[str, Any]:
         """Fetch data from API endpoint.
 
         This is called periodically as a fallback and for initial setup.
-        Real-time updates come from SSE.
+        Real-time updates come from SSE or the command socket.
         """
         try:
-            url = f"{self.base_url}{API_STATE}"
-            async with self._session.get(
-                url, timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                if response.status != 200:
-                    raise UpdateFailed(f"HTTP {response.status}")
-                data = await response.json()
-                _LOGGER.debug("Fetched state: %s", data)
-                return data
-        except aiohttp.ClientError as err:
-            raise UpdateFailed(f"Error communicating with API: {err}") from err
+            data = await self.client.fetch_state()
+        except SandGardenError as err:
+            raise UpdateFailed(str(err)) from err
+        _LOGGER.debug("Fetched state: %s", data)
+        return data
 
     async def async_config_entry_first_refresh(self) -> None:
         """Refresh data for the first time and start SSE listener."""
         await super().async_config_entry_first_refresh()
-        # Start SSE listener after initial refresh
-        if self._sse_task is None or self._sse_task.done():
-            self._stop_sse = False
-            self._sse_task = asyncio.create_task(self._listen_sse())
+        # Start SSE listener after initial refresh; it picks the transport the
+        # device advertised in that state
+        if self._listen_task is None or self._listen_task.done():
+            self._listen_task = asyncio.create_task(
+                self.client.listen(self._push_update, self._resync)
+            )
 
     async def async_shutdown(self) -> None:
         """Shutdown the coordinator."""
-        self._stop_sse = True
-        if self._sse_task and not self._sse_task.done():
-            self._sse_task.cancel()
+        await self.playlist.async_stop()
+        if self._listen_task and not self._listen_task.done():
+            self._listen_task.cancel()
             try:
-                await self._sse_task
+                await self._listen_task
             except asyncio.CancelledError:
                 pass
-
-    async def _listen_sse(self) -> None:
-        """Listen to Server-Sent Events for real-time updates."""
-        url = f"{self.base_url}{API_EVENTS}"
-        _LOGGER.info("Starting SSE listener for %s", url)
-
-        while not self._stop_sse:
-            try:
-                async with self._session.get(
-                    url,
-                    timeout=aiohttp.ClientTimeout(total=None, sock_read=300),
-                ) as response:
-                    if response.status != 200:
-                        _LOGGER.warning("SSE connection failed with HTTP %s", response.status)
-                        await asyncio.sleep(10)
-                        continue
-
-                    _LOGGER.info("SSE connection established")
-                    async for line in response.content:
-                        if self._stop_sse:
-                            break
-
-                        line = line.decode("utf-8").strip()
-                        if not line:
-                            continue
-
-                        # Parse SSE format: "event: <type>" and "data: <json>"
-                        if line.startswith("event:"):
-                            continue  # We'll process on data line
-
-                        if line.startswith("data:"):
-                            data_str = line[5:].strip()
-                            try:
-                                # Try to parse as JSON
-                                import json
-                                data = json.loads(data_str)
-
-                                # Update coordinator data with new values
-                                if isinstance(data, dict):
-                                    # Merge new data with existing data
-                                    if self.data:
-                                        self.data.update(data)
-                                    else:
-                                        self.data = data
-
-                                    # Notify listeners
-                                    self.async_set_updated_data(self.data)
-                                    _LOGGER.debug("SSE update: %s", data)
-                            except json.JSONDecodeError:
-                                _LOGGER.debug("SSE non-JSON data: %s", data_str)
-                                pass
-
-            except asyncio.CancelledError:
-                _LOGGER.debug("SSE listener cancelled")
-                break
-            except aiohttp.ClientError as err:
-                if not self._stop_sse:
-                    _LOGGER.warning("SSE connection error: %s, retrying in 10s", err)
-                    await asyncio.sleep(10)
-            except Exception as err:
-                if not self._stop_sse:
-                    _LOGGER.exception("Unexpected error in SSE listener: %s", err)
-                    await asyncio.sleep(10)
-
-        _LOGGER.info("SSE listener stopped")
+        await self.client.close()
+
+    @callback
+    def _push_update(self, data: dict[str, Any]) -> None:
+        """Merge pushed state into the current data and notify listeners."""
+        if self.data:
+            self.data.update(data)
+        else:
+            self.data = data
+        self.async_set_updated_data(self.data)
+
+    @callback
+    def _resync(self) -> None:
+        """Fetch the full state after missed delta frames."""
+        self.hass.async_create_task(self.async_request_refresh())
 
     async def async_send_command(self, endpoint: str, data: dict[str, Any] | None = None) -> None:
         """Send a command to the device."""
-        url = f"{self.base_url}{endpoint}"
         try:
-            async with self._session.post(
-                url,
-                json=data,
-                timeout=aiohttp.ClientTimeout(total=10),
-            ) as response:
-                if response.status != 200:
-                    _LOGGER.error("Command failed with HTTP %s: %s", response.status, await response.text())
-                    raise UpdateFailed(f"HTTP {response.status}")
-                _LOGGER.debug("Sent command to %s: %s", endpoint, data)
-        except aiohttp.ClientError as err:
-            raise UpdateFailed(f"Error sending command: {err}") from err
+            await self.client.send(endpoint, data)
+        except SandGardenError as err:
+            raise UpdateFailed(str(err)) from err
+
+    async def async_upload_script(self, source: str, slot: int | None = None) -> None:
+        """Upload a SandScript; the device compiles it and switches to it."""
+        try:
+            await self.client.upload_script(source, slot)
+        except SandGardenError as err:
+            raise UpdateFailed(str(err)) from err
+        self.script_source = source
+        # Let the pattern select redraw the SandScript preview now rather than
+        # on the next pushed state
+        self.async_update_listeners()
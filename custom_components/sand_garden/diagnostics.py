@@ -0,0 +1,25 @@
+"""Diagnostics support for Sand Garden."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import SandGardenCoordinator
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: SandGardenCoordinator = hass.data[DOMAIN][entry.entry_id]
+
+    return {
+        "entry": dict(entry.data),
+        "state": coordinator.data,
+        "last_update_success": coordinator.last_update_success,
+        "transport": coordinator.transport,
+        "stats": coordinator.stats.as_dict(),
+    }
@@ -0,0 +1,178 @@
+"""Pattern preview gallery for Sand Garden."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+from http import HTTPStatus
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+import secrets
+
+from aiohttp import web
+
+from homeassistant.components.http import KEY_AUTHENTICATED, HomeAssistantView
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    DOMAIN,
+    PATTERNS,
+    PREVIEW_CACHE_DIR,
+    PREVIEW_CACHE_SIZE,
+    PREVIEW_TOKEN_INTERVAL,
+    PREVIEW_URL,
+    PREVIEW_WORKERS,
+)
+from .patterns import SANDSCRIPT_PATTERN
+from .preview import PreviewCache, is_preview_key, preview_key, render_preview
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_GALLERY = f"{DOMAIN}_gallery"
+
+
+class PreviewGallery:
+    """Render previews in a process pool and serve them from the disk cache.
+
+    Preview URLs carry an access token, like camera snapshots: the frontend
+    loads entity pictures without an auth header. The token changes every
+    ``PREVIEW_TOKEN_INTERVAL`` seconds and the previous one stays valid
+    until the next change, so a page that just rendered keeps working.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the gallery."""
+        self.hass = hass
+        self.cache = PreviewCache(Path(hass.config.path(PREVIEW_CACHE_DIR)), PREVIEW_CACHE_SIZE)
+        self.access_tokens: deque[str] = deque([secrets.token_hex(32)], 2)
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = asyncio.Lock()
+        self._listeners: list[CALLBACK_TYPE] = []
+        self._unsub_rotate: CALLBACK_TYPE | None = None
+
+    async def async_keys(self, script: str | None = None) -> dict[int, str]:
+        """Return the preview key per pattern id, rendering what is not cached.
+
+        The SandScript slot only gets a preview once its source is known.
+        """
+        keys = {
+            pattern_id: preview_key(pattern_id, script)
+            for pattern_id in PATTERNS
+            if pattern_id != SANDSCRIPT_PATTERN or script is not None
+        }
+        async with self._lock:
+            missing = await self.hass.async_add_executor_job(self._missing, keys)
+            rendered: dict[str, bytes] = {}
+            if missing:
+                # Submitting may spawn the workers, so it happens off the event
+                # loop; the renders themselves are awaited without a thread.
+                futures = await self.hass.async_add_executor_job(self._submit, missing, script)
+                results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures.values()))
+                for pattern_id, data in zip(futures, results):
+                    if data is None:
+                        _LOGGER.debug("No preview for pattern %s: script does not compile", pattern_id)
+                        continue
+                    rendered[missing[pattern_id]] = data
+                await self.hass.async_add_executor_job(self._store, rendered)
+                _LOGGER.debug("Rendered %d pattern previews", len(missing))
+        return {
+            pattern_id: key
+            for pattern_id, key in keys.items()
+            if pattern_id not in missing or key in rendered
+        }
+
+    def url(self, key: str) -> str:
+        """Return the URL of the preview ``key`` with the current access token."""
+        return f"{PREVIEW_URL.format(key=key)}?token={self.access_tokens[-1]}"
+
+    def _missing(self, keys: dict[int, str]) -> dict[int, str]:
+        return {pattern_id: key for pattern_id, key in keys.items() if key not in self.cache}
+
+    def _submit(self, missing: dict[int, str], script: str | None) -> dict[int, Future[bytes | None]]:
+        if self._pool is None:
+            # Spawn, not fork: Home Assistant runs many threads.
+            self._pool = ProcessPoolExecutor(
+                max_workers=min(PREVIEW_WORKERS, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return {
+            pattern_id: self._pool.submit(
+                render_preview, pattern_id, script if pattern_id == SANDSCRIPT_PATTERN else None
+            )
+            for pattern_id in missing
+        }
+
+    def _store(self, rendered: dict[str, bytes]) -> None:
+        for key, data in rendered.items():
+            self.cache.put(key, data)
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Call ``update_callback`` whenever the access token changes."""
+        if self._unsub_rotate is None:
+            self._unsub_rotate = async_track_time_interval(
+                self.hass, self._async_rotate_token, timedelta(seconds=PREVIEW_TOKEN_INTERVAL)
+            )
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+            if not self._listeners and self._unsub_rotate is not None:
+                self._unsub_rotate()
+                self._unsub_rotate = None
+
+        return remove_listener
+
+    @callback
+    def _async_rotate_token(self, _now: datetime) -> None:
+        self.access_tokens.append(secrets.token_hex(32))
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+class PreviewView(HomeAssistantView):
+    """Serve cached pattern previews to logged-in users or with an access token."""
+
+    url = PREVIEW_URL
+    name = "api:sand_garden:preview"
+    requires_auth = False  # checked in get(), which also accepts the token
+
+    def __init__(self, gallery: PreviewGallery) -> None:
+        """Initialize the view."""
+        self._gallery = gallery
+
+    async def get(self, request: web.Request, key: str) -> web.Response:
+        """Return the preview image for ``key``."""
+        if not (request[KEY_AUTHENTICATED] or request.query.get("token") in self._gallery.access_tokens):
+            return web.Response(status=HTTPStatus.UNAUTHORIZED)
+        if not is_preview_key(key):
+            return web.Response(status=HTTPStatus.NOT_FOUND)
+        data = await self._gallery.hass.async_add_executor_job(self._gallery.cache.get, key)
+        if data is None:
+            return web.Response(status=HTTPStatus.NOT_FOUND)
+        return web.Response(
+            body=data,
+            content_type="image/svg+xml",
+            headers={"Cache-Control": "private, max-age=31536000, immutable"},
+        )
+
+
+@callback
+def async_get_gallery(hass: HomeAssistant) -> PreviewGallery:
+    """Return the shared gallery, registering its view on first use."""
+    if (gallery := hass.data.get(DATA_GALLERY)) is None:
+        gallery = hass.data[DATA_GALLERY] = PreviewGallery(hass)
+        hass.http.register_view(PreviewView(gallery))
+    return gallery
@@ -0,0 +1,148 @@
+"""Motion model mirroring orchestrateMotion() and moveToPosition().
+
+Like ``sandscript.py`` this module has no Home Assistant dependencies so the
+host-side tools can import it directly. It answers two questions about a
+sequence of pattern targets: where the device actually goes (angular targets
+are wrapped and reached by the shortest way round, radial targets are
+clamped) and how long each blocking move takes (both axes finish together,
+the angular axis is derated with radius and the radial motor also has to
+absorb the rack coupling of the angular axis). The plural variants take numpy
+arrays for the tools that time whole traces; numpy is only imported when they
+are called, so the integration does not need it.
+"""
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Iterable, Iterator
+
+try:
+    from .sandscript import MAX_R_STEPS, STEPS_PER_A_AXIS_REV, Positions
+except ImportError:  # loaded flat by the host tools in tools/
+    from sandscript import MAX_R_STEPS, STEPS_PER_A_AXIS_REV, Positions
+
+STEPS_PER_MM = 70.0
+MAX_SPEED_A_MOTOR = 550.0
+MAX_SPEED_R_MOTOR = 550.0
+ANGULAR_FLOOR_SPEED = 150.0  # angular max speed at the rim, before the multiplier
+MIN_SPEED_MULTIPLIER = 0.1
+MAX_SPEED_MULTIPLIER = 3.0
+
+HALF_REV = STEPS_PER_A_AXIS_REV // 2
+_RAD_PER_STEP = 2.0 * math.pi / STEPS_PER_A_AXIS_REV
+
+
+def modulus(x: int, y: int = STEPS_PER_A_AXIS_REV) -> int:
+    """Wrap ``x`` into ``[0, y)`` like the firmware's modulus()."""
+    return x % y
+
+
+def shortest_path(current: int, target: int, wrap: int = STEPS_PER_A_AXIS_REV) -> int:
+    """Signed angular move findShortestPathToPosition() picks (ties go forward)."""
+    forward = (target - current) % wrap
+    backward = -((current - target) % wrap)
+    return forward if abs(forward) <= abs(backward) else backward
+
+
+def settle(current: Positions, target: Positions) -> tuple[Positions, int]:
+    """Apply one orchestrateMotion() call.
+
+    Returns the new current position and the signed angular steps taken.
+    """
+    delta = shortest_path(current.angular, modulus(target.angular))
+    radial = min(max(target.radial, 0), MAX_R_STEPS)
+    return Positions(radial, modulus(current.angular + delta)), delta
+
+
+def clamp_multiplier(multiplier: float) -> float:
+    """Clamp a speed multiplier the way onSpeedMultiplierChanged() does."""
+    return min(max(multiplier, MIN_SPEED_MULTIPLIER), MAX_SPEED_MULTIPLIER)
+
+
+# The formulas below are shared by the scalar and the array variants, which
+# differ only in the elementwise maximum they pass in.
+
+
+def _max_angular_speed(radial: Any, multiplier: float, maximum: Callable[[Any, Any], Any]) -> Any:
+    top = MAX_SPEED_A_MOTOR * multiplier
+    floor = top * (ANGULAR_FLOOR_SPEED / MAX_SPEED_A_MOTOR)
+    return maximum(top - (top - floor) / MAX_R_STEPS * radial, floor)
+
+
+def _move_time(
+    radial: Any, d_angular: Any, d_radial: Any, multiplier: float, maximum: Callable[[Any, Any], Any]
+) -> Any:
+    angular_time = abs(d_angular) / _max_angular_speed(radial, multiplier, maximum)
+    radial_time = abs(d_angular - d_radial) / (MAX_SPEED_R_MOTOR * multiplier)
+    return maximum(angular_time, radial_time)
+
+
+def max_angular_speed(radial: float, multiplier: float = 1.0) -> float:
+    """Angular speed cap (steps/s) at ``radial``, derated linearly to the rim floor."""
+    return _max_angular_speed(radial, multiplier, max)
+
+
+def move_time(radial: float, d_angular: float, d_radial: float, multiplier: float = 1.0) -> float:
+    """Seconds one blocking move takes when it starts at ``radial``.
+
+    The radial motor turns ``d_angular - d_radial`` steps (calcRadialSteps),
+    and whichever axis is slower at its cap sets the duration.
+    """
+    return _move_time(radial, d_angular, d_radial, multiplier, max)
+
+
+def max_angular_speeds(radial: Any, multiplier: float = 1.0) -> Any:
+    """``max_angular_speed()`` over an array of radial positions."""
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    return _max_angular_speed(np.asarray(radial, dtype=np.float64), multiplier, np.maximum)
+
+
+def move_times(radial: Any, d_angular: Any, d_radial: Any, multiplier: float = 1.0) -> Any:
+    """``move_time()`` over arrays of moves, one element per move."""
+    import numpy as np  # pylint: disable=import-outside-toplevel
+
+    return _move_time(
+        np.asarray(radial, dtype=np.float64),
+        np.asarray(d_angular, dtype=np.float64),
+        np.asarray(d_radial, dtype=np.float64),
+        multiplier,
+        np.maximum,
+    )
+
+
+def unwrap(targets: Iterable[Positions], start: Positions = Positions(0, 0)) -> Iterator[tuple[int, int]]:
+    """Yield ``(radial, angular)`` per target with the angle unwrapped.
+
+    The unwrapped angle is the running sum of the shortest-path moves, so
+    consecutive samples differ exactly by what the angular motor turns.
+    """
+    current = start
+    angular = start.angular
+    for target in targets:
+        current, delta = settle(current, target)
+        angular += delta
+        yield current.radial, angular
+
+
+def run_time(
+    targets: Iterable[Positions], start: Positions = Positions(0, 0), multiplier: float = 1.0
+) -> tuple[float, int]:
+    """Total motion time in seconds and the number of non-empty moves."""
+    current = start
+    seconds = 0.0
+    moves = 0
+    for target in targets:
+        settled, delta = settle(current, target)
+        d_radial = settled.radial - current.radial
+        if delta or d_radial:
+            seconds += move_time(current.radial, delta, d_radial, multiplier)
+            moves += 1
+        current = settled
+    return seconds, moves
+
+
+def to_xy_mm(radial: float, angular: float) -> tuple[float, float]:
+    """Cartesian position in millimetres for a (radial, angular) step pair."""
+    r_mm = radial / STEPS_PER_MM
+    theta = angular * _RAD_PER_STEP
+    return r_mm * math.cos(theta), r_mm * math.sin(theta)
@@ -0,0 +1,544 @@
+"""Built-in pattern generators ported from sand-garden.ino.
+
+Each class reproduces one ``pattern_*`` function, including its static state
+and integer step arithmetic, so host tools can replay what the table draws
+without the hardware. Geometry helpers (drawLine, nGonGenerator,
+translatePoints) keep the firmware's quirks such as the vertical-line
+rotation and the ``(i + 1)`` stepover. Maths runs in double precision, so a
+point can occasionally land one step away from the ESP32's float result.
+
+Two differences from the device are deliberate: every generator owns its own
+drawLine state (the firmware shares one, so switching patterns mid-line
+finishes the old line first) and the random walks use a seeded
+``random.Random`` instead of the analog-noise seed.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+import math
+import random
+from typing import Callable, Iterator
+
+try:
+    from .motion import settle
+    from .sandscript import MAX_R_STEPS, STEPS_PER_A_AXIS_REV, Positions, f32
+except ImportError:  # loaded flat by the host tools in tools/
+    from motion import settle
+    from sandscript import MAX_R_STEPS, STEPS_PER_A_AXIS_REV, Positions, f32
+
+SANDSCRIPT_PATTERN = 18
+
+
+def _c_round(value: float) -> int:
+    """round() from <math.h>: halves go away from zero."""
+    return int(math.floor(value + 0.5)) if value >= 0 else int(math.ceil(value - 0.5))
+
+
+def _c_int(value: float) -> int:
+    """Float to int conversion; non-finite values collapse to 0."""
+    return int(value) if math.isfinite(value) else 0
+
+
+def _c_div(a: float, b: float) -> float:
+    if b == 0.0:
+        if a == 0.0 or math.isnan(a):
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def degrees_to_steps(degrees: float) -> int:
+    """convertDegreesToSteps()."""
+    return _c_round(degrees * STEPS_PER_A_AXIS_REV / 360.0)
+
+
+def radians_to_steps(radians: float) -> int:
+    """convertRadiansToSteps()."""
+    return _c_round(radians * STEPS_PER_A_AXIS_REV / (2.0 * math.pi))
+
+
+def steps_to_radians(steps: float) -> float:
+    """convertStepsToRadians()."""
+    return steps * 2.0 * math.pi / STEPS_PER_A_AXIS_REV
+
+
+class LineDrawer:
+    """drawLine(): emit a straight cartesian line one point per call."""
+
+    def __init__(self) -> None:
+        self._points: list[Positions] = []
+        self._out = 0
+        self._new_line = True
+
+    def __call__(self, point0: Positions, point1: Positions, resolution: int = 100) -> Positions:
+        if self._new_line:
+            self._points = self._build(point0, point1, resolution)
+            self._new_line = False
+            self._out = 0
+        output = Positions(0, 0)
+        if self._out < len(self._points):
+            output = self._points[self._out]
+            self._out += 1
+        if self._out >= len(self._points):
+            self._new_line = True
+        return output
+
+    @staticmethod
+    def _build(p0: Positions, p1: Positions, resolution: int) -> list[Positions]:
+        count = min(max(resolution, 0), 100)
+        # Vertical lines have an undefined slope, so rotate them a quarter turn and rotate back after.
+        comparison = (STEPS_PER_A_AXIS_REV - max(p0.angular, p1.angular)) - min(p0.angular, p1.angular)
+        rotated = degrees_to_steps(-0.5) <= comparison <= degrees_to_steps(0.5)
+        shift = degrees_to_steps(90) if rotated else 0
+        a0, a1 = p0.angular + shift, p1.angular + shift
+
+        x0 = p0.radial * math.cos(steps_to_radians(a0))
+        y0 = p0.radial * math.sin(steps_to_radians(a0))
+        x1 = p1.radial * math.cos(steps_to_radians(a1))
+        y1 = p1.radial * math.sin(steps_to_radians(a1))
+        slope = _c_div(y1 - y0, x1 - x0)
+        intercept = y0 - slope * x0
+        if -100.0 < intercept < 100.0:
+            count = 100  # lines through the centre need the full resolution
+
+        stepover = (x1 - x0) / count if count else 0.0
+        points = []
+        for i in range(count):
+            if i == 0:
+                radial, angular = p0.radial, a0
+            elif i == count - 1:
+                radial, angular = p1.radial, a1
+            else:
+                x = x0 + (i + 1) * stepover
+                y = slope * x + intercept
+                theta = math.atan2(y, x)
+                if theta < 0:
+                    theta += 2.0 * math.pi
+                radial = _c_int(math.sqrt(x * x + y * y))
+                angular = radians_to_steps(theta) if math.isfinite(theta) else 0
+            points.append(Positions(radial, angular - shift))
+        return points
+
+
+def translate_points(points: list[Positions], vector: Positions) -> list[Positions]:
+    """translatePoints(): shift polar points by a polar vector."""
+    if vector.angular == 0 and vector.radial == 0:
+        return list(points)
+    cx = vector.radial * math.cos(steps_to_radians(vector.angular))
+    cy = vector.radial * math.sin(steps_to_radians(vector.angular))
+    moved = []
+    for point in points:
+        x = point.radial * math.cos(steps_to_radians(point.angular)) + cx
+        y = point.radial * math.sin(steps_to_radians(point.angular)) + cy
+        theta = math.atan2(y, x)
+        if theta < 0:
+            theta += 2.0 * math.pi
+        moved.append(Positions(_c_round(math.sqrt(x * x + y * y)), radians_to_steps(theta)))
+    return moved
+
+
+def ngon(vertices: int, center: Positions, radius: int, rotation_deg: float = 0.0) -> list[Positions]:
+    """nGonGenerator(): vertices of a regular polygon."""
+    angle_step = STEPS_PER_A_AXIS_REV // vertices
+    rotation = degrees_to_steps(rotation_deg)
+    points = [Positions(radius, i * angle_step + rotation) for i in range(vertices)]
+    if center.radial != 0:
+        points = translate_points(points, center)
+    return points
+
+
+class Pattern(ABC):
+    """Base class: call with the current position, get the next target."""
+
+    @abstractmethod
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        """Return the next target; ``restart`` resets the pattern's state first."""
+
+
+class SimpleSpiral(Pattern):
+    """pattern_SimpleSpiral: grows outward, then inward."""
+
+    _ANGLE_STEP = degrees_to_steps(360.0 / 100.0)
+
+    def __init__(self) -> None:
+        self.radial_step = MAX_R_STEPS // 1000
+
+    def _advance(self, current: Positions) -> Positions:
+        angular = current.angular + self._ANGLE_STEP
+        radial = current.radial + self.radial_step
+        if radial > MAX_R_STEPS or radial < 0:
+            self.radial_step *= -1
+            radial += 2 * self.radial_step
+        return Positions(radial, angular)
+
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        return self._advance(current)
+
+
+class WavySpiral(SimpleSpiral):
+    """pattern_WavySpiral: the simple spiral with a sinusoidal radius."""
+
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        target = self._advance(current)
+        wave = _c_int(200.0 * math.sin(8 * steps_to_radians(target.angular)))
+        return Positions(target.radial + wave, target.angular)
+
+
+class AccidentalButterfly(SimpleSpiral):
+    """pattern_AccidentalButterfly: wavy spiral with an angular wobble."""
+
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        target = self._advance(current)
+        theta = steps_to_radians(target.angular)
+        r_offset = _c_int(200.0 * math.sin(8 * theta))
+        a_offset = _c_int(40.0 * math.cos(3 * theta))
+        return Positions(target.radial + r_offset, target.angular + a_offset)
+
+
+class Cardioids(Pattern):
+    """pattern_Cardioids: big radial strides every 43 degrees."""
+
+    def __init__(self) -> None:
+        self.direction = 1
+        self.first_run = True
+
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        if self.first_run or restart:
+            self.first_run = False
+            return Positions(0, 0)
+        radial_step = MAX_R_STEPS // 8
+        angular = current.angular + degrees_to_steps(43)
+        radial = current.radial + self.direction * radial_step
+        if not 0 <= radial <= MAX_R_STEPS:
+            self.direction *= -1
+            radial = current.radial + self.direction * radial_step
+        return Positions(radial, angular)
+
+
+class _RotatingPolygon(Pattern):
+    """Shared walk for pattern_RotatingSquares and pattern_HexagonVortex."""
+
+    def __init__(self, vertices: list[Positions], segments: int, angle_shift: int) -> None:
+        self.vertices = vertices
+        self.segments = segments
+        self.angle_shift = angle_shift
+        self.step = 0
+        self.line = LineDrawer()
+
+    def _next_round(self) -> None:
+        self.vertices = [Positions(p.radial, p.angular + self.angle_shift) for p in self.vertices]
+
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        count = len(self.vertices)
+        if self.step < count:
+            end = self.vertices[(self.step + 1) % count]
+            target = self.line(self.vertices[self.step], end, self.segments)
+            if target == end:
+                self.step += 1
+            return target
+        self.step = 0
+        self._next_round()
+        return current
+
+
+class RotatingSquares(_RotatingPolygon):
+    """pattern_RotatingSquares: a full-size square rotated 10 degrees per lap."""
+
+    def __init__(self) -> None:
+        corners = [Positions(7000, degrees_to_steps(angle)) for angle in (0, 90, 180, 270)]
+        super().__init__(corners, 20, degrees_to_steps(10))
+
+
+class HexagonVortex(_RotatingPolygon):
+    """pattern_HexagonVortex: a hexagon that rotates and breathes in size."""
+
+    def __init__(self) -> None:
+        self.radius = 1000
+        self.radial_stepover = 350
+        corners = [Positions(self.radius, degrees_to_steps(angle)) for angle in range(0, 360, 60)]
+        super().__init__(corners, 100, degrees_to_steps(5))
+
+    def _next_round(self) -> None:
+        if self.radius + self.radial_stepover >= MAX_R_STEPS + 2000 or self.radius + self.radial_stepover <= 0:
+            self.radial_stepover *= -1
+        self.radius += self.radial_stepover
+        self.vertices = [Positions(self.radius, p.angular + self.angle_shift) for p in self.vertices]
+
+
+class _PolygonSpiral(Pattern):
+    """Pentagon and star spirals: walk polygon edges, resize after each lap."""
+
+    _RESET_ON_RESTART = False  # the star variants also rewind their walk on restart
+
+    def __init__(self, skip: int, advance: int, radial_stepover: int) -> None:
+        self.skip = skip
+        self.advance = advance
+        self.initial_stepover = radial_stepover
+        self.radial_stepover = radial_stepover
+        self.start = 0
+        self.end = skip
+        self.vertices: list[Positions] = []
+        self.first_run = True
+        self.line = LineDrawer()
+
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        if self.first_run or restart:
+            self.vertices = ngon(5, Positions(0, 0), 1000)
+            self.first_run = False
+            if self._RESET_ON_RESTART:
+                self.start, self.end = 0, self.skip
+                self.radial_stepover = self.initial_stepover
+        end = self.vertices[self.end]
+        target = self.line(self.vertices[self.start], end, 100)
+        if target == end:
+            self.start = (self.start + self.advance) % 5
+            self.end = (self.end + self.advance) % 5
+            if self.start == 0 and self.end == self.skip:
+                resized = []
+                for vertex in self.vertices:
+                    radial = vertex.radial + self.radial_stepover
+                    if radial > MAX_R_STEPS or radial < 0:
+                        self.radial_stepover *= -1
+                        radial += 2 * self.radial_stepover
+                    resized.append(Positions(radial, vertex.angular))
+                self.vertices = resized
+        return target
+
+
+class PentagonSpiral(_PolygonSpiral):
+    """pattern_PentagonSpiral."""
+
+    def __init__(self) -> None:
+        super().__init__(skip=1, advance=1, radial_stepover=500)
+
+
+class StarSpiralNormal(_PolygonSpiral):
+    """pattern_StarSpiralNormal."""
+
+    _RESET_ON_RESTART = True
+
+    def __init__(self) -> None:
+        super().__init__(skip=2, advance=2, radial_stepover=1000)
+
+
+class StarSpiralDetail(_PolygonSpiral):
+    """pattern_StarSpiralDetail."""
+
+    _RESET_ON_RESTART = True
+
+    def __init__(self) -> None:
+        super().__init__(skip=2, advance=2, radial_stepover=500)
+
+
+class StarSpiralRound(_PolygonSpiral):
+    """pattern_StarSpiralRound."""
+
+    _RESET_ON_RESTART = True
+
+    def __init__(self) -> None:
+        super().__init__(skip=2, advance=1, radial_stepover=500)
+
+
+class _Rainbow(Pattern):
+    """Pentagon and star rainbows: an off-centre polygon that rotates per edge."""
+
+    _SHIFT_DEG = 2
+    _RESET_ON_RESTART = False
+
+    def __init__(self, skip: int) -> None:
+        self.skip = skip
+        self.start = 0
+        self.end = skip
+        self.shift_counter = 1
+        self.points: list[Positions] = []
+        self.first_run = True
+        self.line = LineDrawer()
+
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        if self.first_run or restart:
+            self.points = translate_points(ngon(5, Positions(0, 0), 3000), Positions(4000, 0))
+            self.first_run = False
+            if self._RESET_ON_RESTART:
+                self.start, self.end = 0, self.skip
+                self.shift_counter = 1
+        end = self.points[self.end]
+        target = self.line(self.points[self.start], end, 100)
+        if target == end:
+            self.start = (self.start + self.skip) % 5
+            self.end = (self.end + self.skip) % 5
+            rotation = self.shift_counter * self._SHIFT_DEG
+            offset = Positions(4000, self.shift_counter * degrees_to_steps(self._SHIFT_DEG))
+            self.points = translate_points(ngon(5, Positions(0, 0), 3000, rotation), offset)
+            self.shift_counter += 1
+        return target
+
+
+class PentagonRainbow(_Rainbow):
+    """pattern_PentagonRainbow."""
+
+    def __init__(self) -> None:
+        super().__init__(skip=1)
+
+
+class StarRainbow(_Rainbow):
+    """pattern_StarRainbow."""
+
+    _RESET_ON_RESTART = True
+
+    def __init__(self) -> None:
+        super().__init__(skip=2)
+
+
+class RandomWalk1(Pattern):
+    """pattern_RandomWalk1: random points joined by the native polar arcs."""
+
+    def __init__(self, seed: int | None = None) -> None:
+        self.rng = random.Random(seed)
+
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        return Positions(self.rng.randrange(0, MAX_R_STEPS + 1), self.rng.randrange(0, STEPS_PER_A_AXIS_REV))
+
+
+class RandomWalk2(RandomWalk1):
+    """pattern_RandomWalk2: random points joined by straight lines."""
+
+    def __init__(self, seed: int | None = None) -> None:
+        super().__init__(seed)
+        self.random_point: Positions | None = None
+        self.last_point: Positions | None = None
+        self.line = LineDrawer()
+
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        if self.last_point is None:
+            self.last_point = current
+        if self.random_point is None:
+            self.random_point = super().__call__(current)
+        target = self.line(self.last_point, self.random_point, 100)
+        if target == self.random_point:
+            self.last_point = self.random_point
+            self.random_point = None
+        return target
+
+
+class _Parametric(Pattern):
+    """Spirograph, Lissajous and Harmonograph: a curve sampled in float32 time."""
+
+    _DT = 0.0
+    _ROTATION_STEP = 0.0
+    _SCALE = 1.0
+
+    def __init__(self) -> None:
+        self.t = 0.0
+        self.angle_offset = 0.0
+        self.first_run = True
+
+    @abstractmethod
+    def _xy(self, t: float) -> tuple[float, float]:
+        """Curve point at time ``t``, before scaling."""
+
+    @abstractmethod
+    def _wrap(self, t: float, radius: float) -> bool:
+        """Whether the curve has closed and ``t`` should start over."""
+
+    def __call__(self, current: Positions, restart: bool = False) -> Positions:
+        if self.first_run or restart:
+            self.t = 0.0
+            self.angle_offset = 0.0
+            self.first_run = False
+        x, y = self._xy(self.t)
+        radius = math.sqrt(x * x + y * y) * self._SCALE
+        angle = math.atan2(y, x) + self.angle_offset
+        if angle < 0:
+            angle += 2.0 * math.pi
+        target = Positions(min(max(_c_int(radius), 0), MAX_R_STEPS), radians_to_steps(angle))
+        self.t = f32(self.t + self._DT)
+        if self._wrap(self.t, radius):
+            self.t = 0.0
+            self.angle_offset = f32(self.angle_offset + self._ROTATION_STEP)
+        return target
+
+
+class Spirograph(_Parametric):
+    """pattern_Spirograph: hypotrochoid R=5, r=3, d=2.5."""
+
+    _DT = f32(0.02)
+    _ROTATION_STEP = f32(0.1745)
+    _SCALE = MAX_R_STEPS / 7.0
+
+    def _xy(self, t: float) -> tuple[float, float]:
+        big, small, pen = 5.0, 3.0, 2.5
+        k = (big - small) / small * t
+        return (big - small) * math.cos(t) + pen * math.cos(k), (big - small) * math.sin(t) - pen * math.sin(k)
+
+    def _wrap(self, t: float, radius: float) -> bool:
+        return t >= 2.0 * math.pi * 3.0
+
+
+class Lissajous(_Parametric):
+    """pattern_Lissajous: a=3, b=4 with a quarter-period phase."""
+
+    _DT = f32(0.015)
+    _ROTATION_STEP = f32(0.1309)
+    _SCALE = MAX_R_STEPS * 0.5
+
+    def _xy(self, t: float) -> tuple[float, float]:
+        return 0.9 * math.sin(3.0 * t + math.pi / 2.0), 0.9 * math.sin(4.0 * t)
+
+    def _wrap(self, t: float, radius: float) -> bool:
+        return t > 2.0 * math.pi * (4.0 / math.gcd(3, 4))
+
+
+class Harmonograph(_Parametric):
+    """pattern_Harmonograph: two damped pendulums per axis."""
+
+    _DT = f32(0.05)
+    _ROTATION_STEP = f32(0.2618)
+    _SCALE = MAX_R_STEPS * 0.4
+
+    def _xy(self, t: float) -> tuple[float, float]:
+        decay = math.exp(-0.002 * t)
+        x = (math.sin(2.0 * t) + math.sin(3.0 * t)) * decay
+        y = (math.sin(3.0 * t + math.pi / 2.0) + math.sin(2.0 * t + math.pi / 4.0)) * decay
+        return x, y
+
+    def _wrap(self, t: float, radius: float) -> bool:
+        return t > 500.0 or radius < 50
+
+
+GENERATORS: dict[int, Callable[[], Pattern]] = {
+    1: SimpleSpiral,
+    2: Cardioids,
+    3: WavySpiral,
+    4: RotatingSquares,
+    5: PentagonSpiral,
+    6: HexagonVortex,
+    7: PentagonRainbow,
+    8: RandomWalk1,
+    9: RandomWalk2,
+    10: AccidentalButterfly,
+    11: StarSpiralNormal,
+    12: StarSpiralDetail,
+    13: StarSpiralRound,
+    14: StarRainbow,
+    15: Spirograph,
+    16: Lissajous,
+    17: Harmonograph,
+}
+
+
+def generate(
+    pattern_id: int, moves: int, *, start: Positions = Positions(0, 0), seed: int | None = 1
+) -> Iterator[Positions]:
+    """Yield the positions the table reaches for ``moves`` loop iterations.
+
+    Targets go through the same wrap and clamp as orchestrateMotion(), so the
+    output is what ``currentPositions`` holds after each move.
+    """
+    factory = GENERATORS.get(pattern_id)
+    if factory is None:
+        raise ValueError(f"no built-in generator for pattern {pattern_id}")
+    pattern = factory(seed) if factory in (RandomWalk1, RandomWalk2) else factory()
+    current = start
+    for index in range(moves):
+        current, _ = settle(current, pattern(current, index == 0))
+        yield current
@@ -0,0 +1,91 @@
+"""Playlist items and their run-time estimates.
+
+Like ``motion.py`` this module has no Home Assistant dependencies. The
+device does not report its position, so an item that should last a number
+of revolutions is turned into seconds up front. The pattern runs through
+the ``patterns.py`` port (or the SandScript evaluator) and the moves are
+timed with the motion model until the angular axis has turned that far.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator
+
+try:
+    from . import sandscript as ss
+    from .motion import clamp_multiplier, move_time, settle
+    from .patterns import GENERATORS, SANDSCRIPT_PATTERN, generate
+except ImportError:  # loaded flat by the host tools in tools/
+    import sandscript as ss
+    from motion import clamp_multiplier, move_time, settle
+    from patterns import GENERATORS, SANDSCRIPT_PATTERN, generate
+
+MAX_ESTIMATE_MOVES = 200_000  # stop simulating a pattern that barely turns
+
+
+@dataclass(frozen=True)
+class PlaylistItem:
+    """One pattern or SandScript, run for ``seconds`` or ``revolutions``."""
+
+    pattern: int
+    script: str | None = None
+    seconds: float | None = None
+    revolutions: float | None = None
+    name: str | None = None
+
+    def __post_init__(self) -> None:
+        if (self.seconds is None) == (self.revolutions is None):
+            raise ValueError("give exactly one of seconds or revolutions")
+        if (self.seconds or self.revolutions or 0) <= 0:
+            raise ValueError("the length of an item must be positive")
+        if self.pattern == SANDSCRIPT_PATTERN:
+            if not self.script:
+                raise ValueError("a SandScript item needs its script")
+        elif self.pattern not in GENERATORS:
+            raise ValueError(f"unknown pattern {self.pattern}")
+        elif self.script is not None:
+            raise ValueError("only the SandScript pattern takes a script")
+
+
+def check_script(source: str) -> str | None:
+    """Return why ``source`` would fail to compile on the device, or None."""
+    if len(source.encode("utf-8")) > ss.MAX_SCRIPT_CHARS:
+        return f"script is longer than {ss.MAX_SCRIPT_CHARS} bytes"
+    try:
+        ss.compile_script(source)
+    except ss.SandScriptError as err:
+        return str(err)
+    return None
+
+
+def _targets(item: PlaylistItem, moves: int) -> Iterator[ss.Positions]:
+    if item.pattern != SANDSCRIPT_PATTERN:
+        yield from generate(item.pattern, moves)
+        return
+    for position, fault in ss.simulate(ss.compile_script(item.script), moves):
+        if fault:
+            return  # the device halts at a fault
+        yield position
+
+
+def estimate_seconds(item: PlaylistItem, multiplier: float = 1.0, max_moves: int = MAX_ESTIMATE_MOVES) -> float:
+    """Seconds ``item`` should run at the given speed multiplier.
+
+    For revolutions this is motor time only; fixed per-move costs on the
+    device make the real run a little longer.
+    """
+    if item.seconds is not None:
+        return item.seconds
+    multiplier = clamp_multiplier(multiplier)
+    goal = item.revolutions * ss.STEPS_PER_A_AXIS_REV
+    current = ss.Positions(0, 0)
+    turned = 0
+    seconds = 0.0
+    for target in _targets(item, max_moves):
+        settled, delta = settle(current, target)
+        seconds += move_time(current.radial, delta, settled.radial - current.radial, multiplier)
+        current = settled
+        turned += delta
+        if abs(turned) >= goal:
+            break
+    return seconds
@@ -0,0 +1,205 @@
+"""Preview thumbnails for the patterns in PATTERNS.
+
+Like ``motion.py`` this module has no Home Assistant dependencies, so it can
+run in a worker process and in the host tools. Built-in patterns are drawn
+from the ``patterns.py`` port and SandScript from the reference evaluator.
+Both are deterministic, so a preview only has to be rendered once per
+pattern, script and renderer version. ``PreviewCache`` keeps the rendered
+SVGs on disk and evicts the least recently used ones.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import math
+import os
+from pathlib import Path
+import re
+
+try:
+    from . import sandscript as ss
+    from .motion import unwrap
+    from .patterns import GENERATORS, SANDSCRIPT_PATTERN, generate
+except ImportError:  # loaded flat by the host tools in tools/
+    import sandscript as ss
+    from motion import unwrap
+    from patterns import GENERATORS, SANDSCRIPT_PATTERN, generate
+
+# Bump whenever the output changes so cached previews are re-rendered.
+RENDERER_VERSION = 1
+
+PREVIEW_SIZE = 200  # px, square
+# Moves per built-in pattern, the pointsTarget the web client previews with.
+PREVIEW_MOVES = {
+    1: 4500,
+    2: 1200,
+    3: 4600,
+    4: 2300,
+    5: 3200,
+    6: 3000,
+    7: 2500,
+    8: 1800,
+    9: 1800,
+    10: 4600,
+    11: 3000,
+    12: 5000,
+    13: 3500,
+    14: 2500,
+    15: 3000,
+    16: 3500,
+    17: 4000,
+}
+SCRIPT_PREVIEW_STEPS = 4000
+MAX_SEGMENT_PX = 6.0  # long moves are split so they show as arcs, not chords
+MIN_SEGMENT_PX = 1.0  # shorter segments are merged into the next one
+
+_KEY_RE = re.compile(r"^\d+-(?:[0-9a-f]{12}-)?v\d+$")
+_RAD_PER_STEP = 2.0 * math.pi / ss.STEPS_PER_A_AXIS_REV
+
+
+def preview_key(pattern_id: int, script: str | None = None) -> str:
+    """Cache key for a pattern; SandScript previews are keyed by their source."""
+    if pattern_id == SANDSCRIPT_PATTERN:
+        if script is None:
+            raise ValueError("a SandScript preview needs the script source")
+        digest = hashlib.sha1(script.encode("utf-8")).hexdigest()[:12]
+        return f"{pattern_id}-{digest}-v{RENDERER_VERSION}"
+    if pattern_id not in GENERATORS:
+        raise ValueError(f"no built-in generator for pattern {pattern_id}")
+    return f"{pattern_id}-v{RENDERER_VERSION}"
+
+
+def is_preview_key(key: str) -> bool:
+    """Whether ``key`` looks like something ``preview_key`` produces."""
+    return _KEY_RE.match(key) is not None
+
+
+def trace(pattern_id: int, script: str | None = None) -> list[ss.Positions]:
+    """Positions the table reaches while drawing the preview of ``pattern_id``.
+
+    Raises ``SandScriptError`` when the script does not compile. A script
+    that faults is drawn up to the fault, as the device stops there.
+    """
+    if pattern_id != SANDSCRIPT_PATTERN:
+        return list(generate(pattern_id, PREVIEW_MOVES.get(pattern_id, 3000)))
+    if script is None:
+        raise ValueError("a SandScript preview needs the script source")
+    program = ss.compile_script(script)
+    track = []
+    for position, fault in ss.simulate(program, SCRIPT_PREVIEW_STEPS):
+        if fault:
+            break
+        track.append(position)
+    return track
+
+
+def render_svg(pattern_id: int, script: str | None = None, size: int = PREVIEW_SIZE) -> bytes:
+    """Render the preview of ``pattern_id`` as an SVG image."""
+    half = size / 2.0
+    scale = half * 0.94 / ss.MAX_R_STEPS
+    coords: list[str] = []
+    last_x = last_y = half
+    previous = (0.0, 0.0)
+    for radial, angular in unwrap(trace(pattern_id, script)):
+        # Each move is linear in (radius, angle); split long ones so they curve.
+        r0, a0 = previous
+        arc_px = max(r0, radial) * scale * abs(angular - a0) * _RAD_PER_STEP
+        pieces = max(1, math.ceil(arc_px / MAX_SEGMENT_PX))
+        for piece in range(1, pieces + 1):
+            s = piece / pieces
+            r = (r0 + (radial - r0) * s) * scale
+            theta = (a0 + (angular - a0) * s) * _RAD_PER_STEP
+            x, y = half + r * math.cos(theta), half - r * math.sin(theta)
+            if math.hypot(x - last_x, y - last_y) >= MIN_SEGMENT_PX:
+                coords.append(f"{x:.1f},{y:.1f}")
+                last_x, last_y = x, y
+        previous = (radial, angular)
+    path = f"M{half:.1f},{half:.1f}L" + " ".join(coords) if coords else ""
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" width="{size}" height="{size}">'
+        f'<circle cx="{half:g}" cy="{half:g}" r="{half - 1:g}" fill="#eadcb8" stroke="#b89f6e" stroke-width="2"/>'
+        f'<path d="{path}" fill="none" stroke="#6f5932" stroke-width=".7" stroke-linejoin="round"/>'
+        "</svg>\n"
+    ).encode("utf-8")
+
+
+def render_preview(pattern_id: int, script: str | None = None) -> bytes | None:
+    """``render_svg`` for a worker process; a script that does not compile gives None.
+
+    ``SandScriptError`` cannot be rebuilt from its pickled args, so it must
+    not cross the process boundary.
+    """
+    try:
+        return render_svg(pattern_id, script)
+    except ss.SandScriptError:
+        return None
+
+
+class PreviewCache:
+    """Directory of rendered previews with least-recently-used eviction.
+
+    All methods do blocking file I/O; call them from an executor.
+    """
+
+    suffix = ".svg"
+
+    def __init__(self, directory: Path, max_entries: int = 64) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, None] = OrderedDict()
+        self._loaded = False
+
+    def _load(self) -> None:
+        """Pick up previews left by earlier runs, oldest use first."""
+        if self._loaded:
+            return
+        self._loaded = True
+        self.directory.mkdir(parents=True, exist_ok=True)
+        found = []
+        for path in self.directory.glob(f"*{self.suffix}"):
+            key = path.name[: -len(self.suffix)]
+            if not key.endswith(f"-v{RENDERER_VERSION}"):
+                path.unlink(missing_ok=True)  # from another renderer version
+                continue
+            found.append((path.stat().st_mtime, key))
+        for _, key in sorted(found):
+            self._entries[key] = None
+        self._evict()
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> bytes | None:
+        """Cached preview for ``key``, marking it as recently used."""
+        self._load()
+        if key not in self._entries:
+            return None
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # the mtime orders the entries on the next load
+        except OSError:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return data
+
+    def __contains__(self, key: str) -> bool:
+        self._load()
+        return key in self._entries
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store ``data`` under ``key`` and evict beyond ``max_entries``."""
+        self._load()
+        path = self.path(key)
+        partial = path.with_suffix(".tmp")
+        partial.write_bytes(data)
+        partial.replace(path)
+        self._entries[key] = None
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self.path(key).unlink(missing_ok=True)
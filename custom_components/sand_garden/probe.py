@@ -0,0 +1,179 @@
+"""Find a Sand Garden among candidate hosts.
+
+Like ``client.py`` this module has no Home Assistant dependencies. The config
+flow used to make one ``/api/state`` request to the entered host, so a slow
+mDNS lookup or a wrong name stalled onboarding for the whole request
+timeout. ``probe()`` instead asks every candidate at once: the entered name,
+the addresses it resolves to (resolved on the side, so a slow lookup does
+not hold up the rest) and any hosts or subnets the user listed. Attempts run
+in stages with growing timeouts. A candidate that refuses or answers with
+something that is not a Sand Garden is dropped; only the ones that timed out
+get the longer timeout of the next stage. The first device to answer wins.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Collection, Iterable
+import ipaddress
+import logging
+import re
+import socket
+import time
+from typing import Any, NamedTuple
+
+import aiohttp
+
+try:
+    from .client import CannotConnect, SandGardenClient
+except ImportError:  # loaded flat by the host tools in tools/
+    from client import CannotConnect, SandGardenClient
+
+_LOGGER = logging.getLogger(__name__)
+
+PROBE_TIMEOUTS = (1.0, 3.0, 6.0)  # seconds per attempt in each stage
+PROBE_CONCURRENCY = 64  # attempts in flight; a /24 takes four rounds of the first stage
+MAX_SUBNET_HOSTS = 1024
+
+
+class ProbeResult(NamedTuple):
+    host: str  # the entered host when it or one of its addresses answered
+    state: dict[str, Any]
+    elapsed: float  # seconds from the start of the probe
+    address: str  # the candidate that answered
+
+
+def parse_hosts(text: str) -> list[str]:
+    """Split a list of hosts, addresses and IPv4 subnets (``192.168.1.0/24``).
+
+    Raises ``ValueError`` for a malformed subnet or one with more than
+    ``MAX_SUBNET_HOSTS`` addresses.
+    """
+    hosts: list[str] = []
+    for token in re.split(r"[\s,;]+", text.strip()):
+        if not token:
+            continue
+        if "/" not in token:
+            hosts.append(token)
+            continue
+        try:
+            network = ipaddress.IPv4Network(token, strict=False)
+        except ValueError as err:
+            raise ValueError(f"invalid subnet {token!r}") from err
+        if network.num_addresses > MAX_SUBNET_HOSTS:
+            raise ValueError(f"subnet {token!r} is larger than {MAX_SUBNET_HOSTS} addresses")
+        hosts.extend(str(address) for address in network.hosts())
+    return list(dict.fromkeys(hosts))
+
+
+def _is_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+async def _resolve(host: str, timeout: float) -> list[str]:
+    """IPv4 addresses of ``host`` from the system resolver, or none."""
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(host, 80, family=socket.AF_INET, type=socket.SOCK_STREAM), timeout
+        )
+    except (OSError, asyncio.TimeoutError) as err:
+        _LOGGER.debug("Could not resolve %s: %s", host, err or "timed out")
+        return []
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+async def known_addresses(hosts: Iterable[str], timeout: float = PROBE_TIMEOUTS[0]) -> set[str]:
+    """``hosts`` and the addresses the names among them resolve to, for ``skip``."""
+    hosts = set(hosts)
+    names = [host for host in hosts if not _is_address(host)]
+    for addresses in await asyncio.gather(*(_resolve(name, timeout) for name in names)):
+        hosts.update(addresses)
+    return hosts
+
+
+async def probe(
+    session: aiohttp.ClientSession,
+    host: str,
+    extra: Iterable[str] = (),
+    *,
+    skip: Collection[str] = (),
+    timeouts: tuple[float, ...] = PROBE_TIMEOUTS,
+    concurrency: int = PROBE_CONCURRENCY,
+) -> ProbeResult:
+    """Return the first candidate that answers ``/api/state`` like a Sand Garden.
+
+    ``host`` is always tried. Its resolved addresses and the ``extra`` hosts
+    are tried too, unless they are in ``skip`` (devices already set up).
+    When one of the resolved addresses answers, the result still names
+    ``host``, so a DHCP lease change does not strand the entry.
+    Raises ``CannotConnect`` when no candidate answers in any stage.
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    seen = {host}
+    resolved: set[str] = set()
+    batch = [host]
+    for candidate in extra:
+        if candidate not in seen and candidate not in skip:
+            seen.add(candidate)
+            batch.append(candidate)
+    errors: dict[str, str] = {}
+
+    async def attempt(candidate: str, timeout: float) -> dict[str, Any]:
+        async with semaphore:
+            data = await SandGardenClient(candidate, session, timeout=timeout).fetch_state()
+        if not isinstance(data, dict) or "pattern" not in data:
+            raise CannotConnect("not a Sand Garden")
+        return data
+
+    resolver: asyncio.Task[list[str]] | None = None
+    if not _is_address(host):
+        resolver = asyncio.create_task(_resolve(host, sum(timeouts)))
+    tasks: dict[asyncio.Task[dict[str, Any]], str] = {}
+    try:
+        for timeout in timeouts:
+            tasks = {asyncio.create_task(attempt(candidate, timeout)): candidate for candidate in batch}
+            batch = []
+            # Wait on the lookup too once nothing is left to retry, so its
+            # addresses still get their turn.
+            while tasks or (resolver is not None and not batch):
+                waiting: set[asyncio.Task[Any]] = set(tasks)
+                if resolver is not None:
+                    waiting.add(resolver)
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if resolver is not None and resolver in done:
+                    done.discard(resolver)
+                    for address in resolver.result():
+                        if address not in seen and address not in skip:
+                            seen.add(address)
+                            resolved.add(address)
+                            tasks[asyncio.create_task(attempt(address, timeout))] = address
+                    resolver = None
+                for task in done:
+                    candidate = tasks.pop(task)
+                    try:
+                        state = task.result()
+                    except CannotConnect as err:
+                        errors[candidate] = str(err)
+                        if isinstance(err.__cause__, asyncio.TimeoutError):
+                            batch.append(candidate)
+                        continue
+                    elapsed = time.perf_counter() - started
+                    _LOGGER.debug("Found a Sand Garden at %s after %.1f s", candidate, elapsed)
+                    return ProbeResult(host if candidate in resolved else candidate, state, elapsed, candidate)
+            if not batch:
+                break
+    finally:
+        pending = list(tasks)
+        if resolver is not None:
+            pending.append(resolver)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    _LOGGER.debug("No Sand Garden answered: %s", errors)
+    raise CannotConnect(errors.get(host) or f"none of {len(seen)} candidate hosts answered")
@@ -0,0 +1,115 @@
+"""Wire formats spoken by the Sand Garden firmware.
+
+Like ``sandscript.py`` this module has no Home Assistant dependencies. The
+device advertises the optional formats it speaks in the ``proto`` object of
+``/api/state``; each entry is the version number it implements.
+
+Delta frames (``/api/events/delta``, event ``delta``) batch every field that
+changed within a short window into one document with short keys::
+
+    {"v": 1, "s": 42, "d": {"p": 3, "rn": 1, "lc": [255, 0, 0]}}
+
+``s`` is a sequence number that increases by one per broadcast frame; a
+full snapshot (``"f": 1``) is sent on connect and repeats the current
+``s``. Fields decode to the same keys ``/api/state`` uses.
+
+The command socket (``/api/ws``) carries requests, their acknowledgements
+and pushed delta frames on one connection. A request names the POST
+endpoint it stands for and its JSON body; the whole script travels in one
+``/api/script`` request instead of begin/chunk/end::
+
+    -> {"id": 7, "path": "/api/pattern", "body": {"value": 3}}
+    <- {"id": 7, "ok": true}
+    <- {"id": 8, "ok": false, "status": 400, "error": "Missing value field"}
+
+Requests may be pipelined; the device answers them in order. Messages
+without an ``id`` are delta frames.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, NamedTuple
+
+DELTA_VERSION = 1
+WS_VERSION = 1
+
+# Short key -> (state key, converter)
+_DELTA_FIELDS = {
+    "sp": ("speedMultiplier", float),
+    "p": ("pattern", int),
+    "am": ("autoMode", bool),
+    "rn": ("running", bool),
+    "le": ("ledEffect", int),
+    "lb": ("ledBrightness", int),
+}
+_LED_COLOR_KEYS = ("ledColorR", "ledColorG", "ledColorB")
+
+
+class ProtocolError(ValueError):
+    """Raised for frames this client cannot decode."""
+
+
+class Delta(NamedTuple):
+    seq: int
+    full: bool
+    state: dict[str, Any]
+
+
+class Ack(NamedTuple):
+    id: int | None
+    ok: bool
+    status: int
+    error: str | None
+
+
+def supported(state: dict[str, Any], feature: str, version: int) -> bool:
+    """Whether ``/api/state`` advertises ``feature`` at exactly ``version``."""
+    proto = state.get("proto")
+    return isinstance(proto, dict) and proto.get(feature) == version
+
+
+def decode_delta(frame: Any) -> Delta:
+    """Decode a parsed delta frame into ``/api/state`` keys."""
+    if not isinstance(frame, dict):
+        raise ProtocolError("delta frame is not an object")
+    if frame.get("v") != DELTA_VERSION:
+        raise ProtocolError(f"unsupported delta version {frame.get('v')!r}")
+    fields = frame.get("d")
+    if not isinstance(fields, dict):
+        raise ProtocolError("delta frame has no fields")
+    state: dict[str, Any] = {}
+    try:
+        for key, value in fields.items():
+            if key == "lc":
+                state.update(zip(_LED_COLOR_KEYS, (int(part) for part in value)))
+            elif key in _DELTA_FIELDS:
+                name, convert = _DELTA_FIELDS[key]
+                state[name] = convert(value)
+            # Unknown short keys come from newer firmware and are skipped.
+        return Delta(int(frame["s"]), bool(frame.get("f")), state)
+    except (KeyError, TypeError, ValueError) as err:
+        raise ProtocolError(f"malformed delta frame: {err}") from err
+
+
+def encode_request(request_id: int, path: str, body: dict[str, Any] | None = None) -> str:
+    """Serialize a command-socket request."""
+    return json.dumps({"id": request_id, "path": path, "body": body or {}}, separators=(",", ":"))
+
+
+def decode_ws_message(text: str) -> Ack | Delta:
+    """Decode a command-socket message into an acknowledgement or a delta."""
+    try:
+        message = json.loads(text)
+    except ValueError as err:
+        raise ProtocolError(f"message is not JSON: {err}") from err
+    if not isinstance(message, dict):
+        raise ProtocolError("message is not an object")
+    if "ok" not in message:
+        return decode_delta(message)
+    ok = bool(message["ok"])
+    try:
+        request_id = None if message.get("id") is None else int(message["id"])
+        status = int(message.get("status", 200 if ok else 500))
+    except (TypeError, ValueError) as err:
+        raise ProtocolError(f"malformed ack: {err}") from err
+    return Ack(request_id, ok, status, message.get("error"))
@@ -0,0 +1,922 @@
+"""SandScript compiler and evaluator mirroring PatternScript.cpp.
+
+This module has no Home Assistant dependencies so the host-side tools under
+``tools/`` can import it directly. Keep it in lock-step with the firmware:
+limits come from PatternScript.h, the compiler reproduces the same
+shunting-yard quirks and bytecode budget, and every arithmetic result is
+rounded to float32 the way the ESP32 computes it.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from enum import IntEnum
+import math
+import re
+import struct
+from typing import Iterator, NamedTuple
+
+# Limits (PatternScript.h)
+MAX_SCRIPT_CHARS = 768
+MAX_TOKENS = 240
+MAX_STACK_DEPTH = 24
+MAX_EXPR_BYTES = 128
+MAX_ASSIGNMENTS = 20
+MAX_LOCALS = 12
+
+# Output slot bit masks
+MASK_NEXT_RADIUS = 0x01
+MASK_NEXT_ANGLE = 0x02
+MASK_DELTA_RADIUS = 0x04
+MASK_DELTA_ANGLE = 0x08
+
+# Motion limits used by the pattern runner (sand-garden.ino)
+MAX_R_STEPS = 7000
+STEPS_PER_A_AXIS_REV = 4096
+
+
+class Op(IntEnum):
+    """Bytecode opcodes (PSGOp)."""
+
+    CONST = 0x01
+    LOAD = 0x02
+    ADD = 0x10
+    SUB = 0x11
+    MUL = 0x12
+    DIV = 0x13
+    MOD = 0x14
+    NEG = 0x15
+    SIN = 0x16
+    COS = 0x17
+    ABS = 0x18
+    CLAMP = 0x19
+    SIGN = 0x1A
+    PINGPONG = 0x1B
+    MIN = 0x1C
+    MAX = 0x1D
+    POW = 0x1E
+    SQRT = 0x1F
+    TAN = 0x20
+    EXP = 0x21
+    RANDOM = 0x22
+    FLOOR = 0x23
+    CEIL = 0x24
+    ROUND = 0x25
+    END = 0xFF
+
+
+class Var(IntEnum):
+    """Variable slots (PSGVar); order matters for LOAD operands."""
+
+    RADIUS = 0
+    ANGLE = 1
+    START = 2
+    REV = 3
+    STEPS = 4
+    TIME = 5
+    NEXT_RADIUS = 6
+    NEXT_ANGLE = 7
+    DELTA_RADIUS = 8
+    DELTA_ANGLE = 9
+    LOCAL_BASE = 10
+
+
+VAR_MAX = Var.LOCAL_BASE + MAX_LOCALS
+
+
+class CompileResult(IntEnum):
+    """Compiler status codes (PSGCompileResult)."""
+
+    OK = 0
+    EMPTY = 1
+    SYNTAX = 2
+    UNK_IDENT = 3
+    FUNC_ARGS = 4
+    STACK_OVER = 5
+    TOO_LONG = 6
+    READONLY_ASSIGN = 7
+    LOCAL_LIMIT = 8
+    ASSIGN_LIMIT = 9
+
+
+# psgErrorToString()
+ERROR_NAMES = {
+    CompileResult.OK: "OK",
+    CompileResult.EMPTY: "EMPTY",
+    CompileResult.SYNTAX: "SYNTAX",
+    CompileResult.UNK_IDENT: "UNKNOWN_IDENT",
+    CompileResult.FUNC_ARGS: "FUNC_ARGS",
+    CompileResult.STACK_OVER: "STACK_OVER",
+    CompileResult.TOO_LONG: "TOO_LONG",
+    CompileResult.READONLY_ASSIGN: "READONLY_ASSIGN",
+    CompileResult.LOCAL_LIMIT: "LOCAL_LIMIT",
+    CompileResult.ASSIGN_LIMIT: "ASSIGN_LIMIT",
+}
+
+FUNCTIONS: dict[str, tuple[Op, int]] = {
+    "sin": (Op.SIN, 1),
+    "cos": (Op.COS, 1),
+    "tan": (Op.TAN, 1),
+    "abs": (Op.ABS, 1),
+    "clamp": (Op.CLAMP, 3),
+    "sign": (Op.SIGN, 1),
+    "pingpong": (Op.PINGPONG, 2),
+    "min": (Op.MIN, 2),
+    "max": (Op.MAX, 2),
+    "pow": (Op.POW, 2),
+    "sqrt": (Op.SQRT, 1),
+    "exp": (Op.EXP, 1),
+    "random": (Op.RANDOM, 0),
+    "floor": (Op.FLOOR, 1),
+    "ceil": (Op.CEIL, 1),
+    "round": (Op.ROUND, 1),
+}
+
+INPUTS = ("radius", "angle", "start", "rev", "steps", "time")
+OUTPUTS = {
+    "next_radius": (Var.NEXT_RADIUS, MASK_NEXT_RADIUS),
+    "next_angle": (Var.NEXT_ANGLE, MASK_NEXT_ANGLE),
+    "delta_radius": (Var.DELTA_RADIUS, MASK_DELTA_RADIUS),
+    "delta_angle": (Var.DELTA_ANGLE, MASK_DELTA_ANGLE),
+}
+
+_F32 = struct.Struct("<f")
+_WHITESPACE = " \t\n\v\f\r"
+_ATOF_RE = re.compile(r"(\d*\.?\d*)([eE][+-]?\d+)?")
+
+
+def f32(value: float) -> float:
+    """Round a Python float to the nearest float32."""
+    try:
+        return _F32.unpack(_F32.pack(value))[0]
+    except OverflowError:
+        # Out of float32 range: a C conversion saturates to infinity.
+        return math.copysign(math.inf, value)
+
+
+class Positions(NamedTuple):
+    """Gantry position in motor steps (Positions.h)."""
+
+    radial: int
+    angular: int
+
+
+class SandScriptError(Exception):
+    """Raised when a script fails to compile."""
+
+    def __init__(self, code: CompileResult, message: str | None = None, line: int = -1) -> None:
+        """Store the firmware error code alongside the PSG message."""
+        self.code = code
+        self.line = line
+        if message is None:
+            text = ERROR_NAMES[code]
+        else:
+            text = f"PSG: {message}"
+            if line >= 0:
+                text += f" (line {line})"
+        super().__init__(text)
+
+
+@dataclass(slots=True)
+class Expr:
+    """A compiled expression (PSGExpr)."""
+
+    bytecode: bytes
+    op_count: int
+    max_depth: int
+    ops: tuple[tuple[int, float | int], ...] = ()
+
+
+@dataclass(slots=True)
+class Assignment:
+    """One compiled assignment (PSGAssignment)."""
+
+    target: int
+    expr: Expr
+    name: str = ""
+
+
+@dataclass(slots=True)
+class Program:
+    """A compiled script (PatternScript)."""
+
+    used_mask: int = 0
+    local_count: int = 0
+    assignments: list[Assignment] = field(default_factory=list)
+    locals: list[str] = field(default_factory=list)
+    token_count: int = 0
+
+    @property
+    def loads(self) -> frozenset[int]:
+        """Return every variable slot read by the program."""
+        return frozenset(
+            arg for assign in self.assignments for op, arg in assign.expr.ops if op == Op.LOAD
+        )
+
+    @property
+    def opcodes(self) -> frozenset[int]:
+        """Return every opcode used by the program."""
+        return frozenset(op for assign in self.assignments for op, _ in assign.expr.ops)
+
+
+@dataclass(slots=True)
+class Units:
+    """Unit conversion used by the evaluator (PatternScriptUnits)."""
+
+    steps_per_cm: float = 700.0
+    steps_per_deg: float = 11.377
+    max_radius_cm: float = 10.0
+
+
+# configurePatternScriptUnits() call in setup(): STEPS_PER_MM * 10,
+# (float)STEPS_PER_DEG and MAX_R_STEPS / stepsPerCm.
+DEVICE_UNITS = Units(
+    steps_per_cm=700.0,
+    steps_per_deg=f32(STEPS_PER_A_AXIS_REV / 360.0),
+    max_radius_cm=10.0,
+)
+
+
+@dataclass(slots=True)
+class Runtime:
+    """Per-run evaluator state (PatternScriptRuntime).
+
+    ``seed`` stands in for ``esp_random()`` so runs are reproducible on the
+    host; zero falls back to the firmware's millis-based reseed.
+    """
+
+    initialized: bool = False
+    prev_angle_deg: float = 0.0
+    unwrapped_angle_deg: float = 0.0
+    step_counter: int = 0
+    start_millis: int = 0
+    faulted: bool = False
+    fault_mask: int = 0
+    random_state: int = 0
+    random_initialized: bool = False
+    seed: int = 1
+    last_vars: list[float] = field(default_factory=list)
+
+
+class _Tok(NamedTuple):
+    kind: str
+    number: float = 0.0
+    text: str = ""
+    is_function: bool = False
+    is_unary: bool = False
+    var_index: int = 0
+
+
+class _Symbol(NamedTuple):
+    index: int
+    read_only: bool
+    ready: bool
+    is_output: bool
+    is_local: bool
+
+
+def _atof(text: str) -> float:
+    match = _ATOF_RE.match(text)
+    mantissa = match.group(1) if match else ""
+    if mantissa in ("", "."):
+        return 0.0
+    exponent = match.group(2) or ""
+    return f32(float(mantissa + exponent))
+
+
+def _trim(text: str) -> str:
+    return text.strip(_WHITESPACE)
+
+
+def _is_alpha(ch: str) -> bool:
+    return ("a" <= ch <= "z") or ("A" <= ch <= "Z") or ch == "_"
+
+
+def _is_alnum(ch: str) -> bool:
+    return _is_alpha(ch) or ("0" <= ch <= "9")
+
+
+def _is_identifier(name: str) -> bool:
+    return bool(name) and _is_alpha(name[0]) and all(_is_alnum(ch) for ch in name[1:])
+
+
+def _parse_number(expr: str, pos: int) -> tuple[float, int]:
+    start = pos
+    has_dot = False
+    while pos < len(expr):
+        ch = expr[pos]
+        if ch == ".":
+            if has_dot:
+                break
+            has_dot = True
+            pos += 1
+        elif "0" <= ch <= "9":
+            pos += 1
+        else:
+            break
+    if pos < len(expr) and expr[pos] in "eE":
+        pos += 1
+        if pos < len(expr) and expr[pos] in "+-":
+            pos += 1
+        while pos < len(expr) and "0" <= expr[pos] <= "9":
+            pos += 1
+    return _atof(expr[start:pos]), pos
+
+
+class _Compiler:
+    """Straight port of the anonymous-namespace helpers in PatternScript.cpp."""
+
+    def __init__(self) -> None:
+        self.token_budget = MAX_TOKENS
+
+    def tokenize(self, expr: str, symbols: dict[str, _Symbol], line: int) -> list[_Tok]:
+        tokens: list[_Tok] = []
+        pos = 0
+        expect_unary = True
+        while pos < len(expr):
+            ch = expr[pos]
+            if ch in _WHITESPACE:
+                pos += 1
+                continue
+            if self.token_budget == 0:
+                raise SandScriptError(CompileResult.TOO_LONG, "token budget exceeded", line)
+            if ("0" <= ch <= "9") or ch == ".":
+                number, pos = _parse_number(expr, pos)
+                tokens.append(_Tok("num", number=number))
+                expect_unary = False
+            elif _is_alpha(ch):
+                start = pos
+                while pos < len(expr) and _is_alnum(expr[pos]):
+                    pos += 1
+                ident = expr[start:pos].lower()
+                if ident in FUNCTIONS:
+                    tokens.append(_Tok("ident", text=ident, is_function=True))
+                else:
+                    symbol = symbols.get(ident)
+                    if symbol is None or not symbol.ready:
+                        raise SandScriptError(
+                            CompileResult.UNK_IDENT, f"unknown identifier {ident}", line
+                        )
+                    tokens.append(_Tok("ident", text=ident, var_index=symbol.index))
+                expect_unary = False
+            elif ch in "+-*/%":
+                tokens.append(_Tok("op", text=ch, is_unary=ch == "-" and expect_unary))
+                expect_unary = True
+                pos += 1
+            elif ch == "(":
+                tokens.append(_Tok("("))
+                expect_unary = True
+                pos += 1
+            elif ch == ")":
+                tokens.append(_Tok(")"))
+                expect_unary = False
+                pos += 1
+            elif ch == ",":
+                tokens.append(_Tok(","))
+                expect_unary = True
+                pos += 1
+            else:
+                raise SandScriptError(CompileResult.SYNTAX, f"unexpected character '{ch}'", line)
+            self.token_budget -= 1
+        return tokens
+
+    @staticmethod
+    def _operator_info(tok: _Tok) -> tuple[Op, int, bool, int]:
+        if tok.is_unary:
+            return Op.NEG, 3, True, 1
+        return {
+            "+": (Op.ADD, 1, False, 2),
+            "-": (Op.SUB, 1, False, 2),
+            "*": (Op.MUL, 2, False, 2),
+            "/": (Op.DIV, 2, False, 2),
+            "%": (Op.MOD, 2, False, 2),
+        }[tok.text]
+
+    @staticmethod
+    def _check_args(func: str, count: int, line: int) -> None:
+        if func == "pingpong":
+            ok = count in (1, 2)
+        else:
+            ok = count == FUNCTIONS[func][1]
+        if not ok:
+            raise SandScriptError(CompileResult.FUNC_ARGS, "function argument mismatch", line)
+
+    def to_rpn(self, tokens: list[_Tok], line: int) -> list[tuple[str, float | int, int]]:
+        """Return ``(kind, operand, arity)`` triples; kind is const/load/op."""
+        output: list[tuple[str, float | int, int]] = []
+        # Stack entries: ("operator", (op, prec, right_assoc, arity)), ("function", name), ("(", None)
+        stack: list[tuple[str, object]] = []
+        arg_counts: list[int] = []
+
+        def entry_op(entry: tuple[str, object]) -> tuple[str, int, int]:
+            if entry[0] == "operator":
+                op, _, _, arity = entry[1]  # type: ignore[misc]
+                return ("op", op, arity)
+            # Functions and parens carry PSG_OP_END with arity 0 in the firmware.
+            return ("op", Op.END, 0)
+
+        for i, tok in enumerate(tokens):
+            if tok.kind == "num":
+                output.append(("const", tok.number, 0))
+            elif tok.kind == "ident":
+                if tok.is_function:
+                    stack.append(("function", tok.text))
+                    arg_counts.append(0)
+                else:
+                    output.append(("load", tok.var_index, 0))
+            elif tok.kind == "op":
+                info = self._operator_info(tok)
+                while stack and stack[-1][0] == "operator":
+                    prec_top = stack[-1][1][1]  # type: ignore[index]
+                    if (info[2] and info[1] < prec_top) or (not info[2] and info[1] <= prec_top):
+                        output.append(entry_op(stack.pop()))
+                    else:
+                        break
+                stack.append(("operator", info))
+            elif tok.kind == "(":
+                stack.append(("(", None))
+            elif tok.kind == ")":
+                found = False
+                while stack:
+                    entry = stack.pop()
+                    if entry[0] == "(":
+                        found = True
+                        break
+                    output.append(entry_op(entry))
+                if not found:
+                    raise SandScriptError(CompileResult.SYNTAX, "mismatched parentheses", line)
+                if stack and stack[-1][0] == "function":
+                    func = stack.pop()[1]
+                    count = arg_counts.pop()
+                    if count == 0:
+                        prev = tokens[i - 1] if i >= 1 else None
+                        had_value = prev is not None and (
+                            prev.kind == "num"
+                            or (prev.kind == "ident" and not prev.is_function)
+                            or prev.kind == ")"
+                        )
+                        count = 1 if had_value else 0
+                    else:
+                        count += 1
+                    self._check_args(func, count, line)  # type: ignore[arg-type]
+                    output.append(("op", FUNCTIONS[func][0], count))  # type: ignore[index]
+            elif tok.kind == ",":
+                found = False
+                while stack:
+                    if stack[-1][0] == "(":
+                        found = True
+                        break
+                    output.append(entry_op(stack.pop()))
+                if not found:
+                    raise SandScriptError(CompileResult.SYNTAX, "misplaced comma", line)
+                if arg_counts:
+                    arg_counts[-1] += 1
+        while stack:
+            entry = stack.pop()
+            if entry[0] == "(":
+                raise SandScriptError(CompileResult.SYNTAX, "mismatched parentheses", line)
+            if entry[0] == "function":
+                count = arg_counts.pop() + 1 if arg_counts else 0
+                self._check_args(entry[1], count, line)  # type: ignore[arg-type]
+                output.append(("op", FUNCTIONS[entry[1]][0], count))  # type: ignore[index]
+            else:
+                output.append(entry_op(entry))
+        return output
+
+    @staticmethod
+    def encode(rpn: list[tuple[str, float | int, int]], line: int) -> Expr:
+        code = bytearray()
+        ops: list[tuple[int, float | int]] = []
+        depth = 0
+        max_depth = 0
+        for kind, operand, arity in rpn:
+            if kind == "const":
+                if len(code) + 5 > MAX_EXPR_BYTES:
+                    raise SandScriptError(CompileResult.TOO_LONG, "expression too long", line)
+                code.append(Op.CONST)
+                code += _F32.pack(operand)
+                ops.append((Op.CONST, operand))
+                depth += 1
+            elif kind == "load":
+                if len(code) + 2 > MAX_EXPR_BYTES:
+                    raise SandScriptError(CompileResult.TOO_LONG, "expression too long", line)
+                code += bytes((Op.LOAD, operand))
+                ops.append((Op.LOAD, operand))
+                depth += 1
+            else:
+                if len(code) + 1 > MAX_EXPR_BYTES:
+                    raise SandScriptError(CompileResult.TOO_LONG, "expression too long", line)
+                code.append(operand)
+                ops.append((operand, arity))
+                if depth < arity:
+                    raise SandScriptError(CompileResult.SYNTAX, "stack underflow", line)
+                depth = depth - arity + 1
+            if depth > MAX_STACK_DEPTH:
+                raise SandScriptError(CompileResult.STACK_OVER, "expression stack overflow", line)
+            max_depth = max(max_depth, depth)
+        if depth != 1:
+            raise SandScriptError(
+                CompileResult.SYNTAX, "expression did not resolve to single value", line
+            )
+        return Expr(bytes(code), len(ops), max_depth, tuple(ops))
+
+
+def compile_script(src: str) -> Program:
+    """Compile SandScript source exactly like ``compilePatternScript``.
+
+    Raises SandScriptError carrying the firmware error code on failure.
+    """
+    if not src:
+        raise SandScriptError(CompileResult.EMPTY)
+    if len(src.encode("utf-8")) > MAX_SCRIPT_CHARS:
+        raise SandScriptError(CompileResult.TOO_LONG)
+
+    symbols: dict[str, _Symbol] = {name: _Symbol(index, True, True, False, False) for index, name in enumerate(INPUTS)}
+    for name, (index, _) in OUTPUTS.items():
+        symbols[name] = _Symbol(index, False, False, True, False)
+
+    compiler = _Compiler()
+    program = Program()
+    for line_no, raw in enumerate(src.split("\n"), start=1):
+        raw = raw.removesuffix("\r").split("#", 1)[0]
+        line = _trim(raw)
+        if not line:
+            continue
+        lhs, eq, rhs = line.partition("=")
+        if not eq:
+            raise SandScriptError(CompileResult.SYNTAX, "missing '='", line_no)
+        lhs, rhs = _trim(lhs), _trim(rhs)
+        if not lhs or not rhs:
+            raise SandScriptError(CompileResult.SYNTAX, "invalid assignment", line_no)
+        lhs = lhs.lower()
+        if not _is_identifier(lhs):
+            raise SandScriptError(CompileResult.SYNTAX, "invalid identifier", line_no)
+
+        target = symbols.get(lhs)
+        if target is None:
+            if program.local_count >= MAX_LOCALS:
+                raise SandScriptError(CompileResult.LOCAL_LIMIT, "too many locals", line_no)
+            target = _Symbol(Var.LOCAL_BASE + program.local_count, False, False, False, True)
+            program.local_count += 1
+            program.locals.append(lhs)
+            symbols[lhs] = target
+        if target.read_only:
+            raise SandScriptError(
+                CompileResult.READONLY_ASSIGN, "cannot assign read-only identifier", line_no
+            )
+
+        tokens = compiler.tokenize(rhs, symbols, line_no)
+        rpn = compiler.to_rpn(tokens, line_no)
+        if len(program.assignments) >= MAX_ASSIGNMENTS:
+            raise SandScriptError(CompileResult.ASSIGN_LIMIT, "too many assignments", line_no)
+        program.assignments.append(Assignment(int(target.index), compiler.encode(rpn, line_no), lhs))
+
+        symbols[lhs] = target._replace(ready=True)
+        if target.is_output:
+            program.used_mask |= OUTPUTS[lhs][1]
+
+    if program.used_mask == 0:
+        raise SandScriptError(CompileResult.EMPTY)
+    program.token_count = MAX_TOKENS - compiler.token_budget
+    return program
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+_PI_F = f32(math.pi)
+
+
+def _deg_to_rad(deg: float) -> float:
+    return f32(f32(deg * _PI_F) / 180.0)
+
+
+def _fmod(a: float, b: float) -> float:
+    if b == 0.0 or a != a or b != b or a in (math.inf, -math.inf):
+        return math.nan
+    if b in (math.inf, -math.inf):
+        return a
+    return math.fmod(a, b)
+
+
+def _div(a: float, b: float) -> float:
+    if b == 0.0:
+        if a == 0.0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return f32(a / b)
+
+
+def _unary(func, a: float) -> float:
+    try:
+        return f32(func(a))
+    except OverflowError:
+        return math.inf
+    except ValueError:
+        return math.nan
+
+
+def _powf(a: float, b: float) -> float:
+    try:
+        return f32(math.pow(a, b))
+    except OverflowError:
+        if a < 0.0 and b == math.floor(b) and b % 2 == 1:
+            return -math.inf
+        return math.inf
+    except ValueError:
+        if a == 0.0 and b < 0.0:
+            if b == math.floor(b) and b % 2 == 1:
+                return math.copysign(math.inf, a)
+            return math.inf
+        return math.nan
+
+
+def _fminf(a: float, b: float) -> float:
+    if a != a:
+        return b
+    if b != b:
+        return a
+    return a if a < b else b
+
+
+def _fmaxf(a: float, b: float) -> float:
+    if a != a:
+        return b
+    if b != b:
+        return a
+    return a if a > b else b
+
+
+def _clampf(v: float, lo: float, hi: float) -> float:
+    if v < lo:
+        return lo
+    if v > hi:
+        return hi
+    return v
+
+
+def _roundf(a: float) -> float:
+    if a != a or a in (math.inf, -math.inf):
+        return a
+    return math.copysign(math.floor(abs(a) + 0.5), a)
+
+
+def _floorf(a: float) -> float:
+    if a != a or a in (math.inf, -math.inf):
+        return a
+    return float(math.floor(a))
+
+
+def _ceilf(a: float) -> float:
+    if a != a or a in (math.inf, -math.inf):
+        return a
+    return float(math.ceil(a))
+
+
+def _lroundf(a: float) -> int:
+    return int(_roundf(a))
+
+
+def _isfinite(a: float) -> bool:
+    return math.isfinite(a)
+
+
+def wrap_deg(deg: float) -> float:
+    """Wrap degrees into [0, 360] like the firmware's wrapDeg()."""
+    out = _fmod(deg, 360.0)
+    if out < 0.0:
+        out = f32(out + 360.0)
+    return out
+
+
+def _random_next(state: int) -> int:
+    return (state * 1664525 + 1013904223) & 0xFFFFFFFF
+
+
+def _run_expr(expr: Expr, variables: list[float], rt: Runtime, now_ms: int, current: Positions) -> float:
+    stack: list[float] = []
+    push = stack.append
+
+    def pop() -> float:
+        # Popping an empty stack is undefined behaviour on the device.
+        return stack.pop() if stack else 0.0
+
+    for op, arg in expr.ops:
+        if op == Op.CONST:
+            push(arg)  # type: ignore[arg-type]
+        elif op == Op.LOAD:
+            push(variables[min(arg, VAR_MAX - 1)])  # type: ignore[call-overload]
+        elif op == Op.ADD:
+            b, a = pop(), pop()
+            push(f32(a + b))
+        elif op == Op.SUB:
+            b, a = pop(), pop()
+            push(f32(a - b))
+        elif op == Op.MUL:
+            b, a = pop(), pop()
+            push(f32(a * b))
+        elif op == Op.DIV:
+            b, a = pop(), pop()
+            push(_div(a, b))
+        elif op == Op.MOD:
+            b, a = pop(), pop()
+            push(_fmod(a, b))
+        elif op == Op.NEG:
+            push(-pop())
+        elif op == Op.SIN:
+            push(_unary(math.sin, _deg_to_rad(pop())))
+        elif op == Op.COS:
+            push(_unary(math.cos, _deg_to_rad(pop())))
+        elif op == Op.TAN:
+            push(_unary(math.tan, _deg_to_rad(pop())))
+        elif op == Op.ABS:
+            push(abs(pop()))
+        elif op == Op.PINGPONG:
+            max_v, v = pop(), pop()
+            if not _isfinite(max_v) or max_v <= 0.0:
+                push(0.0)
+                continue
+            period = f32(2.0 * max_v)
+            t = _fmod(v, period)
+            if t < 0.0:
+                t = f32(t + period)
+            push(t if t <= max_v else f32(f32(2.0 * max_v) - t))
+        elif op == Op.CLAMP:
+            max_v, min_v, val = pop(), pop(), pop()
+            push(_clampf(val, min_v, max_v))
+        elif op == Op.SIGN:
+            a = pop()
+            push(1.0 if a > 1e-6 else -1.0 if a < -1e-6 else 0.0)
+        elif op == Op.MIN:
+            b, a = pop(), pop()
+            push(_fminf(a, b))
+        elif op == Op.MAX:
+            b, a = pop(), pop()
+            push(_fmaxf(a, b))
+        elif op == Op.POW:
+            b, a = pop(), pop()
+            push(_powf(a, b))
+        elif op == Op.SQRT:
+            push(_unary(math.sqrt, pop()))
+        elif op == Op.EXP:
+            push(_unary(math.exp, pop()))
+        elif op == Op.FLOOR:
+            push(_floorf(pop()))
+        elif op == Op.CEIL:
+            push(_ceilf(pop()))
+        elif op == Op.ROUND:
+            push(_roundf(pop()))
+        elif op == Op.RANDOM:
+            if not rt.random_initialized:
+                seed = rt.seed & 0xFFFFFFFF
+                if seed == 0:
+                    seed = ((now_ms << 16) ^ (current.radial & 0xFFFFFFFF) ^ 0xA5A5A5A5) & 0xFFFFFFFF
+                rt.random_state = seed
+                rt.random_initialized = True
+            rt.random_state = _random_next(rt.random_state)
+            push((rt.random_state >> 8) * (1.0 / 16777216.0))
+    return stack[-1] if stack else 0.0
+
+
+def evaluate(
+    program: Program,
+    rt: Runtime,
+    current: Positions,
+    start: bool,
+    now_ms: int,
+    units: Units = DEVICE_UNITS,
+) -> Positions:
+    """Evaluate one step exactly like ``evalPatternScript``.
+
+    Faults are reported through ``rt.faulted``/``rt.fault_mask`` and leave the
+    position unchanged, as on the device.
+    """
+    if not program.assignments:
+        return current
+
+    rt.faulted = False
+    rt.fault_mask = 0
+
+    steps_per_cm = f32(units.steps_per_cm) if units.steps_per_cm > 0 else 700.0
+    steps_per_deg = f32(units.steps_per_deg) if units.steps_per_deg > 0 else f32(11.377)
+    max_radius_cm = f32(units.max_radius_cm) if units.max_radius_cm > 0 else 10.0
+
+    radius_cm = f32(f32(current.radial) / steps_per_cm)
+    angle_deg = wrap_deg(f32(f32(current.angular) / steps_per_deg))
+
+    now_ms &= 0xFFFFFFFF
+    if not rt.initialized or start:
+        rt.initialized = True
+        rt.prev_angle_deg = angle_deg
+        rt.unwrapped_angle_deg = angle_deg
+        rt.step_counter = 0
+        rt.start_millis = now_ms
+        rt.random_initialized = False
+    else:
+        delta = f32(angle_deg - rt.prev_angle_deg)
+        if delta > 180.0:
+            delta = f32(delta - 360.0)
+        elif delta < -180.0:
+            delta = f32(delta + 360.0)
+        rt.unwrapped_angle_deg = f32(rt.unwrapped_angle_deg + delta)
+        rt.prev_angle_deg = angle_deg
+
+    variables = [0.0] * VAR_MAX
+    variables[Var.RADIUS] = radius_cm
+    variables[Var.ANGLE] = angle_deg
+    variables[Var.START] = 1.0 if start else 0.0
+    variables[Var.REV] = f32(rt.unwrapped_angle_deg / 360.0)
+    variables[Var.STEPS] = f32(float(rt.step_counter))
+    variables[Var.TIME] = f32(float(now_ms - rt.start_millis if now_ms >= rt.start_millis else 0))
+
+    for assign in program.assignments:
+        variables[assign.target] = _run_expr(assign.expr, variables, rt, now_ms, current)
+    rt.last_vars = variables
+
+    mask = program.used_mask
+    fault = 0
+    for slot, bit in (
+        (Var.NEXT_RADIUS, MASK_NEXT_RADIUS),
+        (Var.DELTA_RADIUS, MASK_DELTA_RADIUS),
+        (Var.NEXT_ANGLE, MASK_NEXT_ANGLE),
+        (Var.DELTA_ANGLE, MASK_DELTA_ANGLE),
+    ):
+        if mask & bit and not _isfinite(variables[slot]):
+            fault |= bit
+
+    out_radius = radius_cm
+    if mask & MASK_NEXT_RADIUS:
+        out_radius = variables[Var.NEXT_RADIUS]
+    elif mask & MASK_DELTA_RADIUS:
+        out_radius = f32(radius_cm + variables[Var.DELTA_RADIUS])
+    out_angle = angle_deg
+    if mask & MASK_NEXT_ANGLE:
+        out_angle = variables[Var.NEXT_ANGLE]
+    elif mask & MASK_DELTA_ANGLE:
+        out_angle = f32(angle_deg + variables[Var.DELTA_ANGLE])
+
+    if not _isfinite(out_radius):
+        if mask & MASK_NEXT_RADIUS:
+            fault |= MASK_NEXT_RADIUS
+        elif mask & MASK_DELTA_RADIUS:
+            fault |= MASK_DELTA_RADIUS
+    if not _isfinite(out_angle):
+        if mask & MASK_NEXT_ANGLE:
+            fault |= MASK_NEXT_ANGLE
+        elif mask & MASK_DELTA_ANGLE:
+            fault |= MASK_DELTA_ANGLE
+
+    if fault:
+        rt.faulted = True
+        rt.fault_mask = fault
+        return current
+
+    rt.step_counter += 1
+
+    out_radius = _clampf(out_radius, 0.0, max_radius_cm)
+    out_angle = wrap_deg(out_angle)
+
+    radial_steps = f32(out_radius * steps_per_cm)
+    angular_steps = f32(out_angle * steps_per_deg)
+    if not _isfinite(radial_steps):
+        rt.faulted = True
+        rt.fault_mask = (
+            MASK_NEXT_RADIUS if mask & MASK_NEXT_RADIUS else MASK_DELTA_RADIUS if mask & MASK_DELTA_RADIUS else 0
+        )
+        return current
+    if not _isfinite(angular_steps):
+        rt.faulted = True
+        rt.fault_mask = (
+            MASK_NEXT_ANGLE if mask & MASK_NEXT_ANGLE else MASK_DELTA_ANGLE if mask & MASK_DELTA_ANGLE else rt.fault_mask
+        )
+        return current
+
+    return Positions(_lroundf(radial_steps), _lroundf(angular_steps))
+
+
+def simulate(
+    program: Program,
+    steps: int,
+    *,
+    units: Units = DEVICE_UNITS,
+    start: Positions = Positions(0, 0),
+    seed: int = 1,
+    step_ms: int = 4,
+) -> Iterator[tuple[Positions, int]]:
+    """Run the SandScript pattern slot for ``steps`` evaluations.
+
+    Yields ``(position, fault_mask)`` after each evaluation, applying the same
+    radial constrain and angular modulus as ``pattern_SandScript``. Stops at
+    the first fault since the device halts the run there.
+    """
+    rt = Runtime(seed=seed)
+    current = start
+    for index in range(steps):
+        target = evaluate(program, rt, current, index == 0, index * step_ms, units)
+        if rt.faulted:
+            yield current, rt.fault_mask
+            return
+        current = Positions(
+            min(max(target.radial, 0), MAX_R_STEPS), target.angular % STEPS_PER_A_AXIS_REV
+        )
+        yield current, 0
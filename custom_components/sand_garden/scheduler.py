@@ -0,0 +1,206 @@
+"""Gapless playlist scheduler for Sand Garden."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import logging
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    API_MODE,
+    API_PATTERN,
+    API_RUN,
+    PATTERNS,
+    PLAYLIST_MAX_RETRIES,
+    PLAYLIST_RETRY_DELAY,
+    PLAYLIST_SWITCH_LEAD_MAX,
+)
+from .patterns import SANDSCRIPT_PATTERN
+from .playlist import PlaylistItem, check_script, estimate_seconds
+
+if TYPE_CHECKING:
+    from .coordinator import SandGardenCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _Prepared:
+    """An item that passed its checks, with its run time resolved."""
+
+    index: int
+    item: PlaylistItem
+    seconds: float
+
+    @property
+    def label(self) -> str:
+        return self.item.name or PATTERNS.get(self.item.pattern, str(self.item.pattern))
+
+
+class PlaylistScheduler:
+    """Run an ordered list of patterns and SandScripts back to back.
+
+    While an item draws, the next one is prepared off the event loop: its
+    script is compile-checked against the reference compiler (a script the
+    device would reject is skipped instead of stopping the table) and its
+    run time is estimated. The script itself is not sent ahead: the device
+    holds one script and compiles it as it arrives, so an early upload would
+    cut the current item short. Instead the switch starts early by how long
+    the last switch of the same kind (pattern command or script upload)
+    took, or by the median command round trip before there is one, so the
+    device changes pattern at the boundary.
+
+    A switch that keeps failing stops the playlist after
+    ``PLAYLIST_MAX_RETRIES`` retries; ``error`` then says why.
+    """
+
+    def __init__(self, hass: HomeAssistant, coordinator: SandGardenCoordinator) -> None:
+        """Initialize the scheduler."""
+        self.hass = hass
+        self.coordinator = coordinator
+        self.items: list[PlaylistItem] = []
+        self.loop = False
+        self.current: _Prepared | None = None
+        self.ends_at: datetime | None = None
+        self.error: str | None = None
+        self._task: asyncio.Task | None = None
+        self._switch_seconds: dict[bool, float] = {}  # last switch duration, by "is a script"
+
+    @property
+    def active(self) -> bool:
+        """Return True while a playlist is running."""
+        return self._task is not None and not self._task.done()
+
+    async def async_start(self, items: list[PlaylistItem], loop: bool = False) -> None:
+        """Replace any running playlist with ``items``."""
+        await self.async_stop()
+        self.items = list(items)
+        self.loop = loop
+        self.error = None
+        self._task = self.hass.async_create_task(self._run())
+
+    async def async_stop(self) -> None:
+        """Stop the playlist; the current pattern keeps drawing."""
+        if self.active:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._set_current(None)
+
+    def _set_current(self, prepared: _Prepared | None) -> None:
+        self.current = prepared
+        self.ends_at = (
+            dt_util.utcnow() + timedelta(seconds=prepared.seconds) if prepared is not None else None
+        )
+        self.coordinator.async_update_listeners()
+
+    def _speed(self) -> float:
+        data = self.coordinator.data or {}
+        return float(data.get("speedMultiplier") or data.get("speed") or 1.0)
+
+    def _prepare_blocking(self, index: int, speed: float) -> _Prepared | None:
+        item = self.items[index]
+        if item.script is not None and (error := check_script(item.script)) is not None:
+            _LOGGER.warning("Skipping playlist item %d: %s", index + 1, error)
+            return None
+        return _Prepared(index, item, estimate_seconds(item, speed))
+
+    async def _prepare_after(self, index: int | None) -> _Prepared | None:
+        """Prepare the first usable item after ``index``; None at the end."""
+        count = len(self.items)
+        position = -1 if index is None else index
+        for _ in range(count):
+            position += 1
+            if position >= count:
+                if not self.loop:
+                    return None
+                position = 0
+            prepared = await self.hass.async_add_executor_job(
+                self._prepare_blocking, position, self._speed()
+            )
+            if prepared is not None:
+                return prepared
+        _LOGGER.error("No playlist item can run")
+        return None
+
+    def _switch_lead(self, prepared: _Prepared) -> float:
+        """Seconds the switch to ``prepared`` takes to reach the device."""
+        script = prepared.item.pattern == SANDSCRIPT_PATTERN
+        if (measured := self._switch_seconds.get(script)) is not None:
+            return min(measured, PLAYLIST_SWITCH_LEAD_MAX)
+        if script:
+            endpoints = self.coordinator.script_endpoints
+        else:
+            endpoints = (API_PATTERN,)
+        lead_ms = 0.0
+        for endpoint in endpoints:
+            if (histogram := self.coordinator.stats.command_rtt.get(endpoint)) is not None:
+                lead_ms += histogram.percentile(0.5) or 0.0
+        return min(lead_ms / 1000.0, PLAYLIST_SWITCH_LEAD_MAX)
+
+    async def _switch(self, prepared: _Prepared) -> None:
+        """Make the device draw ``prepared`` and make sure it is running."""
+        item = prepared.item
+        if self.coordinator.data.get("autoMode"):
+            # Auto mode would move on to the device's own next pattern.
+            await self.coordinator.async_send_command(API_MODE, {"value": False})
+            self.coordinator.data["autoMode"] = False
+        script = item.pattern == SANDSCRIPT_PATTERN
+        started = asyncio.get_running_loop().time()
+        if script:
+            # The device switches to the script slot once the upload compiles;
+            # selecting the slot first would restart the previous script.
+            await self.coordinator.async_upload_script(item.script)
+        else:
+            await self.coordinator.async_send_command(API_PATTERN, {"value": item.pattern})
+        self._switch_seconds[script] = asyncio.get_running_loop().time() - started
+        if not self.coordinator.data.get("running"):
+            await self.coordinator.async_send_command(API_RUN, {"value": True})
+            self.coordinator.data["running"] = True
+
+    async def _switch_with_retries(self, prepared: _Prepared) -> None:
+        """Switch to ``prepared``, retrying while the device does not answer."""
+        for attempt in range(PLAYLIST_MAX_RETRIES + 1):
+            try:
+                await self._switch(prepared)
+                return
+            except UpdateFailed as err:
+                if attempt == PLAYLIST_MAX_RETRIES:
+                    raise
+                _LOGGER.warning(
+                    "Playlist switch to %s failed: %s; retrying in %ss",
+                    prepared.label, err, PLAYLIST_RETRY_DELAY,
+                )
+                await asyncio.sleep(PLAYLIST_RETRY_DELAY)
+
+    async def _run(self) -> None:
+        try:
+            prepared = await self._prepare_after(None)
+            loop = asyncio.get_running_loop()
+            while prepared is not None:
+                await self._switch_with_retries(prepared)
+                ends_at = loop.time() + prepared.seconds
+                self._set_current(prepared)
+                _LOGGER.debug("Playlist drawing %s for %.0fs", prepared.label, prepared.seconds)
+
+                upcoming = await self._prepare_after(prepared.index)
+                lead = self._switch_lead(upcoming) if upcoming is not None else 0.0
+                await asyncio.sleep(max(ends_at - lead - loop.time(), 0.0))
+                prepared = upcoming
+            _LOGGER.debug("Playlist finished")
+        except UpdateFailed as err:
+            self.error = f"Switch to {prepared.label} failed: {err}"
+            _LOGGER.error("Stopping the playlist: %s", self.error)
+        except Exception as err:  # pylint: disable=broad-except
+            self.error = f"Unexpected error: {err}"
+            _LOGGER.exception("Playlist stopped by an unexpected error")
+        finally:
+            self._set_current(None)
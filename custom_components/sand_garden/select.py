@@ -1,20 +1,50 @@
 """Select platform for Sand Garden."""
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Any
 
+import voluptuous as vol
+
 from homeassistant.components.select import SelectEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import API_PATTERN, DOMAIN, PATTERNS
 from .coordinator import SandGardenCoordinator
 from .entity import SandGardenEntity
+from .gallery import async_get_gallery
+from .patterns import SANDSCRIPT_PATTERN
+from .playlist import PlaylistItem, check_script
 
 _LOGGER = logging.getLogger(__name__)
 
+ATTR_PREVIEWS = "previews"
+
+SERVICE_START_PLAYLIST = "start_playlist"
+SERVICE_STOP_PLAYLIST = "stop_playlist"
+SERVICE_RUN_SCRIPT = "run_script"
+
+PLAYLIST_ITEM_SCHEMA = vol.All(
+    {
+        vol.Exclusive("pattern", "source"): vol.Any(
+            vol.In(list(PATTERNS.values())), vol.All(vol.Coerce(int), vol.In(list(PATTERNS)))
+        ),
+        vol.Exclusive("script", "source"): cv.string,
+        vol.Exclusive("duration", "length"): cv.positive_time_period,
+        vol.Exclusive("revolutions", "length"): vol.All(
+            vol.Coerce(float), vol.Range(min=0, min_included=False)
+        ),
+        vol.Optional("name"): cv.string,
+    },
+    cv.has_at_least_one_key("pattern", "script"),
+    cv.has_at_least_one_key("duration", "revolutions"),
+)
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -26,12 +56,27 @@ async def async_setup_entry(
 
     async_add_entities([SandGardenPatternSelect(coordinator, entry)])
 
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_START_PLAYLIST,
+        {
+            vol.Required("items"): vol.All(cv.ensure_list, [PLAYLIST_ITEM_SCHEMA], vol.Length(min=1)),
+            vol.Optional("loop", default=False): cv.boolean,
+        },
+        "async_start_playlist",
+    )
+    platform.async_register_entity_service(SERVICE_STOP_PLAYLIST, {}, "async_stop_playlist")
+    platform.async_register_entity_service(
+        SERVICE_RUN_SCRIPT, {vol.Required("script"): cv.string}, "async_run_script"
+    )
+
 
 class SandGardenPatternSelect(SandGardenEntity, SelectEntity):
     """Representation of Sand Garden pattern selector."""
 
     _attr_name = "Pattern"
     _attr_icon = "mdi:drawing"
+    _unrecorded_attributes = frozenset({ATTR_PREVIEWS})
 
     def __init__(
         self, coordinator: SandGardenCoordinator, entry: ConfigEntry
@@ -40,6 +85,64 @@ class SandGardenPatternSelect(SandGardenEntity, SelectEntity):
         super().__init__(coordinator, entry)
         self._attr_unique_id = f"{entry.entry_id}_pattern"
         self._attr_options = list(PATTERNS.values())
+        self._preview_keys: dict[int, str] = {}
+        self._preview_script: str | None = None
+        self._preview_task: asyncio.Task | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Start rendering the pattern previews."""
+        await super().async_added_to_hass()
+        # The preview URLs carry an access token; publish them again when it changes.
+        self.async_on_remove(async_get_gallery(self.hass).async_add_listener(self.async_write_ha_state))
+        self._async_refresh_previews()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop waiting for previews."""
+        if self._preview_task is not None:
+            self._preview_task.cancel()
+        await super().async_will_remove_from_hass()
+
+    @callback
+    def _async_refresh_previews(self) -> None:
+        """Look up the previews in the background, rendering missing ones."""
+        self._preview_script = self.coordinator.script_source
+        if self._preview_task is not None:
+            self._preview_task.cancel()
+        self._preview_task = self.hass.async_create_task(
+            self._async_load_previews(self._preview_script)
+        )
+
+    async def _async_load_previews(self, script: str | None) -> None:
+        try:
+            self._preview_keys = await async_get_gallery(self.hass).async_keys(script)
+        except Exception as err:  # noqa: BLE001 - previews are cosmetic
+            _LOGGER.warning("Could not render pattern previews: %s", err)
+            return
+        self.async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Re-render the SandScript preview when the script changes."""
+        if self.coordinator.script_source != self._preview_script:
+            self._async_refresh_previews()
+        super()._handle_coordinator_update()
+
+    @property
+    def entity_picture(self) -> str | None:
+        """Return the preview of the current pattern."""
+        key = self._preview_keys.get(self.coordinator.data.get("pattern"))
+        return async_get_gallery(self.hass).url(key) if key is not None else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the preview of every pattern, by option."""
+        gallery = async_get_gallery(self.hass)
+        return {
+            ATTR_PREVIEWS: {
+                PATTERNS[pattern_id]: gallery.url(key)
+                for pattern_id, key in sorted(self._preview_keys.items())
+            }
+        }
 
     @property
     def current_option(self) -> str | None:
@@ -60,3 +163,34 @@ class SandGardenPatternSelect(SandGardenEntity, SelectEntity):
             # Optimistically update the value
             self.coordinator.data["pattern"] = pattern_id
             self.async_write_ha_state()
+
+    async def async_start_playlist(self, items: list[dict[str, Any]], loop: bool = False) -> None:
+        """Start drawing ``items`` one after another."""
+        playlist = []
+        for item in items:
+            pattern = item.get("pattern", SANDSCRIPT_PATTERN)
+            if isinstance(pattern, str):
+                pattern = next(pid for pid, name in PATTERNS.items() if name == pattern)
+            try:
+                playlist.append(
+                    PlaylistItem(
+                        pattern,
+                        script=item.get("script"),
+                        seconds=item["duration"].total_seconds() if "duration" in item else None,
+                        revolutions=item.get("revolutions"),
+                        name=item.get("name"),
+                    )
+                )
+            except ValueError as err:
+                raise HomeAssistantError(f"Invalid playlist item {len(playlist) + 1}: {err}") from err
+        await self.coordinator.playlist.async_start(playlist, loop)
+
+    async def async_run_script(self, script: str) -> None:
+        """Upload a SandScript; the device compiles it and switches to it."""
+        if (error := check_script(script)) is not None:
+            raise HomeAssistantError(f"Invalid SandScript: {error}")
+        await self.coordinator.async_upload_script(script)
+
+    async def async_stop_playlist(self) -> None:
+        """Stop the playlist, leaving the current pattern drawing."""
+        await self.coordinator.playlist.async_stop()
@@ -0,0 +1,250 @@
+"""Sensor platform for Sand Garden."""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import timedelta
+import logging
+from typing import Any
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN, STATS_SCAN_INTERVAL
+from .coordinator import SandGardenCoordinator
+from .entity import SandGardenEntity
+from .stats import Histogram
+
+_LOGGER = logging.getLogger(__name__)
+
+# The statistics change with every SSE frame; sample them instead of
+# writing state on each coordinator update.
+SCAN_INTERVAL = timedelta(seconds=STATS_SCAN_INTERVAL)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up Sand Garden sensors."""
+    coordinator: SandGardenCoordinator = hass.data[DOMAIN][entry.entry_id]
+
+    async_add_entities([
+        SandGardenPlaylistSensor(coordinator, entry),
+        SandGardenEventRateSensor(coordinator, entry),
+        SandGardenParseTimeSensor(coordinator, entry),
+        SandGardenStateWriteLatencySensor(coordinator, entry),
+        SandGardenCommandLatencySensor(coordinator, entry),
+        SandGardenPollDurationSensor(coordinator, entry),
+        SandGardenReconnectsSensor(coordinator, entry),
+        SandGardenDowntimeSensor(coordinator, entry),
+    ])
+
+
+class SandGardenPlaylistSensor(SandGardenEntity, SensorEntity):
+    """The playlist item being drawn."""
+
+    _attr_name = "Playlist"
+    _attr_icon = "mdi:playlist-play"
+    # The diagnostic sensors set the platform's poll interval; this one
+    # follows the coordinator.
+    _attr_should_poll = False
+
+    def __init__(
+        self, coordinator: SandGardenCoordinator, entry: ConfigEntry
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, entry)
+        self._attr_unique_id = f"{entry.entry_id}_playlist"
+
+    @property
+    def native_value(self) -> str:
+        """Return the current item, or idle, or failed when the playlist gave up."""
+        playlist = self.coordinator.playlist
+        if playlist.current is not None:
+            return playlist.current.label
+        return "failed" if playlist.error is not None else "idle"
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the position in the playlist, when the item ends and why it failed."""
+        playlist = self.coordinator.playlist
+        current = playlist.current
+        return {
+            "item": current.index + 1 if current is not None else None,
+            "items": len(playlist.items) if playlist.active else 0,
+            "loop": playlist.loop,
+            "ends_at": playlist.ends_at.isoformat() if playlist.ends_at else None,
+            "error": playlist.error,
+        }
+
+
+class SandGardenDiagnosticSensor(SandGardenEntity, SensorEntity):
+    """Base for sensors reporting the coordinator's own statistics."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = True
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _key: str
+
+    def __init__(
+        self, coordinator: SandGardenCoordinator, entry: ConfigEntry
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator, entry)
+        self._attr_unique_id = f"{entry.entry_id}_{self._key}"
+
+    @property
+    def available(self) -> bool:
+        """Statistics are available even while the device is not."""
+        return True
+
+    async def async_update(self) -> None:
+        """Values are read from the statistics when the state is written."""
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Ignore device updates; this sensor is polled."""
+
+
+class SandGardenEventRateSensor(SandGardenDiagnosticSensor):
+    """SSE events per second, with a breakdown per event type."""
+
+    _attr_name = "SSE Event Rate"
+    _attr_icon = "mdi:pulse"
+    _attr_native_unit_of_measurement = "events/s"
+    _attr_suggested_display_precision = 2
+    _key = "sse_event_rate"
+
+    @property
+    def native_value(self) -> float:
+        """Return the events per second over the last minute."""
+        return round(sum(self.coordinator.stats.event_rates().values()), 3)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the rate and total of each event type."""
+        stats = self.coordinator.stats
+        return {
+            "per_type": {name: round(rate, 3) for name, rate in stats.event_rates().items()},
+            "totals": {name: counter.total for name, counter in stats.sse_events.items()},
+        }
+
+
+class _HistogramSensor(SandGardenDiagnosticSensor, ABC):
+    """p95 of one latency histogram, with the rest as attributes."""
+
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 1
+
+    @abstractmethod
+    def _histogram(self) -> Histogram:
+        """Return the histogram this sensor reports."""
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the 95th percentile in milliseconds."""
+        return self._histogram().percentile(0.95)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return count, mean, median and max."""
+        summary = self._histogram().as_dict()
+        summary.pop("buckets")
+        return summary
+
+
+class SandGardenParseTimeSensor(_HistogramSensor):
+    """Time to decode and parse an SSE frame."""
+
+    _attr_name = "SSE Parse Time"
+    _attr_icon = "mdi:code-json"
+    _key = "sse_parse_time"
+
+    def _histogram(self) -> Histogram:
+        return self.coordinator.stats.sse_parse
+
+
+class SandGardenStateWriteLatencySensor(_HistogramSensor):
+    """Time from receiving an SSE frame to the entity states being written."""
+
+    _attr_name = "SSE State Write Latency"
+    _attr_icon = "mdi:timer-sand"
+    _key = "sse_state_write_latency"
+
+    def _histogram(self) -> Histogram:
+        return self.coordinator.stats.sse_state_write
+
+
+class SandGardenPollDurationSensor(_HistogramSensor):
+    """Duration of the fallback state poll."""
+
+    _attr_name = "Poll Duration"
+    _attr_icon = "mdi:timer-outline"
+    _key = "poll_duration"
+
+    def _histogram(self) -> Histogram:
+        return self.coordinator.stats.poll
+
+
+class SandGardenCommandLatencySensor(SandGardenDiagnosticSensor):
+    """Round trip of commands, with a breakdown per endpoint."""
+
+    _attr_name = "Command Latency"
+    _attr_icon = "mdi:swap-horizontal"
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 1
+    _key = "command_latency"
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the 95th percentile over all endpoints."""
+        return self.coordinator.stats.command_percentile(0.95)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return count, p95 and errors per endpoint."""
+        stats = self.coordinator.stats
+        return {
+            endpoint: {
+                "count": histogram.count,
+                "p95_ms": histogram.percentile(0.95),
+                "max_ms": round(histogram.max_ms, 1),
+                "errors": stats.command_errors.get(endpoint, 0),
+            }
+            for endpoint, histogram in stats.command_rtt.items()
+        }
+
+
+class SandGardenReconnectsSensor(SandGardenDiagnosticSensor):
+    """Number of times the SSE stream had to be re-established."""
+
+    _attr_name = "SSE Reconnects"
+    _attr_icon = "mdi:connection"
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _key = "sse_reconnects"
+
+    @property
+    def native_value(self) -> int:
+        """Return the reconnect count."""
+        return self.coordinator.stats.reconnects
+
+
+class SandGardenDowntimeSensor(SandGardenDiagnosticSensor):
+    """Time spent without an SSE stream."""
+
+    _attr_name = "SSE Downtime"
+    _attr_icon = "mdi:lan-disconnect"
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_suggested_display_precision = 0
+    _key = "sse_downtime"
+
+    @property
+    def native_value(self) -> float:
+        """Return the accumulated downtime, including an ongoing outage."""
+        return round(self.coordinator.stats.downtime_total(), 1)
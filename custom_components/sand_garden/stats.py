@@ -0,0 +1,191 @@
+"""Low-overhead counters and latency histograms for the coordinator.
+
+No Home Assistant dependencies: recording a sample is a bisect and a few
+integer updates, so it is cheap enough for every SSE frame. Times are taken
+with ``time.monotonic()``/``time.perf_counter()`` by the caller and passed in
+seconds; reports are in milliseconds.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import time
+from typing import Any
+
+# Upper bucket edges in milliseconds; the last bucket is open-ended.
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+RATE_WINDOW = 60  # seconds of history behind an events/sec figure
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms", "last_ms")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms: float | None = None
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000.0
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.last_ms = ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q: float) -> float | None:
+        """Upper edge of the bucket holding the ``q`` quantile (0..1), in ms."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    @property
+    def mean_ms(self) -> float | None:
+        return self.total_ms / self.count if self.count else None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": _round(self.mean_ms),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": _round(self.max_ms),
+            "last_ms": _round(self.last_ms),
+            "buckets": {
+                (f"le_{edge:g}" if index < len(BUCKETS_MS) else "inf"): count
+                for index, (edge, count) in enumerate(zip((*BUCKETS_MS, 0), self.counts))
+                if count
+            },
+        }
+
+
+class RateCounter:
+    """Total count plus a per-second ring for a sliding events/sec figure."""
+
+    __slots__ = ("total", "_slots", "_second", "_started")
+
+    def __init__(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.total = 0
+        self._slots = [0] * RATE_WINDOW
+        self._second = int(now)
+        self._started = now
+
+    def _advance(self, second: int) -> None:
+        gap = second - self._second
+        if gap <= 0:
+            return
+        for step in range(1, min(gap, RATE_WINDOW) + 1):
+            self._slots[(self._second + step) % RATE_WINDOW] = 0
+        self._second = second
+
+    def add(self, now: float, count: int = 1) -> None:
+        second = int(now)
+        self._advance(second)
+        self._slots[second % RATE_WINDOW] += count
+        self.total += count
+
+    def rate(self, now: float) -> float:
+        """Events per second over the last ``RATE_WINDOW`` seconds."""
+        self._advance(int(now))
+        span = min(max(now - self._started, 1.0), RATE_WINDOW)
+        return sum(self._slots) / span
+
+
+@dataclass
+class CoordinatorStats:
+    """Everything the coordinator measures about its device link."""
+
+    sse_events: dict[str, RateCounter] = field(default_factory=dict)
+    sse_parse: Histogram = field(default_factory=Histogram)
+    sse_state_write: Histogram = field(default_factory=Histogram)
+    sse_parse_errors: int = 0
+    command_rtt: dict[str, Histogram] = field(default_factory=dict)
+    command_errors: dict[str, int] = field(default_factory=dict)
+    poll: Histogram = field(default_factory=Histogram)
+    poll_errors: int = 0
+    connects: int = 0
+    downtime: float = 0.0
+    down_since: float | None = None
+
+    def event(self, event_type: str, now: float) -> None:
+        if (counter := self.sse_events.get(event_type)) is None:
+            counter = self.sse_events[event_type] = RateCounter(now)
+        counter.add(now)
+
+    def event_rates(self, now: float | None = None) -> dict[str, float]:
+        now = time.monotonic() if now is None else now
+        return {event_type: counter.rate(now) for event_type, counter in self.sse_events.items()}
+
+    def command(self, endpoint: str, seconds: float, ok: bool = True) -> None:
+        if (histogram := self.command_rtt.get(endpoint)) is None:
+            histogram = self.command_rtt[endpoint] = Histogram()
+        histogram.observe(seconds)
+        if not ok:
+            self.command_errors[endpoint] = self.command_errors.get(endpoint, 0) + 1
+
+    def command_percentile(self, q: float) -> float | None:
+        """Quantile over all endpoints, weighting each by its sample count."""
+        merged = Histogram()
+        for histogram in self.command_rtt.values():
+            merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+            merged.count += histogram.count
+            merged.max_ms = max(merged.max_ms, histogram.max_ms)
+        return merged.percentile(q)
+
+    def connected(self, now: float) -> None:
+        """The SSE stream is up; close any downtime interval."""
+        self.connects += 1
+        if self.down_since is not None:
+            self.downtime += now - self.down_since
+            self.down_since = None
+
+    def disconnected(self, now: float) -> None:
+        if self.down_since is None:
+            self.down_since = now
+
+    @property
+    def reconnects(self) -> int:
+        return max(self.connects - 1, 0)
+
+    def downtime_total(self, now: float | None = None) -> float:
+        """Seconds without an SSE stream, including the current outage."""
+        now = time.monotonic() if now is None else now
+        return self.downtime + (now - self.down_since if self.down_since is not None else 0.0)
+
+    def as_dict(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "sse": {
+                "events": {
+                    event_type: {"total": counter.total, "per_second": round(counter.rate(now), 3)}
+                    for event_type, counter in self.sse_events.items()
+                },
+                "parse": self.sse_parse.as_dict(),
+                "receipt_to_state_write": self.sse_state_write.as_dict(),
+                "parse_errors": self.sse_parse_errors,
+                "reconnects": self.reconnects,
+                "downtime_s": round(self.downtime_total(now), 3),
+                "connected": self.connects > 0 and self.down_since is None,
+            },
+            "commands": {
+                endpoint: {**histogram.as_dict(), "errors": self.command_errors.get(endpoint, 0)}
+                for endpoint, histogram in self.command_rtt.items()
+            },
+            "poll": {**self.poll.as_dict(), "errors": self.poll_errors},
+        }
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 3)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Measure how fast patterns cover (and so erase) the sand.
+
+The track of each pattern or SandScript is swept with a ball of
+``--ball-mm`` width over a disc grid of ``--cell-mm`` cells. Each move is
+sampled along the path the firmware drives (a straight line in radius and
+angle steps, so a spiral arc on the table), and every sample is timed with
+the same per-move motor times ``motion.move_time`` uses. For each cell the
+tool keeps the time the ball first touched it, which gives:
+
+- coverage: the share of the table touched, as a function of elapsed time;
+- t95: the time until 95% of the table has been touched;
+- overdraw: the area the ball swept divided by the area it covered, once at
+  t95 and once for the whole run (1.0 means no sand was raked twice).
+
+Several patterns and scripts can be given at once; they are ranked by t95,
+so the fastest erase pass comes first. Results are cached per source, speed
+and grid under ``$XDG_CACHE_HOME/sand_garden/coverage`` (``--no-cache`` to
+recompute), since long runs take a while to rasterize.
+
+Usage:
+    python3 tools/coverage.py --pattern 1 2 5 7 --moves 30000
+    python3 tools/coverage.py --script erase.pss --steps 200000 --speed 2
+    python3 tools/coverage.py --pattern 5 --script erase.pss --ball-mm 8 --json
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "custom_components" / "sand_garden"))
+
+import motion  # noqa: E402
+import patterns  # noqa: E402
+import sandscript as ss  # noqa: E402
+
+DEFAULT_BALL_MM = 10.0  # groove width; measure the one your ball leaves
+DEFAULT_CELL_MM = 1.0
+TARGET_COVERAGE = 0.95
+CURVE_POINTS = 50
+SCRIPT_STEP_MS = 4  # SANDSCRIPT_MIN_STEP_INTERVAL_US
+CHUNK_SAMPLES = 1 << 16
+CACHE_VERSION = 1  # bump when the rasterization changes
+_RAD_PER_STEP = 2.0 * math.pi / ss.STEPS_PER_A_AXIS_REV
+
+
+@dataclass
+class Coverage:
+    source: str
+    speed: float
+    moves: int
+    seconds: float
+    coverage: float  # share of the disc touched by the end of the run
+    t95: float | None  # seconds until TARGET_COVERAGE, None when never reached
+    overdraw: float
+    overdraw_at_t95: float | None
+    curve: list[tuple[float, float]]  # (seconds, coverage)
+
+
+def _cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "sand_garden" / "coverage"
+
+
+def _cache_key(source: str, content: str, args: argparse.Namespace, speed: float) -> str:
+    key = json.dumps(
+        [CACHE_VERSION, source, content, args.moves, args.steps, args.seed, speed, args.ball_mm, args.cell_mm],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]
+
+
+def track_times(track: np.ndarray, start: ss.Positions, multiplier: float, min_ms: float) -> np.ndarray:
+    """Seconds each move of an unwrapped ``(radial, angular)`` track takes."""
+    radial = np.concatenate(([start.radial], track[:, 0]))
+    angular = np.concatenate(([start.angular], track[:, 1]))
+    d_angular = np.diff(angular)
+    d_radial = np.diff(radial)
+    seconds = motion.move_times(radial[:-1], d_angular, d_radial, multiplier)
+    # A position the table already holds costs nothing for a pattern; a
+    # script evaluation still waits out its step interval.
+    return np.where((d_angular != 0) | (d_radial != 0), np.maximum(seconds, min_ms / 1000.0), min_ms / 1000.0)
+
+
+def _samples(track: np.ndarray, times: np.ndarray, start: ss.Positions, spacing_mm: float):
+    """Yield ``(x_mm, y_mm, seconds, move index)`` chunks sampled along each move's arc."""
+    radial = np.concatenate(([start.radial], track[:, 0]))
+    angular = np.concatenate(([start.angular], track[:, 1]))
+    ends = np.cumsum(times)
+    begins = ends - times
+    first = 0
+    while first < len(times):
+        # Moves worth about CHUNK_SAMPLES samples at a time
+        r0, a0 = radial[first : first + 1 + CHUNK_SAMPLES], angular[first : first + 1 + CHUNK_SAMPLES]
+        dr, da = np.diff(r0), np.diff(a0)
+        r0, a0 = r0[:-1], a0[:-1]
+        length = (np.abs(dr) + np.maximum(r0, r0 + dr) * np.abs(da) * _RAD_PER_STEP) / motion.STEPS_PER_MM
+        counts = np.maximum(np.ceil(length / spacing_mm), 1).astype(np.int64)
+        limit = max(int(np.searchsorted(np.cumsum(counts), CHUNK_SAMPLES)), 1)
+        counts = counts[:limit]
+        move = np.repeat(np.arange(limit), counts)
+        offsets = np.arange(len(move)) - np.repeat(np.cumsum(counts) - counts, counts)
+        s = (offsets + 1) / counts[move]  # the move's start was the previous move's end
+        r = r0[move] + s * dr[move]
+        theta = (a0[move] + s * da[move]) * _RAD_PER_STEP
+        r_mm = r / motion.STEPS_PER_MM
+        yield r_mm * np.cos(theta), r_mm * np.sin(theta), begins[first + move] + s * times[first + move], first + move
+        first += limit
+
+
+def rasterize(
+    track: list[ss.Positions],
+    *,
+    multiplier: float = 1.0,
+    min_ms: float = 0.0,
+    ball_mm: float = DEFAULT_BALL_MM,
+    cell_mm: float = DEFAULT_CELL_MM,
+    start: ss.Positions = ss.Positions(0, 0),
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """First-touch time per disc cell (inf if never), and the end time and path length (mm) of each move."""
+    unwrapped = np.array(list(motion.unwrap(track, start)), dtype=np.float64).reshape(-1, 2)
+    times = track_times(unwrapped, start, multiplier, min_ms)
+
+    table_mm = ss.MAX_R_STEPS / motion.STEPS_PER_MM
+    size = int(math.ceil(table_mm / cell_mm))
+    centres = (np.arange(-size, size + 1)) * cell_mm
+    inside = (centres[:, None] ** 2 + centres[None, :] ** 2) <= table_mm**2
+    width = 2 * size + 1
+    first_touch = np.full(width * width, np.inf)
+
+    ball_cells = int(math.ceil(ball_mm / 2.0 / cell_mm))
+    offsets = np.arange(-ball_cells, ball_cells + 1)
+    ox, oy = np.meshgrid(offsets, offsets, indexing="ij")
+    in_ball = (ox * cell_mm) ** 2 + (oy * cell_mm) ** 2 <= (ball_mm / 2.0) ** 2
+    stamp = (ox[in_ball] * width + oy[in_ball]).ravel()
+
+    spacing = min(cell_mm, ball_mm) / 2.0
+    length = np.zeros(len(times))
+    last = motion.to_xy_mm(start.radial, start.angular)
+    for x, y, t, move in _samples(unwrapped, times, start, spacing):
+        segments = np.hypot(np.diff(x, prepend=last[0]), np.diff(y, prepend=last[1]))
+        length += np.bincount(move, weights=segments, minlength=len(times))
+        last = (x[-1], y[-1])
+        ix = np.clip(np.rint(x / cell_mm).astype(np.int64) + size, ball_cells, width - 1 - ball_cells)
+        iy = np.clip(np.rint(y / cell_mm).astype(np.int64) + size, ball_cells, width - 1 - ball_cells)
+        cells = ((ix * width + iy)[:, None] + stamp[None, :]).ravel()
+        touched = np.repeat(t, len(stamp))
+        # Samples come in time order, so a cell's first index is its first touch
+        cells, first = np.unique(cells, return_index=True)
+        first_touch[cells] = np.minimum(first_touch[cells], touched[first])
+
+    return first_touch.reshape(width, width)[inside], np.cumsum(times), np.cumsum(length)
+
+
+def measure(source: str, track: list[ss.Positions], args: argparse.Namespace, speed: float, min_ms: float) -> Coverage:
+    first_touch, ends, lengths = rasterize(
+        track, multiplier=speed, min_ms=min_ms, ball_mm=args.ball_mm, cell_mm=args.cell_mm
+    )
+    cell_area = args.cell_mm**2
+    ball_area = math.pi * (args.ball_mm / 2.0) ** 2
+    touched = np.sort(first_touch[np.isfinite(first_touch)])
+    total = len(first_touch)
+    seconds = float(ends[-1])
+
+    def overdraw(at: float, covered: int) -> float:
+        swept = float(np.interp(at, ends, lengths, left=0.0)) * args.ball_mm + ball_area
+        return swept / max(covered * cell_area, cell_area)
+
+    t95 = overdraw_95 = None
+    needed = int(math.ceil(TARGET_COVERAGE * total))
+    if len(touched) >= needed:
+        t95 = float(touched[needed - 1])
+        overdraw_95 = overdraw(t95, needed)
+
+    grid = np.linspace(0.0, seconds, CURVE_POINTS + 1)
+    curve = np.searchsorted(touched, grid, side="right") / total
+    return Coverage(
+        source=source,
+        speed=speed,
+        moves=len(track),
+        seconds=seconds,
+        coverage=len(touched) / total,
+        t95=t95,
+        overdraw=overdraw(seconds, len(touched)),
+        overdraw_at_t95=overdraw_95,
+        curve=[(float(t), float(c)) for t, c in zip(grid, curve)],
+    )
+
+
+def _sources(args: argparse.Namespace):
+    """Yield ``(label, cache content, track factory, min step ms)`` per source."""
+    for pattern_id in args.pattern or ():
+        yield (
+            f"pattern {pattern_id}",
+            f"pattern:{pattern_id}",
+            lambda pattern_id=pattern_id: list(patterns.generate(pattern_id, args.moves, seed=args.seed)),
+            0.0,
+        )
+    for path in args.script or ():
+        source = path.read_text()
+
+        def run(source: str = source, path: Path = path) -> list[ss.Positions]:
+            track = []
+            for position, fault in ss.simulate(ss.compile_script(source), args.steps, seed=args.seed):
+                if fault:
+                    print(f"{path}: script faulted (mask 0x{fault:02x}) after {len(track)} steps", file=sys.stderr)
+                    break
+                track.append(position)
+            return track
+
+        yield str(path), f"script:{source}", run, float(SCRIPT_STEP_MS)
+
+
+def _minutes(seconds: float | None) -> str:
+    return "-" if seconds is None else f"{seconds / 60:.1f}m"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pattern", type=int, nargs="+", choices=sorted(patterns.GENERATORS), help="built-in pattern ids")
+    parser.add_argument("--script", type=Path, nargs="+", help="SandScript source files")
+    parser.add_argument("--moves", type=int, default=20000, help="pattern loop iterations to generate")
+    parser.add_argument("--steps", type=int, default=100000, help="SandScript evaluations to run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--speed", type=float, default=1.0, help="speed multiplier")
+    parser.add_argument("--ball-mm", type=float, default=DEFAULT_BALL_MM, help="width of the groove the ball leaves")
+    parser.add_argument("--cell-mm", type=float, default=DEFAULT_CELL_MM, help="grid resolution")
+    parser.add_argument("--no-cache", action="store_true", help="recompute even when a cached result exists")
+    parser.add_argument("--cache-dir", type=Path, default=None, help="where results are cached")
+    parser.add_argument("--json", action="store_true", help="print the results with their coverage curves")
+    args = parser.parse_args(argv)
+    if not args.pattern and not args.script:
+        parser.error("give --pattern and/or --script")
+    if args.ball_mm <= 0 or args.cell_mm <= 0:
+        parser.error("--ball-mm and --cell-mm must be positive")
+
+    speed = motion.clamp_multiplier(args.speed)
+    cache = args.cache_dir or _cache_dir()
+    results = []
+    for label, content, make_track, min_ms in _sources(args):
+        path = cache / f"{_cache_key(label, content, args, speed)}.json"
+        if not args.no_cache and path.exists():
+            results.append(Coverage(**json.loads(path.read_text())))
+            continue
+        try:
+            track = make_track()
+        except ss.SandScriptError as err:
+            print(f"{label}: {err}", file=sys.stderr)
+            continue
+        if not track:
+            print(f"{label}: track is empty", file=sys.stderr)
+            continue
+        result = measure(label, track, args, speed, min_ms)
+        results.append(result)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(asdict(result)))
+
+    results.sort(key=lambda result: (result.t95 is None, result.t95 or 0.0, -result.coverage))
+    if args.json:
+        print(json.dumps([asdict(result) for result in results], indent=2))
+        return 0 if results else 1
+
+    width = max((len(result.source) for result in results), default=6)
+    print(f"{'source':<{width}}  {'moves':>7}  {'run':>7}  {'covered':>7}  {'t95':>7}  {'overdraw@95':>11}  {'overdraw':>8}")
+    for result in results:
+        at_95 = "-" if result.overdraw_at_t95 is None else f"{result.overdraw_at_t95:.2f}"
+        print(
+            f"{result.source:<{width}}  {result.moves:>7}  {_minutes(result.seconds):>7}  {result.coverage:>7.1%}  "
+            f"{_minutes(result.t95):>7}  {at_95:>11}  {result.overdraw:>8.2f}"
+        )
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
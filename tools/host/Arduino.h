@@ -0,0 +1,39 @@
+// ---------------------------------------------------------------------------------------------------------------------
+// Arduino.h - minimal host shim so PatternScript.cpp builds with a desktop C++ compiler
+// Only what the SandScript runtime touches: String, millis() and random(). Clock and RNG are driven by psg_host.cpp
+// so runs are reproducible and can be replayed by the Python reference evaluator.
+// ---------------------------------------------------------------------------------------------------------------------
+#pragma once
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+#include <string>
+
+extern uint32_t g_hostMillis;      // value returned by millis()
+extern uint32_t g_hostRandomSeed;  // value returned by random() (stands in for esp_random())
+
+inline uint32_t millis() { return g_hostMillis; }
+inline long psg_host_random() { return (long)g_hostRandomSeed; }
+#define random psg_host_random
+
+class String {
+public:
+  String() {}
+  String(const char *s) : _s(s ? s : "") {}
+  String(const std::string &s) : _s(s) {}
+  explicit String(int v) : _s(std::to_string(v)) {}
+  explicit String(unsigned int v) : _s(std::to_string(v)) {}
+  explicit String(long v) : _s(std::to_string(v)) {}
+  explicit String(unsigned long v) : _s(std::to_string(v)) {}
+
+  String &operator+=(const String &rhs) { _s += rhs._s; return *this; }
+  String &operator+=(const char *rhs) { _s += rhs ? rhs : ""; return *this; }
+  String &operator+=(char c) { _s += c; return *this; }
+
+  const char *c_str() const { return _s.c_str(); }
+  unsigned int length() const { return (unsigned int)_s.size(); }
+
+private:
+  std::string _s;
+};
@@ -0,0 +1,138 @@
+// ---------------------------------------------------------------------------------------------------------------------
+// psg_host.cpp - host driver for the SandScript runtime (PatternScript.cpp), used by tools/sandscript_fuzz.py
+//
+// Writes the time of a fixed calibration loop before the first job and after the last, so timings can be compared
+// across machines as ratios:
+//   C <calibrationNs>
+// Then reads jobs from stdin, one per script:
+//   <steps> <seed> <compileReps> <evalReps> <byteLen>\n<byteLen bytes of script>\n
+// and writes for each job:
+//   P <compileResult> <compileNs> <evalNsPerStep> <error message>
+//   S <inRadial> <inAngular> <outRadial> <outAngular> <faultMask>     (one line per evaluation)
+//   E
+// The step loop mirrors pattern_SandScript(): 4 ms per evaluation, constrain/modulus on the result, stop on fault.
+// ---------------------------------------------------------------------------------------------------------------------
+#include "Arduino.h"
+#include "../../PatternScript.h"
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdio>
+#include <vector>
+
+uint32_t g_hostMillis = 0;
+uint32_t g_hostRandomSeed = 1;
+
+static const int MAX_R_STEPS = 7000;
+static const int STEPS_PER_A_AXIS_REV = 4096;
+static const uint32_t STEP_INTERVAL_MS = 4;
+
+static int modulus(int x, int y) {
+  return x < 0 ? ((x + 1) % y) + y - 1 : x % y;
+}
+
+struct StepRecord {
+  Positions in;
+  Positions out;
+  uint8_t faultMask;
+};
+
+static size_t runSteps(const PatternScript &ps, uint32_t steps, std::vector<StepRecord> *trace) {
+  PatternScriptRuntime rt;
+  Positions current = {0, 0};
+  size_t evaluated = 0;
+  for (uint32_t i = 0; i < steps; ++i) {
+    g_hostMillis = i * STEP_INTERVAL_MS;
+    Positions next = evalPatternScript(ps, rt, current, i == 0);
+    evaluated++;
+    if (rt.faulted) {
+      if (trace) trace->push_back({current, current, rt.faultMask});
+      break;
+    }
+    next.radial = next.radial < 0 ? 0 : (next.radial > MAX_R_STEPS ? MAX_R_STEPS : next.radial);
+    next.angular = modulus(next.angular, STEPS_PER_A_AXIS_REV);
+    if (trace) trace->push_back({current, next, 0});
+    current = next;
+  }
+  return evaluated;
+}
+
+// A fixed mix of float arithmetic, libm calls and branches, roughly what an evaluation does per op. The median of
+// several runs is kept, the same statistic the per-family timings use.
+static double calibrate() {
+  static const int ITERATIONS = 200000;
+  static const int RUNS = 9;
+  volatile float sink = 0.0f;
+  double times[RUNS];
+  for (int run = 0; run < RUNS; ++run) {
+    float x = 0.5f + sink;
+    auto t0 = std::chrono::steady_clock::now();
+    for (int i = 0; i < ITERATIONS; ++i) {
+      x = fmodf(x * 1.0001f + sinf(x) + (float)i, 360.0f);
+      if (x < 0.0f) x = -x;
+    }
+    auto t1 = std::chrono::steady_clock::now();
+    sink = x;
+    times[run] = std::chrono::duration<double, std::nano>(t1 - t0).count();
+  }
+  std::sort(times, times + RUNS);
+  return times[RUNS / 2];
+}
+
+int main() {
+  printf("C %.1f\n", calibrate());
+  fflush(stdout);
+
+  PatternScriptUnits units;
+  units.stepsPerCm = 700.0f;
+  units.stepsPerDeg = (float)(STEPS_PER_A_AXIS_REV) / 360;
+  units.maxRadiusCm = (float)MAX_R_STEPS / units.stepsPerCm;
+  configurePatternScriptUnits(units);
+
+  unsigned long steps, seed, compileReps, evalReps, len;
+  std::vector<char> source;
+  std::vector<StepRecord> trace;
+  static PatternScript ps;
+
+  while (scanf("%lu %lu %lu %lu %lu", &steps, &seed, &compileReps, &evalReps, &len) == 5) {
+    getchar();  // newline after header
+    source.assign(len + 1, '\0');
+    if (len && fread(source.data(), 1, len, stdin) != len) return 1;
+    getchar();  // newline after script
+
+    g_hostRandomSeed = (uint32_t)seed;
+    if (compileReps == 0) compileReps = 1;
+
+    String err;
+    PSGCompileResult res = PSG_OK;
+    auto t0 = std::chrono::steady_clock::now();
+    for (unsigned long r = 0; r < compileReps; ++r) {
+      err = String();
+      res = compilePatternScript(source.data(), ps, &err);
+    }
+    auto t1 = std::chrono::steady_clock::now();
+    double compileNs = std::chrono::duration<double, std::nano>(t1 - t0).count() / compileReps;
+
+    trace.clear();
+    double evalNs = 0.0;
+    if (res == PSG_OK) {
+      runSteps(ps, (uint32_t)steps, &trace);
+      size_t evaluated = 0;
+      auto t2 = std::chrono::steady_clock::now();
+      for (unsigned long r = 0; r < evalReps; ++r) {
+        evaluated += runSteps(ps, (uint32_t)steps, nullptr);
+      }
+      auto t3 = std::chrono::steady_clock::now();
+      if (evaluated) evalNs = std::chrono::duration<double, std::nano>(t3 - t2).count() / evaluated;
+    }
+
+    printf("P %d %.1f %.2f %s\n", (int)res, compileNs, evalNs, err.c_str());
+    for (const StepRecord &rec : trace) {
+      printf("S %d %d %d %d %u\n", rec.in.radial, rec.in.angular, rec.out.radial, rec.out.angular, rec.faultMask);
+    }
+    printf("E\n");
+    fflush(stdout);
+  }
+  printf("C %.1f\n", calibrate());
+  return 0;
+}
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""Stroke ordering optimizer for multi-stroke Sand Garden drawings.
+
+A drawing made of many disjoint strokes wastes run time if the ball crosses
+the table between them in file order. This tool picks the order and the
+direction of every stroke to shorten the travel moves in between:
+
+1. Nearest-neighbour start. A KD-tree over the stroke endpoints proposes the
+   closest candidates, which are then ranked by real move time.
+2. 2-opt improvement over per-endpoint candidate lists with don't-look bits.
+   Reversing a run of the tour also flips the direction of each stroke in it.
+
+Costs are what the firmware pays for a move (see motion.py). Both axes run
+at constant speed and finish together. The radial motor also turns for
+every angular step because of the rack coupling, and the angular axis is
+derated towards the rim. So a half turn near the centre is slow even though
+it covers almost no distance. The KD-tree works in (angular, angular -
+radial) step space under the Chebyshev norm, which matches that cost at the
+centre, with the angle wrapped so the short way round is always found.
+Travel costs are made symmetric by derating at the larger of the two radii.
+
+Input files are CSV ``radial,angular`` steps, with blank lines between
+strokes, or ``.thr`` files, each one stroke. The output uses the same CSV
+layout.
+
+Usage:
+    python3 tools/order_strokes.py drawing.csv -o drawing_ordered.csv
+    python3 tools/order_strokes.py part1.thr part2.thr part3.thr --start 0,0
+    python3 tools/order_strokes.py --demo 20000
+"""
+from __future__ import annotations
+
+import argparse
+from collections import deque
+import heapq
+import math
+from pathlib import Path
+import random
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "custom_components" / "sand_garden"))
+
+import motion  # noqa: E402
+import sandscript as ss  # noqa: E402
+from simplify_path import read_thr  # noqa: E402
+
+REV = ss.STEPS_PER_A_AXIS_REV
+HALF_REV = motion.HALF_REV
+CANDIDATES = 8  # neighbours per endpoint for 2-opt
+LEAF_SIZE = 16
+_TOP_A = motion.MAX_SPEED_A_MOTOR
+_FLOOR_A = motion.ANGULAR_FLOOR_SPEED
+_SLOPE_A = (_TOP_A - _FLOOR_A) / ss.MAX_R_STEPS
+
+
+class KDTree:
+    """Static 2-d tree with point deletion and Chebyshev k-nearest queries."""
+
+    def __init__(self, points: np.ndarray) -> None:
+        self.points = points.tolist()
+        self.alive = [True] * len(points)
+        # Node arrays: point range in perm, children, bounding box, live point count, parent.
+        self.lo: list[int] = []
+        self.hi: list[int] = []
+        self.left: list[int] = []
+        self.right: list[int] = []
+        self.box: list[tuple[float, float, float, float]] = []
+        self.count: list[int] = []
+        self.parent: list[int] = []
+        self.leaf_of = [0] * len(points)
+        perm = np.arange(len(points))
+        stack = [(0, len(points), -1, False)]
+        while stack:
+            lo, hi, parent, is_right = stack.pop()
+            node = len(self.lo)
+            subset = points[perm[lo:hi]]
+            mins, maxs = subset.min(axis=0), subset.max(axis=0)
+            self.lo.append(lo)
+            self.hi.append(hi)
+            self.left.append(-1)
+            self.right.append(-1)
+            self.box.append((float(mins[0]), float(mins[1]), float(maxs[0]), float(maxs[1])))
+            self.count.append(hi - lo)
+            self.parent.append(parent)
+            if parent >= 0:
+                if is_right:
+                    self.right[parent] = node
+                else:
+                    self.left[parent] = node
+            if hi - lo <= LEAF_SIZE:
+                for index in perm[lo:hi]:
+                    self.leaf_of[index] = node
+                continue
+            dim = int(np.argmax(maxs - mins))
+            mid = (lo + hi) // 2
+            order = np.argpartition(subset[:, dim], mid - lo)
+            perm[lo:hi] = perm[lo:hi][order]
+            stack.append((mid, hi, node, True))
+            stack.append((lo, mid, node, False))
+        self.perm = perm.tolist()
+
+    def remove(self, index: int) -> None:
+        if not self.alive[index]:
+            return
+        self.alive[index] = False
+        node = self.leaf_of[index]
+        while node >= 0:
+            self.count[node] -= 1
+            node = self.parent[node]
+
+    def query(self, x: float, y: float, k: int) -> list[tuple[float, int]]:
+        """Up to ``k`` live points nearest to (x, y), as (distance, index) sorted."""
+        best: list[tuple[float, int]] = []  # max-heap by negated distance
+        worst = math.inf
+        points, alive, perm, box, count = self.points, self.alive, self.perm, self.box, self.count
+        left_of, right_of, lo_of, hi_of = self.left, self.right, self.lo, self.hi
+        stack = [(0.0, 0)]
+        while stack:
+            bound, node = stack.pop()
+            if bound >= worst or count[node] == 0:
+                continue
+            left = left_of[node]
+            if left < 0:
+                for slot in range(lo_of[node], hi_of[node]):
+                    index = perm[slot]
+                    if not alive[index]:
+                        continue
+                    px, py = points[index]
+                    dist = max(abs(px - x), abs(py - y))
+                    if dist < worst:
+                        if len(best) < k:
+                            heapq.heappush(best, (-dist, index))
+                        else:
+                            heapq.heapreplace(best, (-dist, index))
+                        if len(best) == k:
+                            worst = -best[0][0]
+                continue
+            right = right_of[node]
+            x0, y0, x1, y1 = box[left]
+            dl = max(x0 - x, x - x1, y0 - y, y - y1, 0.0)
+            x0, y0, x1, y1 = box[right]
+            dr = max(x0 - x, x - x1, y0 - y, y - y1, 0.0)
+            # Visit the nearer child first (pushed last).
+            if dl <= dr:
+                stack.append((dr, right))
+                stack.append((dl, left))
+            else:
+                stack.append((dl, left))
+                stack.append((dr, right))
+        return sorted((-dist, index) for dist, index in best)
+
+
+class StrokeSet:
+    """Strokes as step lists plus the geometry of their endpoints.
+
+    Endpoint ``2 * s`` is the first point of stroke ``s`` and ``2 * s + 1``
+    the last one; the extra endpoint ``2 * n`` is the start position.
+    """
+
+    def __init__(self, strokes: list[list[ss.Positions]], start: ss.Positions) -> None:
+        self.strokes = strokes
+        radial, angular = [], []
+        for stroke in strokes:
+            for point in (stroke[0], stroke[-1]):
+                radial.append(min(max(point.radial, 0), ss.MAX_R_STEPS))
+                angular.append(motion.modulus(point.angular))
+        radial.append(min(max(start.radial, 0), ss.MAX_R_STEPS))
+        angular.append(motion.modulus(start.angular))
+        self.radial = radial
+        self.angular = angular
+        self.depot = 2 * len(strokes)
+
+    def cost(self, e1: int, e2: int) -> float:
+        """Symmetric travel time (s) between two endpoints.
+
+        This is motion.move_time() at the larger radius, inlined because 2-opt
+        calls it millions of times.
+        """
+        r1, r2 = self.radial[e1], self.radial[e2]
+        delta = (self.angular[e2] - self.angular[e1]) % REV
+        if delta > HALF_REV:
+            delta -= REV
+        angular_speed = _TOP_A - _SLOPE_A * (r1 if r1 > r2 else r2)
+        angular_time = abs(delta) / (angular_speed if angular_speed > _FLOOR_A else _FLOOR_A)
+        radial_time = abs(delta - r2 + r1) / motion.MAX_SPEED_R_MOTOR
+        return angular_time if angular_time > radial_time else radial_time
+
+    def tree_points(self) -> np.ndarray:
+        """Endpoints in (angular, angular - radial) space, wrapped copies appended."""
+        a = np.array(self.angular[: self.depot], dtype=np.float64)
+        r = np.array(self.radial[: self.depot], dtype=np.float64)
+        shift = np.where(a < HALF_REV, REV, -REV)
+        return np.concatenate([np.stack([a, a - r], axis=1), np.stack([a + shift, a + shift - r], axis=1)])
+
+
+class Tour:
+    """Stroke order, per-stroke direction and inverse index."""
+
+    def __init__(self, strokes: StrokeSet, order: list[int], flipped: list[bool]) -> None:
+        self.s = strokes
+        self.order = np.array(order, dtype=np.int64)
+        self.flipped = np.array(flipped, dtype=np.int8)
+        self.pos = np.empty(len(order), dtype=np.int64)
+        self.pos[self.order] = np.arange(len(order))
+
+    def entry(self, position: int) -> int:
+        stroke = int(self.order[position])
+        return 2 * stroke + int(self.flipped[stroke])
+
+    def exit(self, position: int) -> int:
+        if position < 0:
+            return self.s.depot
+        stroke = int(self.order[position])
+        return 2 * stroke + 1 - int(self.flipped[stroke])
+
+    def travel(self) -> float:
+        total = 0.0
+        previous = self.s.depot
+        for position in range(len(self.order)):
+            total += self.s.cost(previous, self.entry(position))
+            previous = self.exit(position)
+        return total
+
+    def reverse(self, i: int, j: int) -> None:
+        """Reverse positions i+1..j and flip the strokes in that run."""
+        run = self.order[i + 1 : j + 1][::-1].copy()
+        self.order[i + 1 : j + 1] = run
+        self.flipped[run] ^= 1
+        self.pos[run] = np.arange(i + 1, j + 1)
+
+
+def nearest_neighbour(strokes: StrokeSet) -> Tour:
+    """Greedy tour: always travel to the cheapest endpoint among the KD-tree candidates."""
+    count = len(strokes.strokes)
+    points = strokes.tree_points()
+    tree = KDTree(points)
+    order, flipped = [], []
+    current = strokes.depot
+    k = CANDIDATES
+    for _ in range(count):
+        x = float(strokes.angular[current])
+        y = x - strokes.radial[current]
+        found = tree.query(x, y, k)
+        best = min(found, key=lambda item: strokes.cost(current, item[1] % (2 * count)))
+        endpoint = best[1] % (2 * count)
+        stroke = endpoint // 2
+        order.append(stroke)
+        flipped.append(bool(endpoint & 1))
+        for end in (2 * stroke, 2 * stroke + 1):
+            tree.remove(end)
+            tree.remove(end + 2 * count)
+        current = endpoint ^ 1
+    return Tour(strokes, order, flipped)
+
+
+def candidate_lists(strokes: StrokeSet) -> list[list[tuple[int, float]]]:
+    """For every endpoint, the CANDIDATES cheapest other endpoints near it, with their costs.
+
+    All endpoints are queried at once, so instead of one KD-tree walk each
+    this bins the same (angular, angular - radial) points into a grid and
+    compares every cell against its neighbourhood in one vectorized step.
+    """
+    count = 2 * len(strokes.strokes)
+    points = strokes.tree_points()
+    owner = np.concatenate([np.arange(count), np.arange(count)])
+    span = points.max(axis=0) - points.min(axis=0) + 1.0
+    cell = max(float(np.sqrt(span[0] * span[1] * 4.0 / len(points))), 1.0)
+    keys = np.floor((points - points.min(axis=0)) / cell).astype(np.int64)
+    width = int(keys[:, 0].max()) + 1
+    flat = keys[:, 1] * width + keys[:, 0]
+    order = np.argsort(flat, kind="stable")
+    flat_sorted = flat[order]
+    cells, starts = np.unique(flat_sorted, return_index=True)
+    ends = np.append(starts[1:], len(order))
+    slots = dict(zip(cells.tolist(), zip(starts.tolist(), ends.tolist())))
+
+    lists: list[list[tuple[int, float]]] = [[] for _ in range(count)]
+    for key, (start, end) in slots.items():
+        queries = order[start:end]
+        queries = queries[queries < count]
+        if not len(queries):
+            continue
+        cx, cy = key % width, key // width
+        reach = 1
+        while True:
+            block = []
+            for dy in range(-reach, reach + 1):
+                for dx in range(-reach, reach + 1):
+                    slot = slots.get((cy + dy) * width + cx + dx)
+                    if slot is not None:
+                        block.append(order[slot[0] : slot[1]])
+            near = np.concatenate(block)
+            if len(near) > CANDIDATES + 2 or len(near) >= len(points):
+                break
+            reach += 1
+        diff = np.abs(points[queries][:, None, :] - points[near][None, :, :]).max(axis=2)
+        take = min(CANDIDATES + 2, len(near))
+        nearest = np.argpartition(diff, take - 1, axis=1)[:, :take]
+        for row, endpoint in enumerate(queries.tolist()):
+            found = set(owner[near[nearest[row]]].tolist())
+            found.discard(endpoint)
+            ranked = sorted((strokes.cost(endpoint, other), other) for other in found)
+            lists[endpoint] = [(other, cost) for cost, other in ranked[:CANDIDATES]]
+    return lists
+
+
+def two_opt(tour: Tour, candidates: list[list[tuple[int, float]]], deadline: float) -> int:
+    """Improve ``tour`` in place; returns the number of moves applied."""
+    s = tour.s
+    n = len(tour.order)
+    queue = deque(range(n))
+    queued = [True] * n
+    moves = 0
+
+    def gain(i: int, j: int) -> float:
+        a, b = tour.exit(i), tour.entry(i + 1)
+        c = tour.exit(j)
+        removed = s.cost(a, b)
+        added = s.cost(a, c)
+        if j + 1 < n:
+            d = tour.entry(j + 1)
+            removed += s.cost(c, d)
+            added += s.cost(b, d)
+        return removed - added
+
+    def wake(*positions: int) -> None:
+        for position in positions:
+            if 0 <= position < n:
+                stroke = int(tour.order[position])
+                if not queued[stroke]:
+                    queued[stroke] = True
+                    queue.append(stroke)
+
+    while queue:
+        if time.perf_counter() > deadline:
+            break
+        stroke = queue.popleft()
+        queued[stroke] = False
+        improved = True
+        while improved:
+            improved = False
+            p = int(tour.pos[stroke])
+            # Successor side: exit of p gets a new neighbour, the exit of a later stroke.
+            a = tour.exit(p)
+            if p + 1 < n:
+                current = s.cost(a, tour.entry(p + 1))
+                for c, cost in candidates[a]:
+                    if cost >= current:
+                        break
+                    q = int(tour.pos[c // 2])
+                    if q > p and tour.exit(q) == c and gain(p, q) > 1e-9:
+                        tour.reverse(p, q)
+                        wake(p, p + 1, q, q + 1)
+                        moves += 1
+                        improved = True
+                        break
+            if improved:
+                continue
+            # Predecessor side: entry of p gets a new neighbour, the entry of an earlier stroke.
+            b = tour.entry(p)
+            current = s.cost(tour.exit(p - 1), b)
+            for c, cost in candidates[b]:
+                if cost >= current:
+                    break
+                q = int(tour.pos[c // 2])
+                if q < p and tour.entry(q) == c and gain(q - 1, p - 1) > 1e-9:
+                    tour.reverse(q - 1, p - 1)
+                    wake(q - 1, q, p - 1, p)
+                    moves += 1
+                    improved = True
+                    break
+    return moves
+
+
+def optimize(
+    strokes: list[list[ss.Positions]], start: ss.Positions = ss.Positions(0, 0), time_limit: float = 30.0
+) -> tuple[list[list[ss.Positions]], dict[str, float]]:
+    """Reorder and orient ``strokes``; returns them with a summary of travel times."""
+    started = time.perf_counter()
+    data = StrokeSet(strokes, start)
+    stats = {"input_travel_s": Tour(data, list(range(len(strokes))), [False] * len(strokes)).travel()}
+    tour = nearest_neighbour(data)
+    stats["nn_travel_s"] = tour.travel()
+    stats["nn_s"] = time.perf_counter() - started
+    candidates = candidate_lists(data)
+    stats["moves"] = two_opt(tour, candidates, started + time_limit)
+    stats["travel_s"] = tour.travel()
+    stats["elapsed_s"] = time.perf_counter() - started
+    ordered = []
+    for stroke in tour.order.tolist():
+        points = strokes[stroke]
+        ordered.append(points[::-1] if tour.flipped[stroke] else points)
+    return ordered, stats
+
+
+def read_strokes(path: Path) -> list[list[ss.Positions]]:
+    if path.suffix.lower() == ".thr":
+        track = read_thr(path)
+        return [track] if track else []
+    strokes: list[list[ss.Positions]] = [[]]
+    for raw in path.read_text().splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if not line:
+            if strokes[-1] and not raw.strip().startswith("#"):
+                strokes.append([])
+            continue
+        fields = line.replace(";", ",").split(",")
+        try:
+            strokes[-1].append(ss.Positions(int(float(fields[0])), int(float(fields[1]))))
+        except (ValueError, IndexError):
+            continue
+    return [stroke for stroke in strokes if stroke]
+
+
+def write_strokes(path: Path, strokes: list[list[ss.Positions]]) -> None:
+    blocks = ["\n".join(f"{p.radial},{p.angular}" for p in stroke) for stroke in strokes]
+    path.write_text("radial,angular\n" + "\n\n".join(blocks) + "\n")
+
+
+def demo_strokes(count: int, seed: int) -> list[list[ss.Positions]]:
+    """Short random dashes scattered over the table."""
+    rng = random.Random(seed)
+    strokes = []
+    for _ in range(count):
+        radial = rng.randrange(0, ss.MAX_R_STEPS + 1)
+        angular = rng.randrange(0, REV)
+        strokes.append([ss.Positions(radial, angular), ss.Positions(min(radial + rng.randrange(50, 300), ss.MAX_R_STEPS),
+                                                                   angular + rng.randrange(-40, 40))])
+    return strokes
+
+
+def _position(text: str) -> ss.Positions:
+    radial, angular = (int(value) for value in text.split(","))
+    return ss.Positions(radial, angular)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="*", type=Path, help="CSV stroke files or .thr tracks")
+    parser.add_argument("--demo", type=int, metavar="N", help="optimize N random dashes instead of files")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start", type=_position, default=ss.Positions(0, 0), help="ball position as radial,angular")
+    parser.add_argument("--time-limit", type=float, default=30.0, help="seconds allowed for 2-opt")
+    parser.add_argument("-o", "--output", type=Path, help="write the ordered strokes as CSV")
+    args = parser.parse_args(argv)
+
+    if args.demo:
+        strokes = demo_strokes(args.demo, args.seed)
+    else:
+        strokes = [stroke for path in args.inputs for stroke in read_strokes(path)]
+    if not strokes:
+        parser.error("no strokes to order (pass files or --demo N)")
+
+    ordered, stats = optimize(strokes, args.start, args.time_limit)
+    print(f"strokes      {len(strokes)}")
+    print(f"travel       {stats['input_travel_s'] / 60:.1f}m input order")
+    print(f"             {stats['nn_travel_s'] / 60:.1f}m nearest neighbour ({stats['nn_s']:.2f}s)")
+    print(f"             {stats['travel_s'] / 60:.1f}m after 2-opt ({int(stats['moves'])} moves, "
+          f"{stats['elapsed_s']:.2f}s total)")
+    if args.output:
+        write_strokes(args.output, ordered)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
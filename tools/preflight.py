@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""Preflight a SandScript or built-in pattern before it goes to the table.
+
+Simulates a full run and reports what would otherwise only show up after
+minutes of motion on the hardware:
+
+- the first step whose outputs are NaN/inf, with the ``faultMask`` bits
+  ``evalPatternScript`` records there (the device halts the run at it);
+- the fraction of steps whose radius is clamped to ``maxRadiusCm`` or to 0;
+- over-speed steps, whose angular move cannot finish within the 4 ms step
+  interval at the angular axis' derated speed cap, so the table runs slower
+  than the script's clock; and jumps, moves that take longer than
+  ``--max-jump-ms`` and draw as one long blocking sweep;
+- half turns: moves so large that ``findShortestPathToPosition`` may turn
+  the other way round than the script meant;
+- the net and total revolutions, the step count and the estimated run time.
+
+Scripts that never read their own position (``radius``, ``angle``, ``rev``)
+and set absolute outputs are open loop: every step depends only on its
+index, so the whole run is evaluated at once. The bytecode is interpreted
+over float32 NumPy arrays with the evaluator's rounding, and ``random()``
+uses an LCG jump-ahead per draw. Scripts with feedback (position inputs or
+``delta_*`` outputs) run through the reference evaluator step by step. In
+both cases the metrics are array operations over the whole trajectory.
+
+``time`` advances 4 ms per evaluation as in ``sandscript.simulate``. On the
+table it follows the real move durations, so time-driven scripts draw
+sparser there than here.
+
+Usage:
+    python3 tools/preflight.py pattern.pss
+    python3 tools/preflight.py pattern.pss --steps 200000 --speed 2 --json
+    python3 tools/preflight.py --pattern 15 --steps 50000
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import asdict, dataclass
+import json
+import math
+from pathlib import Path
+import sys
+from typing import Callable
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "custom_components" / "sand_garden"))
+
+import sandscript as ss  # noqa: E402
+from motion import HALF_REV, clamp_multiplier, max_angular_speeds, move_times, settle  # noqa: E402
+from patterns import GENERATORS, RandomWalk1, RandomWalk2  # noqa: E402
+
+STEP_MS = 4  # SANDSCRIPT_MIN_STEP_INTERVAL_US
+DEFAULT_STEPS = 20_000
+DEFAULT_MAX_JUMP_MS = 500.0
+HALF_TURN_MARGIN = 64  # steps (~5.6 degrees) short of a half turn still count as one
+WRAP = ss.STEPS_PER_A_AXIS_REV
+
+F32 = np.float32
+_PI_F = F32(ss.f32(math.pi))
+_FEEDBACK_INPUTS = frozenset((ss.Var.RADIUS, ss.Var.ANGLE, ss.Var.REV))
+_OUTPUT_BITS = (
+    (ss.Var.NEXT_RADIUS, ss.MASK_NEXT_RADIUS),
+    (ss.Var.DELTA_RADIUS, ss.MASK_DELTA_RADIUS),
+    (ss.Var.NEXT_ANGLE, ss.MASK_NEXT_ANGLE),
+    (ss.Var.DELTA_ANGLE, ss.MASK_DELTA_ANGLE),
+)
+_MASK_NAMES = {bit: name for name, (_, bit) in ss.OUTPUTS.items()}
+
+
+@dataclass
+class Trace:
+    """Positions after each completed step, plus what the run asked for."""
+
+    radial: np.ndarray  # steps after each move
+    angular: np.ndarray  # steps after each move, wrapped to [0, WRAP)
+    inner: np.ndarray  # the radius was clamped to 0
+    outer: np.ndarray  # the radius was clamped to the rim
+    intended: np.ndarray | None  # degrees each step asked to turn, for delta_angle scripts
+    fault_step: int | None = None
+    fault_mask: int = 0
+    fault_steps: int | None = None  # faulting steps over the whole horizon (open loop only)
+    evaluation: str = "reference"  # how the positions were produced
+
+
+@dataclass
+class Report:
+    source: str
+    evaluation: str
+    steps: int
+    moves: int
+    fault_step: int | None
+    fault_outputs: list[str]
+    fault_steps: int | None
+    clamped_rim: float
+    clamped_centre: float
+    over_speed: float | None
+    jumps: int
+    worst_jump_ms: float
+    half_turns: int
+    revolutions_net: float
+    revolutions_total: float
+    seconds: float
+
+
+# Vectorized evaluator ------------------------------------------------------
+
+
+def is_open_loop(program: ss.Program) -> bool:
+    """Whether each step depends only on its index, not on where the table is."""
+    if program.loads & _FEEDBACK_INPUTS:
+        return False
+    mask = program.used_mask
+    for next_bit, delta_bit in (
+        (ss.MASK_NEXT_RADIUS, ss.MASK_DELTA_RADIUS),
+        (ss.MASK_NEXT_ANGLE, ss.MASK_DELTA_ANGLE),
+    ):
+        if mask & delta_bit and not mask & next_bit:
+            return False
+    return True
+
+
+def _lcg_states(seed: int, counts: np.ndarray) -> np.ndarray:
+    """LCG state after ``counts`` advances from ``seed``, by jump-ahead."""
+    counts = counts.astype(np.uint64)
+    mult = np.ones_like(counts)
+    plus = np.zeros_like(counts)
+    step_mult = np.uint64(1664525)
+    step_plus = np.uint64(1013904223)
+    mask = np.uint64(0xFFFFFFFF)
+    while counts.any():
+        bit = (counts & np.uint64(1)).astype(bool)
+        plus = np.where(bit, (plus * step_mult + step_plus) & mask, plus)
+        mult = np.where(bit, (mult * step_mult) & mask, mult)
+        step_plus = ((step_mult + np.uint64(1)) * step_plus) & mask
+        step_mult = (step_mult * step_mult) & mask
+        counts = counts >> np.uint64(1)
+    return (mult * np.uint64(seed) + plus) & mask
+
+
+def _to_f32(values: np.ndarray) -> np.ndarray:
+    return values.astype(F32)
+
+
+def _unary64(func: Callable[[np.ndarray], np.ndarray], a: np.ndarray) -> np.ndarray:
+    return _to_f32(func(a.astype(np.float64)))
+
+
+def _run_expr(expr: ss.Expr, variables: list[np.ndarray], count: int, draw: Callable[[], np.ndarray]) -> np.ndarray:
+    stack: list[np.ndarray] = []
+    push = stack.append
+    zeros = np.zeros(count, F32)
+
+    def pop() -> np.ndarray:
+        return stack.pop() if stack else zeros
+
+    Op = ss.Op
+    for op, arg in expr.ops:
+        if op == Op.CONST:
+            push(np.full(count, arg, F32))
+        elif op == Op.LOAD:
+            push(variables[min(arg, ss.VAR_MAX - 1)])
+        elif op == Op.ADD:
+            b, a = pop(), pop()
+            push(a + b)
+        elif op == Op.SUB:
+            b, a = pop(), pop()
+            push(a - b)
+        elif op == Op.MUL:
+            b, a = pop(), pop()
+            push(a * b)
+        elif op == Op.DIV:
+            b, a = pop(), pop()
+            push(a / b)
+        elif op == Op.MOD:
+            b, a = pop(), pop()
+            push(np.fmod(a, b))
+        elif op == Op.NEG:
+            push(-pop())
+        elif op in (Op.SIN, Op.COS, Op.TAN):
+            radians = (pop() * _PI_F) / F32(180.0)
+            push(_unary64({Op.SIN: np.sin, Op.COS: np.cos, Op.TAN: np.tan}[op], radians))
+        elif op == Op.ABS:
+            push(np.abs(pop()))
+        elif op == Op.PINGPONG:
+            max_v, v = pop(), pop()
+            period = F32(2.0) * max_v
+            t = np.fmod(v, period)
+            t = np.where(t < 0.0, t + period, t)
+            folded = np.where(t <= max_v, t, period - t)
+            push(np.where(np.isfinite(max_v) & (max_v > 0.0), folded, F32(0.0)))
+        elif op == Op.CLAMP:
+            max_v, min_v, val = pop(), pop(), pop()
+            push(np.where(val < min_v, min_v, np.where(val > max_v, max_v, val)))
+        elif op == Op.SIGN:
+            a = pop().astype(np.float64)
+            push(np.where(a > 1e-6, F32(1.0), np.where(a < -1e-6, F32(-1.0), F32(0.0))))
+        elif op in (Op.MIN, Op.MAX):
+            b, a = pop(), pop()
+            pick_a = a < b if op == Op.MIN else a > b
+            push(np.where(np.isnan(a), b, np.where(np.isnan(b) | pick_a, a, b)))
+        elif op == Op.POW:
+            b, a = pop(), pop()
+            push(_to_f32(np.power(a.astype(np.float64), b.astype(np.float64))))
+        elif op == Op.SQRT:
+            push(_unary64(np.sqrt, pop()))
+        elif op == Op.EXP:
+            push(_unary64(np.exp, pop()))
+        elif op == Op.FLOOR:
+            push(np.floor(pop()))
+        elif op == Op.CEIL:
+            push(np.ceil(pop()))
+        elif op == Op.ROUND:
+            a = pop().astype(np.float64)
+            push(_to_f32(np.copysign(np.floor(np.abs(a) + 0.5), a)))
+        elif op == Op.RANDOM:
+            push(draw())
+    return stack[-1] if stack else zeros
+
+
+def _lround(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.float64)
+    return np.copysign(np.floor(np.abs(values) + 0.5), values).astype(np.int64)
+
+
+def _wrap_deg(values: np.ndarray) -> np.ndarray:
+    out = np.fmod(values, F32(360.0))
+    return np.where(out < 0.0, out + F32(360.0), out)
+
+
+def run_vectorized(
+    program: ss.Program,
+    steps: int,
+    *,
+    units: ss.Units = ss.DEVICE_UNITS,
+    start: ss.Positions = ss.Positions(0, 0),
+    seed: int = 1,
+    step_ms: int = STEP_MS,
+) -> Trace:
+    """Evaluate an open-loop program for all ``steps`` at once."""
+    if not is_open_loop(program):
+        raise ValueError("the program reads its own position")
+    steps_per_cm = F32(ss.f32(units.steps_per_cm))
+    steps_per_deg = F32(ss.f32(units.steps_per_deg))
+    max_radius_cm = F32(ss.f32(units.max_radius_cm))
+    index = np.arange(steps, dtype=np.int64)
+
+    with np.errstate(all="ignore"):
+        variables = [np.zeros(steps, F32)] * ss.VAR_MAX
+        variables[ss.Var.START] = (index == 0).astype(F32)
+        variables[ss.Var.STEPS] = index.astype(F32)
+        variables[ss.Var.TIME] = ((index * step_ms) & 0xFFFFFFFF).astype(F32)
+
+        # Every RANDOM opcode runs once per step, in program order.
+        per_step = sum(op == ss.Op.RANDOM for assign in program.assignments for op, _ in assign.expr.ops)
+        if (seed & 0xFFFFFFFF) == 0:
+            seed = (start.radial & 0xFFFFFFFF) ^ 0xA5A5A5A5  # first draw happens at now_ms 0
+        drawn = 0
+
+        def draw() -> np.ndarray:
+            nonlocal drawn
+            drawn += 1
+            state = _lcg_states(seed & 0xFFFFFFFF, index * per_step + drawn)
+            return _to_f32((state >> np.uint64(8)).astype(np.float64) * (1.0 / 16777216.0))
+
+        for assign in program.assignments:
+            variables[assign.target] = _run_expr(assign.expr, variables, steps, draw)
+
+        mask = program.used_mask
+        fault = np.zeros(steps, np.int64)
+        for slot, bit in _OUTPUT_BITS:
+            if mask & bit:
+                fault |= np.where(np.isfinite(variables[slot]), 0, bit)
+
+        radius_cm = F32(ss.f32(ss.f32(start.radial) / steps_per_cm))
+        angle_deg = F32(ss.wrap_deg(ss.f32(ss.f32(start.angular) / steps_per_deg)))
+        out_radius = variables[ss.Var.NEXT_RADIUS] if mask & ss.MASK_NEXT_RADIUS else np.full(steps, radius_cm)
+        out_angle = variables[ss.Var.NEXT_ANGLE] if mask & ss.MASK_NEXT_ANGLE else np.full(steps, angle_deg)
+
+        inner = out_radius < 0.0
+        outer = out_radius > max_radius_cm
+        clamped = np.where(inner, F32(0.0), np.where(outer, max_radius_cm, out_radius))
+        radial = np.clip(_lround(clamped * steps_per_cm), 0, ss.MAX_R_STEPS)
+        angular = _lround(_wrap_deg(out_angle) * steps_per_deg) % WRAP
+
+    faulting = np.flatnonzero(fault)
+    end = int(faulting[0]) if faulting.size else steps
+    return Trace(
+        radial=radial[:end],
+        angular=angular[:end],
+        inner=inner[:end],
+        outer=outer[:end],
+        intended=None,
+        fault_step=end if faulting.size else None,
+        fault_mask=int(fault[end]) if faulting.size else 0,
+        fault_steps=int(faulting.size),
+        evaluation="vectorized",
+    )
+
+
+# Reference runs --------------------------------------------------------------
+
+
+def run_reference(
+    program: ss.Program,
+    steps: int,
+    *,
+    units: ss.Units = ss.DEVICE_UNITS,
+    start: ss.Positions = ss.Positions(0, 0),
+    seed: int = 1,
+    step_ms: int = STEP_MS,
+) -> Trace:
+    """Evaluate any program step by step with the reference evaluator."""
+    rt = ss.Runtime(seed=seed)
+    current = start
+    radial = np.empty(steps, np.int64)
+    angular = np.empty(steps, np.int64)
+    raw = np.empty((steps, 5), np.float64)  # radius_cm in, next/delta radius, next/delta angle
+    steps_per_cm = ss.f32(units.steps_per_cm)
+    done = 0
+    fault_mask = 0
+    for index in range(steps):
+        radius_cm = ss.f32(ss.f32(current.radial) / steps_per_cm)
+        target = ss.evaluate(program, rt, current, index == 0, index * step_ms, units)
+        if rt.faulted:
+            fault_mask = rt.fault_mask
+            break
+        current = ss.Positions(min(max(target.radial, 0), ss.MAX_R_STEPS), target.angular % WRAP)
+        variables = rt.last_vars
+        raw[index] = (
+            radius_cm,
+            variables[ss.Var.NEXT_RADIUS],
+            variables[ss.Var.DELTA_RADIUS],
+            variables[ss.Var.NEXT_ANGLE],
+            variables[ss.Var.DELTA_ANGLE],
+        )
+        radial[index] = current.radial
+        angular[index] = current.angular
+        done += 1
+
+    raw = raw[:done]
+    mask = program.used_mask
+    if mask & ss.MASK_NEXT_RADIUS:
+        out_radius = raw[:, 1]
+    elif mask & ss.MASK_DELTA_RADIUS:
+        out_radius = _to_f32(raw[:, 0]) + _to_f32(raw[:, 2])
+    else:
+        out_radius = raw[:, 0]
+    intended = None
+    if mask & ss.MASK_DELTA_ANGLE and not mask & ss.MASK_NEXT_ANGLE:
+        intended = raw[:, 4]
+    max_radius_cm = ss.f32(units.max_radius_cm)
+    return Trace(
+        radial=radial[:done],
+        angular=angular[:done],
+        inner=out_radius < 0.0,
+        outer=out_radius > max_radius_cm,
+        intended=intended,
+        fault_step=done if fault_mask else None,
+        fault_mask=fault_mask,
+    )
+
+
+def run_pattern(pattern_id: int, steps: int, *, start: ss.Positions = ss.Positions(0, 0), seed: int = 1) -> Trace:
+    """Replay a built-in pattern, keeping its raw targets for the clamp check."""
+    factory = GENERATORS[pattern_id]
+    pattern = factory(seed) if factory in (RandomWalk1, RandomWalk2) else factory()
+    targets = np.empty(steps, np.int64)
+    radial = np.empty(steps, np.int64)
+    angular = np.empty(steps, np.int64)
+    current = start
+    for index in range(steps):
+        target = pattern(current, index == 0)
+        current, _ = settle(current, target)
+        targets[index] = target.radial
+        radial[index] = current.radial
+        angular[index] = current.angular
+    return Trace(
+        radial=radial,
+        angular=angular,
+        inner=targets < 0,
+        outer=targets > ss.MAX_R_STEPS,
+        intended=None,
+        evaluation="generator",
+    )
+
+
+# Analysis ------------------------------------------------------------------
+
+
+def analyze(
+    trace: Trace,
+    *,
+    source: str,
+    start: ss.Positions = ss.Positions(0, 0),
+    multiplier: float = 1.0,
+    max_jump_ms: float = DEFAULT_MAX_JUMP_MS,
+    step_ms: float = STEP_MS,
+) -> Report:
+    """Summarize a trace; ``step_ms`` is the shortest time one evaluation takes."""
+    multiplier = clamp_multiplier(multiplier)
+    radial = np.concatenate(([start.radial], trace.radial)).astype(np.float64)
+    angular = np.concatenate(([start.angular], trace.angular))
+    steps = len(trace.radial)
+
+    # findShortestPathToPosition(): the short way round, ties go forward
+    forward = (angular[1:] - angular[:-1]) % WRAP
+    delta = np.where(forward <= WRAP - forward, forward, forward - WRAP).astype(np.float64)
+    d_radial = np.diff(radial)
+    moving = (delta != 0) | (d_radial != 0)
+
+    seconds = np.maximum(move_times(radial[:-1], delta, d_radial, multiplier), step_ms / 1000.0)
+    angular_time = np.abs(delta) / max_angular_speeds(radial[:-1], multiplier)
+
+    over_speed = angular_time > step_ms / 1000.0
+    jumps = angular_time > max_jump_ms / 1000.0
+    if trace.intended is not None:
+        half_turns = np.abs(trace.intended) > 180.0
+    else:
+        half_turns = np.abs(delta) >= HALF_REV - HALF_TURN_MARGIN
+
+    fault_outputs = [name for bit, name in _MASK_NAMES.items() if trace.fault_mask & bit]
+    return Report(
+        source=source,
+        evaluation=trace.evaluation,
+        steps=steps,
+        moves=int(np.count_nonzero(moving)),
+        fault_step=trace.fault_step,
+        fault_outputs=fault_outputs,
+        fault_steps=trace.fault_steps,
+        clamped_rim=float(trace.outer.mean()) if steps else 0.0,
+        clamped_centre=float(trace.inner.mean()) if steps else 0.0,
+        over_speed=float(over_speed.mean()) if steps and step_ms else None,
+        jumps=int(np.count_nonzero(jumps)),
+        worst_jump_ms=float(angular_time.max() * 1000.0) if steps else 0.0,
+        half_turns=int(np.count_nonzero(half_turns)),
+        revolutions_net=float(delta.sum() / WRAP),
+        revolutions_total=float(np.abs(delta).sum() / WRAP),
+        seconds=float(seconds.sum()),
+    )
+
+
+def _print_report(report: Report, args: argparse.Namespace) -> None:
+    print(f"{report.source}: {report.steps} steps ({report.evaluation}), {report.moves} moves, "
+          f"~{report.seconds:.1f} s at speed {clamp_multiplier(args.speed):g}")
+    if report.fault_step is not None:
+        extra = f"; {report.fault_steps} of {args.steps} steps would fault" if report.fault_steps else ""
+        print(f"  FAULT at step {report.fault_step}: NaN/inf in {', '.join(report.fault_outputs)}"
+              f" - the table stops here{extra}")
+    print(f"  radius clamped: {report.clamped_rim:.1%} at the rim, {report.clamped_centre:.1%} at the centre")
+    if report.over_speed is not None:
+        print(f"  over the angular speed cap: {report.over_speed:.1%} of steps")
+    print(f"  jumps over {args.max_jump_ms:g} ms: {report.jumps} (worst {report.worst_jump_ms:.0f} ms)")
+    print(f"  half-turn moves (direction may flip): {report.half_turns}")
+    print(f"  revolutions: {report.revolutions_net:+.2f} net, {report.revolutions_total:.2f} total")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("script", nargs="?", type=Path, help="SandScript file")
+    source.add_argument("--pattern", type=int, choices=sorted(GENERATORS), help="built-in pattern instead")
+    parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="evaluations to simulate")
+    parser.add_argument("--speed", type=float, default=1.0, help="speed multiplier for timing")
+    parser.add_argument("--seed", type=int, default=1, help="random() seed (0: the firmware's fallback)")
+    parser.add_argument("--max-jump-ms", type=float, default=DEFAULT_MAX_JUMP_MS)
+    parser.add_argument("--reference", action="store_true", help="always use the step-by-step evaluator")
+    parser.add_argument("--verify", action="store_true", help="check the vectorized run against the reference")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.pattern is not None:
+        trace = run_pattern(args.pattern, args.steps, seed=args.seed)
+        report = analyze(trace, source=f"pattern {args.pattern}", multiplier=args.speed,
+                         max_jump_ms=args.max_jump_ms, step_ms=0.0)
+    else:
+        try:
+            program = ss.compile_script(args.script.read_text())
+        except ss.SandScriptError as err:
+            print(f"{args.script}: {err}", file=sys.stderr)
+            return 2
+        vectorized = is_open_loop(program) and not args.reference
+        run = run_vectorized if vectorized else run_reference
+        trace = run(program, args.steps, seed=args.seed)
+        if args.verify and vectorized:
+            reference = run_reference(program, args.steps, seed=args.seed)
+            same = (
+                trace.fault_step == reference.fault_step
+                and np.array_equal(trace.radial, reference.radial)
+                and np.array_equal(trace.angular, reference.angular)
+            )
+            if not same:
+                print("vectorized run differs from the reference evaluator", file=sys.stderr)
+                return 3
+        report = analyze(trace, source=str(args.script), multiplier=args.speed, max_jump_ms=args.max_jump_ms)
+
+    if args.json:
+        print(json.dumps(asdict(report), indent=2))
+    else:
+        _print_report(report, args)
+    return 1 if report.fault_step is not None else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
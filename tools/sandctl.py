@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Run Sand Garden commands and streams across many tables at once.
+
+Every host gets its own client (see custom_components/sand_garden/client.py).
+They all share one pooled aiohttp session, and the hosts are driven
+concurrently, so a fleet takes about as long as its slowest table. Hosts
+come from the command line, from ``--hosts-file`` (one per line, ``#``
+comments), or both.
+
+With ``--ws`` commands go over the command socket (``/api/ws``), pipelined,
+on tables that advertise it. A table that does not advertise it fails
+instead of silently falling back to HTTP.
+
+Subcommands:
+    state   print each table's state
+    send    apply settings in the order given
+    script  compile-check a SandScript once, then upload it everywhere
+    watch   stream status and telemetry events until interrupted
+    bench   measure command or state round trips
+
+Usage:
+    python3 tools/sandctl.py state table-1.local table-2.local
+    python3 tools/sandctl.py send --hosts-file fleet.txt --run off --pattern 3 --run on
+    python3 tools/sandctl.py script spiral.pss --hosts-file fleet.txt
+    python3 tools/sandctl.py watch table-1.local --events telemetry
+    python3 tools/sandctl.py bench --hosts-file fleet.txt --ws --count 500 --concurrency 8
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+from pathlib import Path
+import sys
+import time
+from typing import Any, Awaitable, Callable
+
+import aiohttp
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "custom_components" / "sand_garden"))
+
+from client import (  # noqa: E402
+    API_EVENTS,
+    API_SPEED,
+    REQUEST_TIMEOUT,
+    RETRY_DELAY,
+    NotSupported,
+    SandGardenClient,
+    SandGardenError,
+    SandGardenState,
+)
+from playlist import check_script  # noqa: E402
+from protocol import WS_VERSION, supported  # noqa: E402
+from stats import CoordinatorStats  # noqa: E402
+
+Action = Callable[[SandGardenClient], Awaitable[str]]
+
+
+class _Step(argparse.Action):
+    """Collect ``send`` options in command-line order."""
+
+    def __call__(self, parser: argparse.ArgumentParser, namespace: argparse.Namespace,
+                 values: Any, option_string: str | None = None) -> None:
+        steps = getattr(namespace, "steps", None) or []
+        steps.append((self.dest, values))
+        namespace.steps = steps
+
+
+def _on_off(value: str) -> bool:
+    if value not in ("on", "off"):
+        raise argparse.ArgumentTypeError("expected on or off")
+    return value == "on"
+
+
+def _rgb(value: str) -> tuple[int, int, int]:
+    try:
+        red, green, blue = (int(part) for part in value.split(","))
+    except ValueError as err:
+        raise argparse.ArgumentTypeError("expected R,G,B") from err
+    return red, green, blue
+
+
+def _hosts(args: argparse.Namespace) -> list[str]:
+    hosts = list(args.hosts)
+    if args.hosts_file is not None:
+        for line in args.hosts_file.read_text().splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                hosts.append(line)
+    return list(dict.fromkeys(hosts))
+
+
+async def _connect(client: SandGardenClient, use_ws: bool) -> asyncio.Task | None:
+    """Fetch the state once and, with ``use_ws``, open the command socket."""
+    state = await client.fetch_state()
+    if not use_ws:
+        return None
+    if not supported(state, "ws", WS_VERSION):
+        raise NotSupported("the table does not advertise the command socket")
+    listener = asyncio.create_task(client.listen(lambda data: None))
+    try:
+        await asyncio.wait_for(client.socket_open.wait(), client.timeout)
+    except asyncio.TimeoutError:
+        listener.cancel()
+        raise NotSupported("the command socket did not open") from None
+    return listener
+
+
+async def _each(session: aiohttp.ClientSession, args: argparse.Namespace, action: Action) -> int:
+    """Run ``action`` on every host concurrently and print one line per host."""
+    hosts = _hosts(args)
+    width = max(len(host) for host in hosts)
+
+    async def run(host: str) -> bool:
+        client = SandGardenClient(host, session, timeout=args.timeout)
+        listener = None
+        started = time.perf_counter()
+        try:
+            listener = await _connect(client, args.ws)
+            detail = await action(client)
+        except SandGardenError as err:
+            print(f"{host:<{width}}  error  {err}")
+            return False
+        finally:
+            if listener is not None:
+                listener.cancel()
+                await asyncio.gather(listener, return_exceptions=True)
+            await client.close()
+        elapsed = (time.perf_counter() - started) * 1000.0
+        print(f"{host:<{width}}  ok     {elapsed:7.1f} ms  {detail}".rstrip())
+        return True
+
+    results = await asyncio.gather(*(run(host) for host in hosts))
+    return 0 if all(results) else 1
+
+
+async def _state(session: aiohttp.ClientSession, args: argparse.Namespace) -> int:
+    async def action(client: SandGardenClient) -> str:
+        data = await client.fetch_state()
+        if args.raw:
+            return json.dumps(data, separators=(",", ":"))
+        return json.dumps(SandGardenState.from_dict(data).as_dict(), separators=(",", ":"))
+
+    return await _each(session, args, action)
+
+
+async def _send(session: aiohttp.ClientSession, args: argparse.Namespace) -> int:
+    steps = getattr(args, "steps", None)
+    if not steps:
+        print("send: give at least one setting", file=sys.stderr)
+        return 2
+
+    async def action(client: SandGardenClient) -> str:
+        for name, value in steps:
+            if name == "speed":
+                await client.set_speed(value)
+            elif name == "pattern":
+                await client.set_pattern(value)
+            elif name == "mode":
+                await client.set_auto_mode(value == "auto")
+            elif name == "run":
+                await client.set_running(value)
+            elif name == "command":
+                await client.command(value)
+            elif name == "led_effect":
+                await client.set_led_effect(value)
+            elif name == "led_color":
+                await client.set_led_color(*value)
+            elif name == "led_brightness":
+                await client.set_led_brightness(value)
+            elif name == "reset":
+                await client.reset()
+        return f"{len(steps)} command(s)"
+
+    return await _each(session, args, action)
+
+
+async def _script(session: aiohttp.ClientSession, args: argparse.Namespace) -> int:
+    source = args.script.read_text()
+    if (error := check_script(source)) is not None:
+        print(f"{args.script}: {error}", file=sys.stderr)
+        return 2
+
+    async def action(client: SandGardenClient) -> str:
+        await client.upload_script(source, args.slot)
+        return f"{len(source.encode('utf-8'))} bytes"
+
+    return await _each(session, args, action)
+
+
+async def _watch(session: aiohttp.ClientSession, args: argparse.Namespace) -> int:
+    hosts = _hosts(args)
+    width = max(len(host) for host in hosts)
+    wanted = set(args.events) if args.events else None
+
+    async def follow(host: str) -> None:
+        client = SandGardenClient(host, session, timeout=args.timeout)
+        while True:
+            try:
+                async for event in client.iter_sse(API_EVENTS):
+                    if wanted is None or event.event in wanted:
+                        print(f"{host:<{width}}  {event.event:<10} {event.data}", flush=True)
+            except (SandGardenError, aiohttp.ClientError, asyncio.TimeoutError) as err:
+                print(f"{host:<{width}}  error      {err}; retrying in {RETRY_DELAY}s", flush=True)
+                await asyncio.sleep(RETRY_DELAY)
+
+    await asyncio.gather(*(follow(host) for host in hosts))
+    return 0
+
+
+async def _bench(session: aiohttp.ClientSession, args: argparse.Namespace) -> int:
+    async def action(client: SandGardenClient) -> str:
+        state = SandGardenState.from_dict(await client.fetch_state())
+        pending = iter(range(args.count))
+        errors = 0
+        client.stats = CoordinatorStats()  # leave the setup requests out
+
+        async def worker() -> None:
+            nonlocal errors
+            for _ in pending:
+                try:
+                    if args.target == "state":
+                        await client.fetch_state()
+                    else:
+                        # Re-sending the current speed changes nothing on the table
+                        await client.set_speed(state.speed_multiplier)
+                except SandGardenError:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        stats = client.stats
+        histogram = stats.poll if args.target == "state" else stats.command_rtt[API_SPEED]
+        return (
+            f"{client.transport:<14} {args.count / elapsed:7.1f}/s  p50 {histogram.percentile(0.5)} ms  "
+            f"p95 {histogram.percentile(0.95)} ms  max {histogram.max_ms:.1f} ms  errors {errors}"
+        )
+
+    return await _each(session, args, action)
+
+
+def main(argv: list[str] | None = None) -> int:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--hosts-file", type=Path, help="file with one host per line")
+    common.add_argument("--ws", action="store_true", help="send commands over the command socket")
+    common.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="seconds per request")
+    common.add_argument("--connections", type=int, default=64, help="size of the shared connection pool")
+    common.add_argument("-v", "--verbose", action="store_true")
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="subcommand", required=True)
+
+    state = commands.add_parser("state", parents=[common], help="print each table's state")
+    state.add_argument("hosts", nargs="*", help="table host names or addresses")
+    state.add_argument("--raw", action="store_true", help="print /api/state as sent")
+
+    send = commands.add_parser("send", parents=[common], help="apply settings in the order given")
+    send.add_argument("hosts", nargs="*", help="table host names or addresses")
+    send.add_argument("--speed", type=float, action=_Step, help="speed multiplier")
+    send.add_argument("--pattern", type=int, action=_Step, help="pattern number (1-based)")
+    send.add_argument("--mode", choices=("auto", "manual"), action=_Step)
+    send.add_argument("--run", type=_on_off, action=_Step, metavar="on|off")
+    send.add_argument("--command", action=_Step, help="console command, e.g. HOME")
+    send.add_argument("--led-effect", type=int, action=_Step)
+    send.add_argument("--led-color", type=_rgb, action=_Step, metavar="R,G,B")
+    send.add_argument("--led-brightness", type=int, action=_Step)
+    send.add_argument("--reset", nargs=0, action=_Step, help="restart the table")
+
+    script = commands.add_parser("script", parents=[common], help="upload a SandScript")
+    script.add_argument("script", type=Path, help="SandScript source file")
+    script.add_argument("hosts", nargs="*", help="table host names or addresses")
+    script.add_argument("--slot", type=int)
+
+    watch = commands.add_parser("watch", parents=[common], help="stream events")
+    watch.add_argument("hosts", nargs="*", help="table host names or addresses")
+    watch.add_argument("--events", nargs="+", help="event types to print (default: all)")
+
+    bench = commands.add_parser("bench", parents=[common], help="measure round trips")
+    bench.add_argument("hosts", nargs="*", help="table host names or addresses")
+    bench.add_argument("--target", choices=("command", "state"), default="command")
+    bench.add_argument("--count", type=int, default=100, help="requests per table")
+    bench.add_argument("--concurrency", type=int, default=1, help="requests in flight per table")
+
+    args = parser.parse_args(argv)
+    if not _hosts(args):
+        parser.error("no hosts given")
+    if args.subcommand == "bench" and (args.count < 1 or args.concurrency < 1):
+        parser.error("--count and --concurrency must be positive")
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format="%(levelname)s %(name)s: %(message)s")
+
+    handler = {"state": _state, "send": _send, "script": _script, "watch": _watch, "bench": _bench}[args.subcommand]
+
+    async def run() -> int:
+        connector = aiohttp.TCPConnector(limit=args.connections)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await handler(session, args)
+
+    try:
+        return asyncio.run(run())
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""Differential fuzz and benchmark harness for the SandScript runtime.
+
+Builds PatternScript.cpp for the host (tools/host provides a tiny Arduino shim),
+feeds it random valid scripts grouped by opcode family, and replays every
+evaluation step through the Python reference in
+custom_components/sand_garden/sandscript.py. Compile results, target positions
+and faultMask must agree (±1 motor step for float rounding at .5 boundaries).
+
+Per family it reports host compile time, evaluation time per step and per
+bytecode op, and a digest of the host trace. Results are compared against a
+stored baseline so slowdowns and semantic changes are flagged.
+
+Wall-clock timings differ between machines, so the host also times a fixed
+calibration loop in the same process, before and after the jobs. Baseline timings are scaled by the
+ratio of the two calibration times before they are compared, and a baseline
+without a calibration time is not used for the timing check at all. Timing
+flags are printed but only fail the run with ``--strict-perf``; semantic
+changes and mismatches always fail it.
+
+Usage:
+    python3 tools/sandscript_fuzz.py                    # run and compare to baseline
+    python3 tools/sandscript_fuzz.py --update-baseline  # accept current numbers
+    python3 tools/sandscript_fuzz.py --families trig,power --programs 200 --show 5
+    python3 tools/sandscript_fuzz.py --strict-perf      # also fail on slowdowns
+
+The calibration only evens out overall CPU speed; compilers and libm still
+differ, so refresh the baseline when those change.
+"""
+from __future__ import annotations
+
+import argparse
+from contextlib import contextmanager
+import copy
+from dataclasses import dataclass, field
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+import random
+import statistics
+import struct
+import subprocess
+import sys
+import time
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "custom_components" / "sand_garden"))
+
+import sandscript as ss  # noqa: E402
+
+HOST_DIR = REPO_ROOT / "tools" / "host"
+BUILD_DIR = REPO_ROOT / "tools" / ".build"
+DEFAULT_BASELINE = REPO_ROOT / "tools" / "baselines" / "sandscript_fuzz.json"
+HOST_SOURCES = [HOST_DIR / "psg_host.cpp", REPO_ROOT / "PatternScript.cpp"]
+HOST_HEADERS = [HOST_DIR / "Arduino.h", REPO_ROOT / "PatternScript.h", REPO_ROOT / "Positions.h"]
+
+STEP_MS = 4  # SANDSCRIPT_MIN_STEP_INTERVAL_US
+
+# Opcode families: (binary operators, functions). Non-arithmetic families glue
+# sub-expressions with "+" only so their own opcodes dominate the timing.
+FAMILIES: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    "arith": (("+", "-", "*", "/", "%", "neg"), ()),
+    "trig": (("+",), ("sin", "cos", "tan")),
+    "shape": (("+",), ("abs", "sign", "clamp", "pingpong", "min", "max")),
+    "power": (("+",), ("pow", "sqrt", "exp")),
+    "rounding": (("+",), ("floor", "ceil", "round")),
+    "random": (("+",), ("random",)),
+    "mixed": (("+", "-", "*", "/", "%", "neg"), tuple(ss.FUNCTIONS)),
+}
+MUTANT_FAMILY = "mutant"
+
+
+@dataclass
+class Job:
+    """One script sent to the host runtime."""
+
+    family: str
+    source: str
+    seed: int
+    program: ss.Program | None = None
+    ref_error: ss.SandScriptError | None = None
+
+
+@dataclass
+class HostResult:
+    """Host output for one job."""
+
+    code: int
+    compile_ns: float
+    eval_ns: float
+    message: str
+    steps: list[tuple[int, int, int, int, int]] = field(default_factory=list)
+
+
+@dataclass
+class FamilyStats:
+    """Aggregated results for one opcode family."""
+
+    programs: int = 0
+    steps: int = 0
+    faults: int = 0
+    libm_ulp: int = 0
+    mismatches: list[str] = field(default_factory=list)
+    compile_ns: list[float] = field(default_factory=list)
+    eval_ns: list[float] = field(default_factory=list)
+    eval_ns_per_op: list[float] = field(default_factory=list)
+    ref_s: float = 0.0
+    digest: "hashlib._Hash" = field(default_factory=hashlib.sha1)
+
+    def summary(self) -> dict[str, float | int | str]:
+        """Return the baseline record for this family."""
+        median = lambda values: round(statistics.median(values), 2) if values else 0.0  # noqa: E731
+        return {
+            "programs": self.programs,
+            "steps": self.steps,
+            "faults": self.faults,
+            "compile_ns": median(self.compile_ns),
+            "eval_ns_per_step": median(self.eval_ns),
+            "eval_ns_per_op": median(self.eval_ns_per_op),
+            "digest": self.digest.hexdigest(),
+        }
+
+
+class ScriptGenerator:
+    """Random valid SandScript within the PatternScript.h limits."""
+
+    INPUTS = ("radius", "angle", "rev", "steps", "time", "start")
+
+    def __init__(self, rng: random.Random, family: str) -> None:
+        self.rng = rng
+        self.operators, self.functions = FAMILIES[family]
+
+    def constant(self) -> str:
+        rng = self.rng
+        kind = rng.random()
+        if kind < 0.4:
+            return str(rng.randint(0, 12))
+        if kind < 0.8:
+            return f"{rng.uniform(0, 100):.{rng.randint(1, 3)}f}"
+        if kind < 0.9:
+            return f"{rng.uniform(0, 1):.4f}"
+        return f"{rng.uniform(1, 9):.1f}e{rng.choice(['-3', '-1', '2', '+1'])}"
+
+    def leaf(self, names: list[str]) -> str:
+        if self.rng.random() < 0.35:
+            return self.constant()
+        return self.rng.choice(names)
+
+    def expr(self, names: list[str], depth: int) -> str:
+        rng = self.rng
+        if depth <= 0 or rng.random() < 0.2:
+            return self.leaf(names)
+        if self.functions and (not self.operators or rng.random() < 0.65):
+            func = rng.choice(self.functions)
+            arity = ss.FUNCTIONS[func][1]
+            args = ", ".join(self.expr(names, depth - 1) for _ in range(arity))
+            return f"{func}({args})"
+        op = rng.choice(self.operators)
+        if op == "neg":
+            return f"-{self.wrap(self.expr(names, depth - 1))}"
+        left = self.wrap(self.expr(names, depth - 1))
+        right = self.wrap(self.expr(names, depth - 1))
+        return f"{left} {op} {right}"
+
+    def wrap(self, text: str) -> str:
+        if any(ch in text for ch in " -") and not text.endswith(")") or self.rng.random() < 0.3:
+            return f"({text})"
+        return text
+
+    def script(self) -> str:
+        rng = self.rng
+        names = list(self.INPUTS)
+        lines = ["# fuzz"] if rng.random() < 0.3 else []
+        for index in range(rng.randint(0, 5)):
+            name = f"v{index}"
+            lines.append(f"{name} = {self.expr(names, rng.randint(1, 3))}")
+            names.append(name)
+        outputs = []
+        if rng.random() < 0.85:
+            outputs.append(rng.choice(["next_radius", "delta_radius"]))
+        if not outputs or rng.random() < 0.85:
+            outputs.append(rng.choice(["next_angle", "delta_angle"]))
+        for name in outputs:
+            lines.append(f"{name} = {self.expr(names, rng.randint(1, 3))}")
+            names.append(name)
+        return "\n".join(lines) + "\n"
+
+
+def mutate(rng: random.Random, source: str) -> str:
+    """Return a near-miss variant of ``source`` to cross-check compile errors."""
+    pos = rng.randrange(len(source))
+    choice = rng.random()
+    if choice < 0.4:
+        return source[:pos] + source[pos + 1:]
+    if choice < 0.8:
+        return source[:pos] + rng.choice("()+-*/%,=.#xe1 ") + source[pos:]
+    return source[:pos] + source[pos:].replace("(", "((", 1)
+
+
+def build_host(cxx: str) -> Path:
+    """Compile the host runtime if any of its sources changed."""
+    BUILD_DIR.mkdir(parents=True, exist_ok=True)
+    binary = BUILD_DIR / "psg_host"
+    newest = max(path.stat().st_mtime for path in HOST_SOURCES + HOST_HEADERS)
+    if binary.exists() and binary.stat().st_mtime >= newest:
+        return binary
+    cmd = [cxx, "-O2", "-std=c++17", f"-I{HOST_DIR}", *map(str, HOST_SOURCES), "-o", str(binary)]
+    print("Building host runtime:", " ".join(cmd))
+    subprocess.run(cmd, check=True)
+    return binary
+
+
+def run_host(
+    binary: Path, jobs: list[Job], steps: int, compile_reps: int, eval_reps: int
+) -> tuple[list[HostResult], float]:
+    """Send every job to the host runtime in one process; return the results and the calibration time (ns)."""
+    payload = bytearray()
+    for job in jobs:
+        data = job.source.encode("utf-8")
+        payload += f"{steps} {job.seed} {compile_reps} {eval_reps} {len(data)}\n".encode()
+        payload += data + b"\n"
+    proc = subprocess.run([str(binary)], input=bytes(payload), capture_output=True, check=True)
+
+    results: list[HostResult] = []
+    current: HostResult | None = None
+    calibrations: list[float] = []
+    for line in proc.stdout.decode("utf-8", "replace").splitlines():
+        tag, _, rest = line.partition(" ")
+        if tag == "C":
+            calibrations.append(float(rest))
+        elif tag == "P":
+            code, compile_ns, eval_ns, *message = rest.split(" ", 3)
+            current = HostResult(int(code), float(compile_ns), float(eval_ns), " ".join(message).strip())
+        elif tag == "S" and current is not None:
+            current.steps.append(tuple(int(value) for value in rest.split()))  # type: ignore[arg-type]
+        elif tag == "E" and current is not None:
+            results.append(current)
+            current = None
+    if len(results) != len(jobs):
+        raise RuntimeError(f"host returned {len(results)} results for {len(jobs)} jobs")
+    return results, statistics.mean(calibrations) if calibrations else 0.0
+
+
+def angular_distance(a: int, b: int) -> int:
+    diff = abs(a - b) % ss.STEPS_PER_A_AXIS_REV
+    return min(diff, ss.STEPS_PER_A_AXIS_REV - diff)
+
+
+def _f32_nudge(value: float, ulps: int) -> float:
+    """Move a float32 value by ``ulps`` units in the last place."""
+    if not ulps or value != value or value in (float("inf"), float("-inf")):
+        return value
+    bits = struct.unpack("<i", struct.pack("<f", value))[0]
+    if bits < 0:
+        bits = -(bits & 0x7FFFFFFF)
+    bits += ulps
+    if bits < 0:
+        bits = (-bits) | -0x80000000
+    return struct.unpack("<f", struct.pack("<i", bits))[0]
+
+
+@contextmanager
+def libm_nudged(ulps: int):
+    """Evaluate with every transcendental result moved by ``ulps``.
+
+    Host and device libm (sinf, tanf, powf, expf) are only accurate to about
+    one ulp, which near tan() poles or under large multipliers is enough to
+    move the target by several steps.
+    """
+    unary, powf = ss._unary, ss._powf
+    ss._unary = lambda func, a: _f32_nudge(unary(func, a), 0 if func is math.sqrt else ulps)
+    ss._powf = lambda a, b: _f32_nudge(powf(a, b), ulps)
+    try:
+        yield
+    finally:
+        ss._unary, ss._powf = unary, powf
+
+
+def _step(job: Job, rt: ss.Runtime, index: int, record: tuple[int, int, int, int, int]) -> str | None:
+    in_r, in_a, out_r, out_a, fault = record
+    target = ss.evaluate(job.program, rt, ss.Positions(in_r, in_a), index == 0, index * STEP_MS)
+    if rt.faulted or fault:
+        if rt.fault_mask != fault:
+            return f"step {index}: faultMask host={fault:#x} reference={rt.fault_mask:#x}"
+        return None
+    ref_r = min(max(target.radial, 0), ss.MAX_R_STEPS)
+    ref_a = target.angular % ss.STEPS_PER_A_AXIS_REV
+    if abs(ref_r - out_r) > 1 or angular_distance(ref_a, out_a) > 1:
+        return f"step {index} from ({in_r}, {in_a}): host=({out_r}, {out_a}) reference=({ref_r}, {ref_a})"
+    return None
+
+
+def replay(job: Job, host: HostResult, stats: FamilyStats) -> str | None:
+    """Replay the host trace through the reference; return a mismatch description."""
+    if job.ref_error is not None or host.code != ss.CompileResult.OK:
+        ref_code = job.ref_error.code if job.ref_error is not None else ss.CompileResult.OK
+        if ref_code != host.code:
+            return f"compile result host={host.code} reference={int(ref_code)} ({host.message or job.ref_error})"
+        return None
+
+    rt = ss.Runtime(seed=job.seed)
+    for index, record in enumerate(host.steps):
+        before = copy.copy(rt)
+        problem = _step(job, rt, index, record)
+        if problem is None:
+            continue
+        for ulps in (1, -1):
+            with libm_nudged(ulps):
+                if _step(job, copy.copy(before), index, record) is None:
+                    stats.libm_ulp += 1
+                    break
+        else:
+            return problem
+    return None
+
+
+def make_jobs(families: list[str], programs: int, mutants: int, seed: int) -> list[Job]:
+    rng = random.Random(seed)
+    jobs: list[Job] = []
+    for family in families:
+        generator = ScriptGenerator(rng, family)
+        made = 0
+        attempts = 0
+        while made < programs and attempts < programs * 50:
+            attempts += 1
+            source = generator.script()
+            try:
+                program = ss.compile_script(source)
+            except ss.SandScriptError:
+                continue  # over a limit; valid programs only
+            jobs.append(Job(family, source, rng.getrandbits(32) or 1, program))
+            made += 1
+    valid = [job for job in jobs if job.family == "mixed"] or jobs
+    for _ in range(mutants if valid else 0):
+        source = mutate(rng, rng.choice(valid).source)
+        job = Job(MUTANT_FAMILY, source, rng.getrandbits(32) or 1)
+        try:
+            job.program = ss.compile_script(source)
+        except ss.SandScriptError as err:
+            job.ref_error = err
+        jobs.append(job)
+    return jobs
+
+
+def compare_baseline(
+    baseline: dict, current: dict[str, dict], config: dict, tolerance: float, calibration_ns: float
+) -> list[str]:
+    """Return human readable regression flags.
+
+    Baseline timings are scaled by this machine's calibration time over the
+    baseline's, so only slowdowns relative to the machine are flagged.
+    """
+    flags: list[str] = []
+    same_config = baseline.get("config") == config
+    base_calibration = baseline.get("calibration_ns")
+    scale = calibration_ns / base_calibration if base_calibration and calibration_ns else None
+    for family, stats in current.items():
+        base = baseline.get("families", {}).get(family)
+        if base is None:
+            continue
+        for key in ("compile_ns", "eval_ns_per_op"):
+            if scale is None or not base.get(key):
+                continue
+            expected = base[key] * scale
+            if stats[key] > expected * (1.0 + tolerance):
+                flags.append(
+                    f"PERF {family}: {key} {stats[key]:.1f} vs {expected:.1f} expected from the baseline "
+                    f"(+{(stats[key] / expected - 1.0) * 100:.0f}%)"
+                )
+        if same_config and base.get("digest") != stats["digest"]:
+            flags.append(f"SEMANTIC {family}: host trace digest changed")
+    return flags
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--families", default=",".join(FAMILIES), help="comma separated opcode families")
+    parser.add_argument("--programs", type=int, default=60, help="programs per family")
+    parser.add_argument("--mutants", type=int, default=60, help="mutated scripts to cross-check compile errors")
+    parser.add_argument("--steps", type=int, default=200, help="evaluations per program")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--compile-reps", type=int, default=20)
+    parser.add_argument("--eval-reps", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before flagging")
+    parser.add_argument("--strict-perf", action="store_true", help="fail the run on timing flags too")
+    parser.add_argument("--show", type=int, default=3, help="mismatching scripts to print per family")
+    parser.add_argument("--cxx", default=os.environ.get("CXX", "c++"))
+    args = parser.parse_args(argv)
+
+    families = [name.strip() for name in args.families.split(",") if name.strip()]
+    unknown = [name for name in families if name not in FAMILIES]
+    if unknown:
+        parser.error(f"unknown families: {', '.join(unknown)}")
+
+    binary = build_host(args.cxx)
+    jobs = make_jobs(families, args.programs, args.mutants, args.seed)
+    results, calibration_ns = run_host(binary, jobs, args.steps, args.compile_reps, args.eval_reps)
+
+    stats: dict[str, FamilyStats] = {}
+    for job, host in zip(jobs, results):
+        fam = stats.setdefault(job.family, FamilyStats())
+        fam.programs += 1
+        fam.steps += len(host.steps)
+        fam.faults += bool(host.steps and host.steps[-1][4])
+        fam.digest.update(f"P {host.code}\n".encode())
+        for record in host.steps:
+            fam.digest.update(" ".join(map(str, record)).encode() + b"\n")
+        if host.code == ss.CompileResult.OK:
+            fam.compile_ns.append(host.compile_ns)
+            if host.eval_ns > 0.0 and job.program is not None:
+                fam.eval_ns.append(host.eval_ns)
+                op_count = sum(assign.expr.op_count for assign in job.program.assignments)
+                fam.eval_ns_per_op.append(host.eval_ns / max(op_count, 1))
+        started = time.perf_counter()
+        problem = replay(job, host, fam)
+        fam.ref_s += time.perf_counter() - started
+        if problem:
+            fam.mismatches.append(f"{problem}\n--- script ---\n{job.source}--------------")
+
+    print(f"{'family':<10}{'progs':>6}{'steps':>8}{'faults':>7}{'compile µs':>12}"
+          f"{'eval ns/step':>14}{'ns/op':>8}{'ref µs/step':>13}{'libm ulp':>10}{'mismatch':>10}")
+    summaries: dict[str, dict] = {}
+    for family, fam in stats.items():
+        summary = fam.summary()
+        summaries[family] = summary
+        ref_us = fam.ref_s * 1e6 / fam.steps if fam.steps else 0.0
+        print(f"{family:<10}{fam.programs:>6}{fam.steps:>8}{fam.faults:>7}"
+              f"{summary['compile_ns'] / 1000:>12.2f}{summary['eval_ns_per_step']:>14.1f}"
+              f"{summary['eval_ns_per_op']:>8.2f}{ref_us:>13.1f}{fam.libm_ulp:>10}{len(fam.mismatches):>10}")
+
+    total_mismatches = 0
+    for family, fam in stats.items():
+        total_mismatches += len(fam.mismatches)
+        for text in fam.mismatches[: args.show]:
+            print(f"\nMISMATCH [{family}] {text}")
+
+    config = {
+        "families": families,
+        "programs": args.programs,
+        "mutants": args.mutants,
+        "steps": args.steps,
+        "seed": args.seed,
+    }
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        record = {"config": config, "cxx": args.cxx, "calibration_ns": calibration_ns, "families": summaries}
+        args.baseline.write_text(json.dumps(record, indent=2) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        flags: list[str] = []
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        flags = compare_baseline(baseline, summaries, config, args.tolerance, calibration_ns)
+        print()
+        if not baseline.get("calibration_ns"):
+            print(f"{args.baseline} has no calibration time; timings not compared (run with --update-baseline)")
+        for flag in flags:
+            print(flag)
+        if not flags:
+            print(f"No regressions against {args.baseline}")
+    else:
+        flags = []
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one")
+
+    failing = [flag for flag in flags if args.strict_perf or not flag.startswith("PERF")]
+    return 1 if total_mismatches or failing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
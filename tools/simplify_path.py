@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Polar-aware trajectory simplifier for Sand Garden tracks.
+
+Every position the pattern loop produces becomes one blocking move, so a dense
+track spends much of its run starting and stopping the steppers for moves the
+sand cannot show. This tool drops points with Douglas-Peucker in x/y while
+judging each shortcut by the path the firmware really drives: both axes run
+at constant speed and finish together, so a move is a straight line in
+(radius, angle) steps, which is a spiral arc on the table, not a chord. A
+point may only be removed when every dropped point stays within the tolerance
+(millimetres, think sand-groove width) of that arc, and consecutive kept
+points must stay under half a revolution apart so the shortest-path rule
+still turns the same way. Output points are original step positions, so the
+result is already quantized to motor steps.
+
+Tracks come from a built-in pattern generator, a SandScript file (run through
+the reference evaluator) or an imported CSV of ``radial,angular`` steps or a
+``.thr`` theta-rho file.
+
+Usage:
+    python3 tools/simplify_path.py --pattern 5 --moves 20000
+    python3 tools/simplify_path.py --script spiral.pss --steps 50000 --tolerance 1.0
+    python3 tools/simplify_path.py track.thr -o track_simplified.csv
+"""
+from __future__ import annotations
+
+import argparse
+import math
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "custom_components" / "sand_garden"))
+
+import motion  # noqa: E402
+import patterns  # noqa: E402
+import sandscript as ss  # noqa: E402
+
+DEFAULT_TOLERANCE_MM = 0.5
+MAX_WINDOW = 1024  # points per Douglas-Peucker window; windows also end before half a revolution
+_RAD_PER_STEP = 2.0 * math.pi / ss.STEPS_PER_A_AXIS_REV
+
+
+def read_steps_csv(path: Path) -> list[ss.Positions]:
+    """Read ``radial,angular`` step pairs, skipping blank, comment and header lines."""
+    track = []
+    for line in path.read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        fields = line.replace(";", ",").split(",")
+        try:
+            track.append(ss.Positions(int(float(fields[0])), int(float(fields[1]))))
+        except (ValueError, IndexError):
+            continue
+    return track
+
+
+def read_thr(path: Path) -> list[ss.Positions]:
+    """Read a theta-rho track (radians, rho 0..1) as step positions."""
+    track = []
+    for line in path.read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        theta, rho = (float(value) for value in line.split()[:2])
+        track.append(ss.Positions(round(rho * ss.MAX_R_STEPS), round(theta / _RAD_PER_STEP)))
+    return track
+
+
+def track_from_args(args: argparse.Namespace) -> list[ss.Positions]:
+    if args.pattern is not None:
+        return list(patterns.generate(args.pattern, args.moves, seed=args.seed))
+    if args.script is not None:
+        program = ss.compile_script(args.script.read_text())
+        track = []
+        for position, fault in ss.simulate(program, args.steps, seed=args.seed):
+            if fault:
+                print(f"script faulted (mask 0x{fault:02x}) after {len(track)} steps", file=sys.stderr)
+                break
+            track.append(position)
+        return track
+    if args.track.suffix.lower() == ".thr":
+        return read_thr(args.track)
+    return read_steps_csv(args.track)
+
+
+def _xy_mm(radial: np.ndarray, angular: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    r_mm = radial / motion.STEPS_PER_MM
+    theta = angular * _RAD_PER_STEP
+    return r_mm * np.cos(theta), r_mm * np.sin(theta)
+
+
+class _Track:
+    """Unwrapped step arrays plus cartesian coordinates of a settled track."""
+
+    def __init__(self, track: list[ss.Positions], start: ss.Positions) -> None:
+        unwrapped = np.array(list(motion.unwrap(track, start)), dtype=np.float64).reshape(-1, 2)
+        self.radial = unwrapped[:, 0]
+        self.angular = unwrapped[:, 1]
+        self.x, self.y = _xy_mm(self.radial, self.angular)
+
+    def deviation(self, i: int, j: int, tolerance: float) -> tuple[float, int]:
+        """Largest distance (mm) from points i+1..j-1 to the polar move i -> j, and where."""
+        if j - i < 2:
+            return 0.0, i
+        r0, r1 = self.radial[i], self.radial[j]
+        a0, a1 = self.angular[i], self.angular[j]
+        # Sample the arc finer than the tolerance; its length is at most |dr| + r_max * |dtheta|.
+        length = (abs(r1 - r0) + max(r0, r1) * abs(a1 - a0) * _RAD_PER_STEP) / motion.STEPS_PER_MM
+        count = int(min(max(math.ceil(length / (tolerance * 0.25)), 2), 2048))
+        s = np.linspace(0.0, 1.0, count)
+        xs, ys = _xy_mm(r0 + s * (r1 - r0), a0 + s * (a1 - a0))
+        px = self.x[i + 1 : j, None]
+        py = self.y[i + 1 : j, None]
+        dist = np.sqrt(((px - xs) ** 2 + (py - ys) ** 2).min(axis=1))
+        worst = int(dist.argmax())
+        return float(dist[worst]), i + 1 + worst
+
+
+def _windows(angular: np.ndarray) -> list[tuple[int, int]]:
+    """Split the track so no window spans half a revolution or more than MAX_WINDOW points."""
+    windows = []
+    first = 0
+    low = high = angular[0]
+    for index in range(1, len(angular)):
+        low = min(low, angular[index])
+        high = max(high, angular[index])
+        if high - low >= motion.HALF_REV or index - first >= MAX_WINDOW:
+            windows.append((first, index - 1))
+            first = index - 1
+            low = min(angular[first], angular[index])
+            high = max(angular[first], angular[index])
+    windows.append((first, len(angular) - 1))
+    return windows
+
+
+def simplify(
+    track: list[ss.Positions], tolerance_mm: float = DEFAULT_TOLERANCE_MM, start: ss.Positions = ss.Positions(0, 0)
+) -> tuple[list[int], float]:
+    """Indices of the points to keep and the largest deviation left (mm)."""
+    if len(track) < 3:
+        return list(range(len(track))), 0.0
+    data = _Track(track, start)
+    keep = np.zeros(len(track), dtype=bool)
+    worst_kept = 0.0
+    for first, last in _windows(data.angular):
+        keep[first] = keep[last] = True
+        stack = [(first, last)]
+        while stack:
+            i, j = stack.pop()
+            worst, index = data.deviation(i, j, tolerance_mm)
+            if worst > tolerance_mm:
+                keep[index] = True
+                stack.append((i, index))
+                stack.append((index, j))
+            else:
+                worst_kept = max(worst_kept, worst)
+    return np.flatnonzero(keep).tolist(), worst_kept
+
+
+def write_steps_csv(path: Path, track: list[ss.Positions]) -> None:
+    lines = ["radial,angular"] + [f"{p.radial},{p.angular}" for p in track]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("track", nargs="?", type=Path, help="CSV of radial,angular steps or a .thr file")
+    source.add_argument("--pattern", type=int, choices=sorted(patterns.GENERATORS), help="built-in pattern id")
+    source.add_argument("--script", type=Path, help="SandScript source file")
+    parser.add_argument("--moves", type=int, default=20000, help="pattern loop iterations to generate")
+    parser.add_argument("--steps", type=int, default=20000, help="SandScript evaluations to run")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE_MM, help="allowed deviation in mm")
+    parser.add_argument("--speed", type=float, default=1.0, help="speed multiplier for the time estimate")
+    parser.add_argument("--move-overhead-ms", type=float, default=0.0, help="measured fixed cost per move to add")
+    parser.add_argument("-o", "--output", type=Path, help="write the kept points as radial,angular CSV")
+    args = parser.parse_args(argv)
+    if args.tolerance <= 0:
+        parser.error("--tolerance must be positive")
+
+    track = track_from_args(args)
+    if not track:
+        print("track is empty", file=sys.stderr)
+        return 1
+    kept, worst = simplify(track, args.tolerance)
+    simplified = [track[index] for index in kept]
+
+    multiplier = motion.clamp_multiplier(args.speed)
+    before_s, before_moves = motion.run_time(track, multiplier=multiplier)
+    after_s, after_moves = motion.run_time(simplified, multiplier=multiplier)
+    before_s += before_moves * args.move_overhead_ms / 1000.0
+    after_s += after_moves * args.move_overhead_ms / 1000.0
+    print(f"points     {len(track):>9} -> {len(simplified):<9} ({100.0 * (1 - len(simplified) / len(track)):.1f}% fewer)")
+    print(f"moves      {before_moves:>9} -> {after_moves:<9}")
+    print(f"motion     {before_s / 60:>8.1f}m -> {after_s / 60:.1f}m at speed x{multiplier:g}")
+    print(f"deviation  {worst:.3f} mm max (tolerance {args.tolerance:g} mm)")
+    if args.output:
+        write_steps_csv(args.output, simplified)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""Compile a Sisyphus-style theta-rho (.thr) track into a SandScript pattern.
+
+The device only accepts a SandScript of at most 768 characters, so a track is
+turned into closed-form functions of progress instead of a point list. The
+progress ``p`` runs from 0 to 1 over ``N`` evaluations (``p = steps / N``).
+It is spread along the track in one of two ways, and the better one wins:
+
+- by estimated motor time, so every evaluation is a move of similar length;
+- by point index, which suits tracks whose points are already even.
+
+The angle (degrees, unwrapped) and the radius (cm) are each fitted as a
+straight line from the first to the last point, plus one of two series:
+
+- ``fourier``: a sparse sine series ``c * sin(k * 180 * p)``. It is zero at
+  both ends, so it never fights the endpoints. The strongest harmonics of
+  any order are picked from a DST of the residual, so a petal that repeats
+  300 times costs one term, not 300.
+- ``spline``: a piecewise-linear spline ``c * abs(p - t)`` per channel with
+  interior knots. A few evenly spaced seeds come first; every further knot
+  is the candidate, in either channel, whose refit removes the most error. The fit itself is
+  solved in the hat basis, which stays well conditioned, and only then
+  rewritten as ``abs()`` terms.
+
+Terms are kept in order of how much error they remove, for as long as the
+script still compiles against the reference compiler: 768 characters,
+240 tokens, 128 bytecode bytes per expression and 12 locals. Coefficients
+get as many significant digits as it takes to stay within
+``ROUNDING_TOLERANCE_MM`` of the fit. The fit error is measured by running
+the emitted script through the reference evaluator and comparing each step
+with the track at the same progress. A script that strays from its own fit
+by more than ``EMIT_TOLERANCE_MM``, or from the track by more than
+``--max-error``, is rejected.
+
+Files are read in chunks with bounded memory. The kept samples are halved
+whenever they exceed ``--max-samples``, so multi-million-line tracks work.
+Tracks are drawn as stored: theta 0 is the device's angular home, and rho 1
+is the full 10 cm radius.
+
+Usage:
+    python3 tools/thr_to_sandscript.py track.thr -o track.pss
+    python3 tools/thr_to_sandscript.py track.thr --method spline --step-time 0.03
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass, replace
+import math
+from pathlib import Path
+import sys
+from typing import Iterator
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "custom_components" / "sand_garden"))
+
+import motion  # noqa: E402
+import sandscript as ss  # noqa: E402
+
+CHUNK_BYTES = 1 << 20
+DEFAULT_MAX_SAMPLES = 50000
+GRID = 1 << 15  # uniform resampling for the DST
+MAX_TERMS = 80  # ranked candidates per fit; the script budget cuts this further
+MAX_KNOTS = 40
+KNOT_SEEDS = 3  # evenly spaced knots placed before the greedy ones
+KNOT_CANDIDATES = 256  # knots are picked from the interior of a grid this fine
+KNOT_GRID = 2048  # residual resampling used to rank the knots
+EMIT_DIGITS = (4, 8)  # significant digits tried for the coefficients
+ROUNDING_TOLERANCE_MM = 0.1  # what rounding the coefficients may cost
+EMIT_TOLERANCE_MM = 0.5  # how far the script may stray from its fit (step quantization included)
+STEPS_PER_CYCLE = 12  # evaluations needed per period of the highest harmonic
+CHECK_STEPS = 4000  # evaluations sampled when measuring the fit error
+RADIUS_CM = ss.MAX_R_STEPS / motion.STEPS_PER_MM / 10.0
+_STEPS_PER_DEG = ss.STEPS_PER_A_AXIS_REV / 360.0
+_STEPS_PER_CM = motion.STEPS_PER_MM * 10.0
+
+
+def iter_thr_chunks(path: Path, chunk_bytes: int = CHUNK_BYTES) -> Iterator[np.ndarray]:
+    """Yield ``(n, 2)`` arrays of (theta rad, rho) read ``chunk_bytes`` at a time."""
+    tail = b""
+    with path.open("rb") as handle:
+        while True:
+            block = handle.read(chunk_bytes)
+            if not block:
+                break
+            block = tail + block
+            cut = block.rfind(b"\n")
+            if cut < 0:
+                tail = block
+                continue
+            tail = block[cut + 1 :]
+            rows = _parse_lines(block[:cut].split(b"\n"))
+            if len(rows):
+                yield rows
+    if tail:
+        rows = _parse_lines([tail])
+        if len(rows):
+            yield rows
+
+
+def _parse_lines(lines: list[bytes]) -> np.ndarray:
+    rows = []
+    for line in lines:
+        line = line.split(b"#", 1)[0].strip()
+        if not line or line.startswith((b"/", b";")):
+            continue
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        try:
+            rows.append((float(fields[0]), float(fields[1])))
+        except ValueError:
+            continue
+    return np.array(rows, dtype=np.float64).reshape(-1, 2)
+
+
+def _segment_time(angle_deg: np.ndarray, radius_cm: np.ndarray) -> np.ndarray:
+    """Motor time between consecutive points."""
+    d_angular = np.diff(angle_deg) * _STEPS_PER_DEG
+    d_radial = np.diff(radius_cm) * _STEPS_PER_CM
+    return motion.move_times(radius_cm[:-1] * _STEPS_PER_CM, d_angular, d_radial)
+
+
+@dataclass
+class Track:
+    """Decimated samples plus whole-file totals."""
+
+    elapsed: np.ndarray  # cumulative motor seconds at each sample
+    index: np.ndarray  # position of each sample in the file
+    angle_deg: np.ndarray  # unwrapped
+    radius_cm: np.ndarray
+    points: int
+    seconds: float
+
+    def progress(self, param: str) -> np.ndarray:
+        """Progress 0..1 of every sample, by motor ``time`` or point ``index``."""
+        if param == "time":
+            return self.elapsed / max(self.seconds, 1e-9)
+        return self.index / max(self.points - 1, 1)
+
+
+def read_track(path: Path, max_samples: int = DEFAULT_MAX_SAMPLES) -> Track:
+    """Stream ``path`` once, keeping at most ``max_samples`` evenly strided samples."""
+    kept: list[list[np.ndarray]] = [[], [], [], []]  # elapsed, index, angle, radius
+    stride = 1
+    count = 0
+    elapsed = 0.0
+    previous: tuple[float, float] | None = None
+    for chunk in iter_thr_chunks(path):
+        angle = np.degrees(chunk[:, 0])
+        radius = np.clip(chunk[:, 1], 0.0, 1.0) * RADIUS_CM
+        if previous is None:
+            times = np.concatenate([[0.0], np.cumsum(_segment_time(angle, radius))])
+        else:
+            joined_a = np.concatenate([[previous[0]], angle])
+            joined_r = np.concatenate([[previous[1]], radius])
+            times = elapsed + np.cumsum(_segment_time(joined_a, joined_r))
+        index = np.arange(count, count + len(angle))
+        keep = index % stride == 0
+        for part, values in zip(kept, (times, index, angle, radius)):
+            part.append(values[keep])
+        count += len(angle)
+        elapsed = float(times[-1])
+        previous = (float(angle[-1]), float(radius[-1]))
+        # Keep every other surviving sample and double the stride for what follows,
+        # as often as one dense chunk needs; one slot stays free for the final point.
+        kept = [[np.concatenate(part)] for part in kept]
+        while len(kept[0][0]) >= max_samples and len(kept[0][0]) > 1:
+            kept = [[part[0][::2]] for part in kept]
+            stride *= 2
+    if previous is None:
+        raise ValueError(f"{path} has no theta-rho points")
+    elapsed_at, index_at, angle_at, radius_at = (np.concatenate(part) for part in kept)
+    if index_at[-1] != count - 1:
+        elapsed_at = np.append(elapsed_at, elapsed)
+        index_at = np.append(index_at, count - 1)
+        angle_at = np.append(angle_at, previous[0])
+        radius_at = np.append(radius_at, previous[1])
+    return Track(elapsed_at, index_at.astype(np.float64), angle_at, radius_at, count, elapsed)
+
+
+@dataclass
+class Fit:
+    """Linear trend plus series terms for both channels."""
+
+    method: str
+    param: str
+    radius_trend: tuple[float, float]
+    angle_trend: tuple[float, float]
+    # (channel, parameter, coefficient): parameter is the harmonic k or the knot t;
+    # spline fits also carry offset (-1) and slope (-2) corrections.
+    terms: list[tuple[str, float, float]]
+    digits: int = EMIT_DIGITS[0]  # significant digits of the emitted coefficients
+
+
+def _trend(values: np.ndarray) -> tuple[float, float]:
+    return float(values[0]), float(values[-1] - values[0])
+
+
+def _channels(track: Track) -> tuple[tuple[str, np.ndarray, float], ...]:
+    """(channel, values, millimetres per unit) for radius and angle.
+
+    Angle errors are weighted at the track's mean radius.
+    """
+    per_degree = max(float(np.mean(track.radius_cm)), 0.5) * 10.0 * math.pi / 180.0
+    return ("r", track.radius_cm, 10.0), ("a", track.angle_deg, per_degree)
+
+
+def _basis(method: str, p: np.ndarray, parameter: float) -> np.ndarray:
+    if method == "fourier":
+        return np.sin(np.pi * parameter * p)
+    return np.abs(p - parameter)
+
+
+def _hinge_fit(p: np.ndarray, residual: np.ndarray, knots: list[float]) -> tuple[np.ndarray, float, float]:
+    """Least-squares piecewise-linear fit with interior ``knots``, as abs() terms.
+
+    The spline is solved for its values at 0, the knots and 1 (hat
+    functions: every column is local, so close knots do not make the system
+    ill-conditioned), then rewritten as ``offset + slope * p + sum(c *
+    abs(p - t))``. Each ``c`` is half the change of slope at its knot.
+    """
+    order = np.argsort(knots)
+    nodes = np.concatenate(([0.0], np.asarray(knots, dtype=np.float64)[order], [1.0]))
+    cell = np.clip(np.searchsorted(nodes, p, side="right") - 1, 0, len(nodes) - 2)
+    weight = (p - nodes[cell]) / (nodes[cell + 1] - nodes[cell])
+    hats = np.zeros((len(p), len(nodes)))
+    rows = np.arange(len(p))
+    hats[rows, cell] = 1.0 - weight
+    hats[rows, cell + 1] = weight
+    values, *_ = np.linalg.lstsq(hats, residual, rcond=None)
+    slopes = np.diff(values) / np.diff(nodes)
+    coeffs = np.empty(len(knots))
+    coeffs[order] = np.diff(slopes) / 2.0
+    inner = nodes[1:-1]
+    ordered = coeffs[order]
+    return coeffs, float(values[0] - np.dot(ordered, inner)), float(slopes[0] + ordered.sum())
+
+
+def _refit(method: str, track: Track, p: np.ndarray, picked: list[tuple[str, float]]) -> list[tuple[str, float, float]]:
+    """Least-squares coefficients for the picked terms, per channel."""
+    terms = []
+    for channel, values, _ in _channels(track):
+        params = [param for ch, param in picked if ch == channel]
+        if not params:
+            continue
+        start, slope = _trend(values)
+        residual = values - (start + slope * p)
+        if method == "spline":
+            # abs() terms also add a line; the fit refits it so the endpoints stay put.
+            coeffs, offset, tilt = _hinge_fit(p, residual, params)
+            terms += [(channel, param, float(coef)) for param, coef in zip(params, coeffs)]
+            terms += [(channel, -1.0, offset), (channel, -2.0, tilt)]
+            continue
+        columns = [_basis(method, p, param) for param in params]
+        coeffs, *_ = np.linalg.lstsq(np.stack(columns, axis=1), residual, rcond=None)
+        terms += [(channel, param, float(coef)) for param, coef in zip(params, coeffs)]
+    return terms
+
+
+def rank_fourier(track: Track, p: np.ndarray, max_harmonic: int) -> list[tuple[str, float]]:
+    """Harmonics of both channels ordered by the squared error (mm) they remove."""
+    grid = np.linspace(0.0, 1.0, GRID)
+    scored = []
+    for channel, values, scale in _channels(track):
+        start, slope = _trend(values)
+        residual = np.interp(grid, p, values - (start + slope * p))
+        residual[0] = residual[-1] = 0.0
+        # DST-I through the FFT of the odd extension: b_k = -Im(Y_k) / (GRID - 1).
+        odd = np.concatenate([residual, -residual[-2:0:-1]])
+        coeffs = -np.fft.rfft(odd).imag[1 : max_harmonic + 1] / (GRID - 1)
+        energy = (coeffs * scale) ** 2
+        top = np.argsort(energy)[::-1][:MAX_TERMS]
+        scored += [(float(energy[k]), channel, float(k + 1)) for k in top]
+    scored.sort(reverse=True)
+    return [(channel, k) for _, channel, k in scored[:MAX_TERMS]]
+
+
+def _knot_gains(grid: np.ndarray, residual: np.ndarray, knots: list[float], hinges: np.ndarray) -> np.ndarray:
+    """Squared error each candidate hinge would remove from ``residual`` after a refit.
+
+    The candidates are projected off the current fit, so one matrix product
+    scores all of them instead of a refit each. Candidates the fit already
+    spans score -1.
+    """
+    basis, _ = np.linalg.qr(np.column_stack([np.ones_like(grid), grid] + [np.abs(grid - t) for t in knots]))
+    left = residual - basis @ (basis.T @ residual)
+    perp = hinges - basis @ (basis.T @ hinges)
+    norms = np.sum(perp**2, axis=0)
+    gains = (perp.T @ left) ** 2 / np.maximum(norms, 1e-30)
+    gains[norms < 1e-9 * np.sum(hinges**2, axis=0)] = -1.0
+    return gains
+
+
+def rank_knots(track: Track, p: np.ndarray) -> list[tuple[str, float]]:
+    """Spline knots of both channels, in the order they were picked.
+
+    ``KNOT_SEEDS`` evenly spaced knots per channel come first. Each further
+    knot is the interior candidate, in whichever channel, whose refit removes
+    the most squared error (mm). The endpoints are never knots: ``abs(p)``
+    and ``abs(p - 1)`` would only repeat the line the fit already has.
+    """
+    grid = np.linspace(0.0, 1.0, KNOT_GRID)
+    candidates = np.round(np.arange(1, KNOT_CANDIDATES) / KNOT_CANDIDATES, 4)
+    hinges = np.abs(grid[:, None] - candidates[None, :])
+    seeds = [round(i / (KNOT_SEEDS + 1), 4) for i in range(1, KNOT_SEEDS + 1)]
+    residuals, knots, gains = {}, {}, {}
+    for channel, values, scale in _channels(track):
+        start, slope = _trend(values)
+        residuals[channel] = np.interp(grid, p, values - (start + slope * p)) * scale
+        knots[channel] = list(seeds)
+    ranked = [(ch, t) for t in seeds for ch in knots]
+    while len(ranked) < 2 * MAX_KNOTS:
+        for channel in knots:
+            if channel not in gains:
+                gains[channel] = _knot_gains(grid, residuals[channel], knots[channel], hinges)
+                gains[channel][np.isin(candidates, knots[channel])] = -1.0
+        channel = max(gains, key=lambda ch: gains[ch].max())
+        best = int(np.argmax(gains[channel]))
+        if gains[channel][best] <= 1e-6 * len(grid):  # under a thousandth of a mm rms
+            break
+        knots[channel].append(float(candidates[best]))
+        ranked.append((channel, float(candidates[best])))
+        del gains[channel]
+    return ranked
+
+
+def evaluate_fit(fit: Fit, p: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Radius (cm) and angle (deg) of ``fit`` at progress ``p``."""
+    out = {}
+    for channel, (start, slope) in (("r", fit.radius_trend), ("a", fit.angle_trend)):
+        values = start + slope * p
+        for ch, param, coef in fit.terms:
+            if ch != channel:
+                continue
+            if param == -1.0:
+                values = values + coef
+            elif param == -2.0:
+                values = values + coef * p
+            else:
+                values = values + coef * _basis(fit.method, p, param)
+        out[channel] = values
+    return out["r"], out["a"]
+
+
+def _num(value: float, digits: int) -> str:
+    """Shortest SandScript literal for ``value`` at ``digits`` significant digits."""
+    text = f"{abs(value):.{digits}g}"
+    if "e" in text:
+        mantissa, exponent = text.split("e")
+        text = f"{mantissa}e{int(exponent)}"
+    if text.startswith("0."):
+        text = text[1:]
+    return ("-" if value < 0 else "") + text
+
+
+def _signed(text: str) -> str:
+    return text if text.startswith("-") else "+" + text
+
+
+def _expr_fits(rhs: str) -> bool:
+    probe = f"p=steps\nq=p\nr=0\na=0\nr={rhs}\nnext_radius=r"
+    try:
+        ss.compile_script(probe)
+    except ss.SandScriptError as err:
+        return "expression too long" not in str(err)
+    return True
+
+
+def _channel_lines(name: str, start: float, slope: float, terms: list[str]) -> list[str]:
+    """Assignments for one channel, continued on new lines when the bytecode fills up."""
+    head = _num(start, 7) + _signed(_num(slope, 7)) + "*p"
+    lines = []
+    rhs = head
+    for term in terms:
+        candidate = rhs + term
+        if _expr_fits(candidate):
+            rhs = candidate
+            continue
+        lines.append(f"{name}={rhs}")
+        rhs = name + term
+    lines.append(f"{name}={rhs}")
+    return lines
+
+
+def render(fit: Fit, steps: int, title: str) -> str:
+    """SandScript source for ``fit`` over ``steps`` evaluations."""
+    lines = [f"# {title}"[:48], f"p=min(steps/{steps},1)"]
+    fourier = fit.method == "fourier" and fit.terms
+    if fourier:
+        lines.append("q=p*180")
+    for channel, name, (start, slope) in (("r", "r", fit.radius_trend), ("a", "a", fit.angle_trend)):
+        texts = []
+        for ch, param, coef in fit.terms:
+            if ch != channel:
+                continue
+            c = _num(coef, fit.digits)
+            if c.lstrip("-") in ("0", ".0"):
+                continue
+            if fit.method == "fourier":
+                k = int(param)
+                texts.append(_signed(c) + ("*sin(q)" if k == 1 else f"*sin(q*{k})"))
+            elif param == -1.0:
+                start += coef
+            elif param == -2.0:
+                slope += coef
+            else:
+                texts.append(_signed(c) + f"*abs(p-{_num(param, 4)})")
+        lines += _channel_lines(name, start, slope, texts)
+    lines += ["next_radius=r", "next_angle=a"]
+    return "\n".join(lines) + "\n"
+
+
+def _fits_budget(source: str) -> bool:
+    if len(source.encode("utf-8")) > ss.MAX_SCRIPT_CHARS:
+        return False
+    try:
+        ss.compile_script(source)
+    except ss.SandScriptError:
+        return False
+    return True
+
+
+def _digits(fit: Fit, track: Track) -> int:
+    """Fewest significant digits that keep the rounded coefficients within tolerance."""
+    grid = np.linspace(0.0, 1.0, 1025)
+    exact = evaluate_fit(fit, grid)
+    scales = [scale for _, _, scale in _channels(track)]
+    for digits in range(EMIT_DIGITS[0], EMIT_DIGITS[1] + 1):
+        # Offset and slope corrections are folded into the 7-digit trend.
+        terms = [(ch, param, coef if param < 0 else float(_num(coef, digits))) for ch, param, coef in fit.terms]
+        rounded = evaluate_fit(replace(fit, terms=terms), grid)
+        if all(np.max(np.abs(a - b)) * scale <= ROUNDING_TOLERANCE_MM
+               for a, b, scale in zip(rounded, exact, scales)):
+            break
+    return digits
+
+
+def build(track: Track, method: str, param: str, steps: int, title: str) -> tuple[str, Fit]:
+    """Largest prefix of the ranked terms whose script fits the device budget."""
+    p = track.progress(param)
+    if method == "fourier":
+        ranked = rank_fourier(track, p, max(steps // STEPS_PER_CYCLE, 1))
+    else:
+        ranked = rank_knots(track, p)
+
+    def attempt(count: int) -> tuple[str, Fit]:
+        picked = ranked[:count]
+        terms = _refit(method, track, p, picked) if picked else []
+        fit = Fit(method, param, _trend(track.radius_cm), _trend(track.angle_deg), terms)
+        fit.digits = _digits(fit, track)
+        return render(fit, steps, title), fit
+
+    low, high = 0, len(ranked)
+    best = attempt(0)
+    if not _fits_budget(best[0]):
+        raise ValueError("even the bare trend does not fit the script budget")
+    while low < high:
+        mid = (low + high + 1) // 2
+        candidate = attempt(mid)
+        if _fits_budget(candidate[0]):
+            low, best = mid, candidate
+        else:
+            high = mid - 1
+    return best
+
+
+def _check_indices(steps: int) -> np.ndarray:
+    return np.unique(np.linspace(0, steps, min(CHECK_STEPS, steps + 1)).astype(int))
+
+
+def _distance(track: Track, param: str, p: np.ndarray, radius_mm: np.ndarray, angle_deg: np.ndarray) -> tuple[float, float]:
+    """RMS and max distance (mm) between polar points at progress ``p`` and the track."""
+    progress = track.progress(param)
+    radius = np.interp(p, progress, track.radius_cm) * 10.0
+    angle = np.radians(np.interp(p, progress, track.angle_deg))
+    theta = np.radians(angle_deg)
+    values = np.hypot(radius_mm * np.cos(theta) - radius * np.cos(angle),
+                      radius_mm * np.sin(theta) - radius * np.sin(angle))
+    return float(np.sqrt(np.mean(values**2))), float(values.max())
+
+
+def measure(source: str, track: Track, param: str, steps: int) -> tuple[float, float]:
+    """RMS and max distance (mm) between the script's targets and the track."""
+    program = ss.compile_script(source)
+    indices = _check_indices(steps)
+    got = []
+    for index in indices.tolist():
+        rt = ss.Runtime(initialized=True, step_counter=index)
+        target = ss.evaluate(program, rt, ss.Positions(0, 0), False, 0)
+        if rt.faulted:
+            return math.inf, math.inf
+        got.append((target.radial / motion.STEPS_PER_MM, target.angular / _STEPS_PER_DEG))
+    radius_mm, angle_deg = np.array(got).T
+    return _distance(track, param, np.minimum(indices / steps, 1.0), radius_mm, angle_deg)
+
+
+def predict(fit: Fit, track: Track, steps: int) -> tuple[float, float]:
+    """What ``measure()`` should find if the script reproduced ``fit`` exactly."""
+    p = np.minimum(_check_indices(steps) / steps, 1.0)
+    radius_cm, angle_deg = evaluate_fit(fit, p)
+    return _distance(track, fit.param, p, np.clip(radius_cm, 0.0, RADIUS_CM) * 10.0, angle_deg)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("track", type=Path, help=".thr file (theta radians, rho 0..1 per line)")
+    parser.add_argument("--method", choices=("auto", "fourier", "spline"), default="auto")
+    parser.add_argument("--param", choices=("auto", "time", "index"), default="auto", help="how progress is spread")
+    parser.add_argument("--step-time", type=float, default=0.05, help="target motor seconds per evaluation")
+    parser.add_argument("--max-samples", type=int, default=DEFAULT_MAX_SAMPLES)
+    parser.add_argument("--max-error", type=float, help="reject fits straying further than this (mm)")
+    parser.add_argument("-o", "--output", type=Path, help="write the SandScript here")
+    args = parser.parse_args(argv)
+
+    track = read_track(args.track, args.max_samples)
+    steps = max(int(math.ceil(track.seconds / max(args.step_time, 1e-3))), 1)
+    methods = ("fourier", "spline") if args.method == "auto" else (args.method,)
+    params = ("time", "index") if args.param == "auto" else (args.param,)
+    results = []
+    for param in params:
+        for method in methods:
+            source, fit = build(track, method, param, steps, f"{args.track.name} {method}/{param}")
+            rms, worst = measure(source, track, param, steps)
+            used = {ch: sum(1 for c, k, _ in fit.terms if c == ch and k >= 0) for ch in ("r", "a")}
+            verdict = ""
+            expected_rms, expected_max = predict(fit, track, steps)
+            if rms > expected_rms + EMIT_TOLERANCE_MM or worst > expected_max + EMIT_TOLERANCE_MM:
+                verdict = "  rejected: the script does not reproduce its fit"
+            elif args.max_error is not None and worst > args.max_error:
+                verdict = f"  rejected: over {args.max_error:g} mm"
+            print(f"{method:<8}{param:<6} terms r={used['r']:<3} a={used['a']:<3} digits={fit.digits} "
+                  f"chars={len(source):<4} rms={rms:7.2f} mm  max={worst:7.2f} mm{verdict}")
+            if not verdict:
+                results.append((rms, method, param, source))
+    if not results:
+        print("no fit met the error budget", file=sys.stderr)
+        return 1
+    rms, method, param, source = min(results)
+    print(f"track {track.points} points ({len(track.index)} kept), {steps} evaluations, "
+          f"~{track.seconds / 60:.1f} min of motion; using {method}/{param} (rms {rms:.2f} mm)")
+    if args.output:
+        args.output.write_text(source)
+    else:
+        print(source, end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())